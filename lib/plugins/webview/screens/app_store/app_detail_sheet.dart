@@ -360,7 +360,12 @@ class _AppDetailSheetState extends State<AppDetailSheet> {
       Navigator.pop(context); // 关闭详情页
 
       try {
-        await downloadManager.installApp(widget.app);
+        // 有更新时优先增量更新，只下载变化的文件；无法增量更新时再完整安装
+        final updated =
+            widget.app.hasUpdate && await downloadManager.updateApp(widget.app);
+        if (!updated) {
+          await downloadManager.installApp(widget.app);
+        }
         if (context.mounted) {
           ScaffoldMessenger.of(context).showSnackBar(
             SnackBar(
@@ -12,7 +12,7 @@ import '../services/card_manager.dart';
 ///
 /// 负责：
 /// - 源配置管理（添加、删除、切换）
-/// - 应用列表获取与缓存
+/// - 应用列表获取与缓存（优先使用聚合目录 catalog.json，一次条件请求校验新鲜度）
 /// - 搜索与过滤
 /// - 已安装应用状态追踪
 class AppStoreManager extends ChangeNotifier {
@@ -22,12 +22,18 @@ class AppStoreManager extends ChangeNotifier {
 
   // 存储键
   static const String _sourcesKey = 'configs/webview_app_sources.json';
+  static const String _catalogCacheKeyPrefix = 'configs/webview_catalog_';
+
+  // 聚合目录文件名（位于 apps.json 的上一级目录，由 generate_files_json.py --catalog 生成）
+  static const String _catalogFileName = 'catalog.json';
 
   // 状态
   List<AppStoreSource> _sources = [];
   AppStoreSource? _currentSource;
   List<MiniApp> _apps = [];
   Map<String, InstalledApp> _installedApps = {}; // appId -> InstalledApp
+  Map<String, List<dynamic>> _catalogFileLists = {}; // appId -> 聚合目录中的文件列表
+  Map<String, int> _catalogManifestVersions = {}; // appId -> 文件列表对应的版本号
   bool _isLoading = false;
   String? _error;
 
@@ -154,17 +160,10 @@ class AppStoreManager extends ChangeNotifier {
     notifyListeners();
 
     try {
-      final response = await _httpClient
-          .get(Uri.parse(_currentSource!.url))
-          .timeout(const Duration(seconds: 30));
-
-      if (response.statusCode != 200) {
-        throw Exception('HTTP ${response.statusCode}');
-      }
-
-      final List<dynamic> jsonList = json.decode(
-        utf8.decode(response.bodyBytes),
-      );
+      // 优先使用聚合目录，源未提供时回退到 apps.json
+      final List<dynamic> jsonList =
+          await _fetchCatalogApps(_currentSource!) ??
+          await _fetchAppList(_currentSource!);
       _apps =
           jsonList
               .map(
@@ -204,6 +203,100 @@ class AppStoreManager extends ChangeNotifier {
     }
   }
 
+  /// 获取 apps.json 应用列表
+  Future<List<dynamic>> _fetchAppList(AppStoreSource source) async {
+    final response = await _httpClient
+        .get(Uri.parse(source.url))
+        .timeout(const Duration(seconds: 30));
+
+    if (response.statusCode != 200) {
+      throw Exception('HTTP ${response.statusCode}');
+    }
+
+    _catalogFileLists = {};
+    _catalogManifestVersions = {};
+    return json.decode(utf8.decode(response.bodyBytes)) as List<dynamic>;
+  }
+
+  /// 获取聚合目录中的应用列表
+  ///
+  /// 使用上次保存的 ETag / Last-Modified 发起条件请求，304 时直接使用本地缓存；
+  /// 源没有聚合目录或请求失败时返回 null
+  Future<List<dynamic>?> _fetchCatalogApps(AppStoreSource source) async {
+    final cacheKey = '$_catalogCacheKeyPrefix${source.id}.json';
+    Map<String, dynamic>? cached;
+    try {
+      final data = await _storage.read(cacheKey);
+      if (data is Map<String, dynamic> && data['catalog'] is Map) {
+        cached = data;
+      }
+    } catch (e) {
+      debugPrint('Failed to load cached catalog: $e');
+    }
+
+    try {
+      final headers = <String, String>{};
+      if (cached?['etag'] != null) {
+        headers['If-None-Match'] = cached!['etag'] as String;
+      }
+      if (cached?['lastModified'] != null) {
+        headers['If-Modified-Since'] = cached!['lastModified'] as String;
+      }
+
+      final response = await _httpClient
+          .get(
+            Uri.parse(source.url).resolve('../$_catalogFileName'),
+            headers: headers,
+          )
+          .timeout(const Duration(seconds: 30));
+
+      Map<String, dynamic> catalog;
+      if (response.statusCode == 304 && cached != null) {
+        catalog = cached['catalog'] as Map<String, dynamic>;
+      } else if (response.statusCode == 200) {
+        catalog =
+            json.decode(utf8.decode(response.bodyBytes))
+                as Map<String, dynamic>;
+        await _storage.write(cacheKey, {
+          'etag': response.headers['etag'],
+          'lastModified': response.headers['last-modified'],
+          'catalog': catalog,
+        });
+      } else {
+        return null;
+      }
+
+      final apps = (catalog['apps'] as List<dynamic>?) ?? [];
+      _catalogFileLists = {
+        for (final app in apps.cast<Map<String, dynamic>>())
+          if (app['id'] != null && app['file_list'] is List)
+            app['id'] as String: app['file_list'] as List<dynamic>,
+      };
+      _catalogManifestVersions = {
+        for (final app in apps.cast<Map<String, dynamic>>())
+          if (app['id'] != null && app['manifest_version'] is int)
+            app['id'] as String: app['manifest_version'] as int,
+      };
+      return apps;
+    } catch (e) {
+      debugPrint('Catalog unavailable, falling back to apps.json: $e');
+      return null;
+    }
+  }
+
+  /// 获取聚合目录中缓存的文件列表（没有聚合目录时返回 null）
+  List<AppFile>? getCatalogFiles(String appId) {
+    final fileList = _catalogFileLists[appId];
+    if (fileList == null) return null;
+    return fileList
+        .map((json) => AppFile.fromJson(json as Map<String, dynamic>))
+        .toList();
+  }
+
+  /// 聚合目录中文件列表对应的版本号（files.history.json 的 version，没有记录时返回 null）
+  int? getCatalogManifestVersion(String appId) =>
+      _catalogManifestVersions[appId];
+
   /// 搜索应用（支持标题、描述、标签过滤）
   List<MiniApp> searchApps(
     String query, {
@@ -19,12 +19,17 @@ import '../services/app_store_manager.dart';
 /// - MD5校验
 /// - WebViewCard自动创建
 /// - 错误处理与回滚
+/// - 基于 files.history.json 的增量更新
 class DownloadManager extends ChangeNotifier {
   final StorageManager _storage;
   final CardManager _cardManager;
   final AppStoreManager _appStoreManager;
   final http.Client _httpClient;
 
+  // 已安装应用的版本记录（以 . 开头，不会出现在 files.json 中）
+  static const String _installedManifestFile = '.installed_manifest.json';
+  static const String _historyFile = 'files.history.json';
+
   // 当前安装任务（仅支持单任务）
   InstallTask? _currentTask;
 
@@ -62,9 +67,19 @@ class DownloadManager extends ChangeNotifier {
       );
       debugPrint('✅ [DownloadManager] 找到源: ${source.name} (baseUrl: ${source.baseUrl})');
 
-      // 2. 获取文件列表
+      // 2. 获取文件列表和对应的版本号
       debugPrint('📋 [DownloadManager] 步骤2: 获取文件列表 (filesUrl: ${app.filesUrl})');
-      final files = await _fetchFileList(app.filesUrl, source.baseUrl);
+      // 聚合目录已包含文件列表时无需再请求 files.json，版本号取自同一目录条目；
+      // 否则先读取版本历史再请求 files.json，保证记录的版本不会比实际文件新
+      int? manifestVersion;
+      var files = _appStoreManager.getCatalogFiles(app.id);
+      if (files != null) {
+        manifestVersion = _appStoreManager.getCatalogManifestVersion(app.id);
+      } else {
+        final history = await _fetchHistory(source, app.id);
+        manifestVersion = history?['version'] as int?;
+        files = await _fetchFileList(app.filesUrl, source.baseUrl);
+      }
       debugPrint('✅ [DownloadManager] 文件列表获取成功，共 ${files.length} 个文件');
 
       // 3. 创建安装任务
@@ -88,6 +103,9 @@ class DownloadManager extends ChangeNotifier {
       debugPrint('⬇️ [DownloadManager] 步骤5: 开始下载文件 (总计 ${files.length} 个)');
       await _downloadFilesConcurrently(appDir, files, source, app.id);
       debugPrint('✅ [DownloadManager] 所有文件下载完成');
+      if (manifestVersion != null) {
+        await _writeInstalledVersion(appDir, manifestVersion);
+      }
 
       // 6. 创建WebViewCard
       debugPrint('🃏 [DownloadManager] 步骤6: 创建 WebViewCard');
@@ -141,6 +159,159 @@ class DownloadManager extends ChangeNotifier {
     }
   }
 
+  /// 增量更新已安装的应用
+  ///
+  /// 根据源上的 files.history.json 只下载新增/修改的文件，并删除已移除的文件。
+  /// 源没有版本历史、本地没有版本记录或本地版本早于保留的增量时返回 false，
+  /// 调用方应改为重新完整安装
+  Future<bool> updateApp(MiniApp app) async {
+    if (_currentTask != null) {
+      throw Exception('Another installation is in progress');
+    }
+
+    final source = _appStoreManager.sources.firstWhere(
+      (s) => s.id == app.sourceId,
+      orElse: () => throw Exception('Source not found'),
+    );
+    final appDir = await _getAppDirectory(app.id);
+
+    final localVersion = await _readInstalledVersion(appDir);
+    final history = await _fetchHistory(source, app.id);
+    if (localVersion == null || history == null) {
+      debugPrint('⚠️ [DownloadManager] 无法增量更新 ${app.id}: 缺少版本信息');
+      return false;
+    }
+
+    final latestVersion = history['version'] as int;
+    if (localVersion == latestVersion) {
+      // 文件已是最新，只需更新应用版本记录
+      debugPrint('✅ [DownloadManager] ${app.id} 已是最新版本 v$latestVersion');
+      final installed = _appStoreManager.getInstalledApp(app.id);
+      await _appStoreManager.markAsInstalled(
+        app.id,
+        app.version,
+        app.sourceId,
+        installed?.cardId ?? '',
+      );
+      return true;
+    }
+
+    // 依次合并 localVersion -> latestVersion 的增量
+    final changed = <String, AppFile>{};
+    final removed = <String>{};
+    var version = localVersion;
+    for (final delta in (history['deltas'] as List<dynamic>)
+        .cast<Map<String, dynamic>>()) {
+      if (delta['from'] != version) continue;
+      for (final path in (delta['removed'] as List<dynamic>).cast<String>()) {
+        changed.remove(path);
+        removed.add(path);
+      }
+      for (final entry in [
+        ...(delta['added'] as List<dynamic>),
+        ...(delta['modified'] as List<dynamic>),
+      ].cast<Map<String, dynamic>>()) {
+        final file = AppFile.fromJson(entry);
+        changed[file.path] = file;
+        removed.remove(file.path);
+      }
+      version = delta['to'] as int;
+    }
+    if (version != latestVersion) {
+      debugPrint('⚠️ [DownloadManager] ${app.id} 本地版本 v$localVersion 过旧，需要完整安装');
+      return false;
+    }
+
+    debugPrint(
+      '🔄 [DownloadManager] 增量更新 ${app.id}: v$localVersion -> v$latestVersion '
+      '(下载 ${changed.length} 个文件, 删除 ${removed.length} 个文件)',
+    );
+
+    final files = changed.values.toList();
+    _currentTask = InstallTask(
+      appId: app.id,
+      appName: app.title,
+      files: files,
+      startTime: DateTime.now(),
+    );
+    notifyListeners();
+
+    try {
+      await _downloadFilesConcurrently(appDir, files, source, app.id);
+
+      for (final path in removed) {
+        final file = File('${appDir.path}/$path');
+        if (await file.exists()) {
+          await file.delete();
+        }
+      }
+
+      await _writeInstalledVersion(appDir, latestVersion);
+
+      final installed = _appStoreManager.getInstalledApp(app.id);
+      await _appStoreManager.markAsInstalled(
+        app.id,
+        app.version,
+        app.sourceId,
+        installed?.cardId ?? '',
+      );
+
+      _currentTask!.status = InstallTaskStatus.completed;
+      notifyListeners();
+      Future.delayed(const Duration(seconds: 2), () {
+        _currentTask = null;
+        notifyListeners();
+      });
+      return true;
+    } catch (e) {
+      debugPrint('❌ [DownloadManager] 增量更新失败: $e');
+      if (_currentTask != null) {
+        _currentTask!.status = InstallTaskStatus.failed;
+        _currentTask!.error = e.toString();
+        notifyListeners();
+      }
+      rethrow;
+    }
+  }
+
+  /// 获取版本历史（源未提供时返回 null）
+  Future<Map<String, dynamic>?> _fetchHistory(
+    AppStoreSource source,
+    String appId,
+  ) async {
+    try {
+      final url =
+          '${source.baseUrl.replaceAll(RegExp(r'\/+$'), '')}/$appId/$_historyFile';
+      final response = await _httpClient
+          .get(Uri.parse(url))
+          .timeout(const Duration(seconds: 30));
+      if (response.statusCode != 200) return null;
+      return json.decode(utf8.decode(response.bodyBytes))
+          as Map<String, dynamic>;
+    } catch (e) {
+      debugPrint('⚠️ [DownloadManager] 获取版本历史失败: $e');
+      return null;
+    }
+  }
+
+  /// 读取本地已安装的版本号
+  Future<int?> _readInstalledVersion(Directory appDir) async {
+    final file = File('${appDir.path}/$_installedManifestFile');
+    if (!await file.exists()) return null;
+    try {
+      final data = json.decode(await file.readAsString());
+      return data['version'] as int?;
+    } catch (_) {
+      return null;
+    }
+  }
+
+  /// 记录本地已安装的版本号
+  Future<void> _writeInstalledVersion(Directory appDir, int version) async {
+    final file = File('${appDir.path}/$_installedManifestFile');
+    await file.writeAsString(json.encode({'version': version}));
+  }
+
   /// 获取文件列表
   Future<List<AppFile>> _fetchFileList(String filesUrl, String baseUrl) async {
     try {
@@ -340,22 +340,35 @@ class HabitGroupListRemoteViewsFactory(
     }
 
     /**
-     * 从Flutter assets加载图标PNG
+     * 从Flutter assets加载图标
      * @param iconName 图标名称 (不带.png后缀)
      * @return Bitmap对象，如果加载失败返回null
      */
     private fun loadIconFromAssets(iconName: String): android.graphics.Bitmap? {
-        return try {
-            // Flutter assets的路径前缀为 flutter_assets/
-            val assetPath = "flutter_assets/assets/icons/material/$iconName.png"
-            Log.d(TAG, "Loading icon: $assetPath")
-
-            context.assets.open(assetPath).use { inputStream ->
-                BitmapFactory.decodeStream(inputStream)
+        // 优先从图集加载，没有图集时读取单独的 PNG
+        MaterialIconAtlas.load(context, iconName)?.let { return it }
+
+        // Flutter assets的路径前缀为 flutter_assets/
+        // copy_icons.py --densities 会生成 2.0x/3.0x/4.0x 子目录，按屏幕密度选择最接近且不小于的变体，
+        // 没有变体时使用主资源
+        val baseDir = "flutter_assets/assets/icons/material"
+        val density = context.resources.displayMetrics.density
+        val candidates = listOf(1f to "", 2f to "2.0x/", 3f to "3.0x/", 4f to "4.0x/")
+            .dropWhile { (scale, _) -> scale < density }
+            .map { (_, dir) -> "$baseDir/$dir$iconName.png" }
+            .plus("$baseDir/$iconName.png")
+            .distinct()
+        for (assetPath in candidates) {
+            try {
+                Log.d(TAG, "Loading icon: $assetPath")
+                context.assets.open(assetPath).use { inputStream ->
+                    BitmapFactory.decodeStream(inputStream)
+                }?.let { return it }
+            } catch (e: Exception) {
+                Log.d(TAG, "Icon not available at $assetPath: ${e.message}")
             }
-        } catch (e: Exception) {
-            Log.w(TAG, "Failed to load icon '$iconName': ${e.message}")
-            null
         }
+        Log.w(TAG, "Failed to load icon '$iconName'")
+        return null
     }
 }
@@ -0,0 +1,82 @@
+package github.hunmer.memento.widgets.services
+
+import android.content.Context
+import android.graphics.Bitmap
+import android.graphics.BitmapRegionDecoder
+import android.graphics.Rect
+import android.util.Log
+import org.json.JSONObject
+
+/**
+ * Material Icons 图集
+ * 读取 scripts/copy_icons.py --atlas 生成的 flutter_assets/assets/icons/material_atlas/，
+ * 只解码图标所在的区域，避免每个图标单独打开一个 PNG
+ */
+object MaterialIconAtlas {
+    private const val TAG = "MaterialIconAtlas"
+    private const val ATLAS_DIR = "flutter_assets/assets/icons/material_atlas"
+    private const val INDEX_FORMAT = 1
+
+    private data class Entry(val sheet: Int, val rect: Rect)
+
+    private var loaded = false
+    private var sheetFiles: List<String> = emptyList()
+    private var entries: Map<String, Entry> = emptyMap()
+    private val decoders = mutableMapOf<Int, BitmapRegionDecoder>()
+
+    /**
+     * 从图集中加载图标
+     * @param iconName 图标名称 (不带.png后缀)
+     * @return Bitmap对象，图集不存在或不包含该图标时返回null
+     */
+    @Synchronized
+    fun load(context: Context, iconName: String): Bitmap? {
+        if (!loaded) {
+            loadIndex(context)
+        }
+        val entry = entries[iconName] ?: return null
+        return try {
+            val decoder = decoders.getOrPut(entry.sheet) {
+                context.assets.open("$ATLAS_DIR/${sheetFiles[entry.sheet]}").use { inputStream ->
+                    @Suppress("DEPRECATION")
+                    BitmapRegionDecoder.newInstance(inputStream, false)
+                }
+            }
+            decoder.decodeRegion(entry.rect, null)
+        } catch (e: Exception) {
+            Log.w(TAG, "Failed to decode icon '$iconName' from atlas: ${e.message}")
+            null
+        }
+    }
+
+    private fun loadIndex(context: Context) {
+        loaded = true
+        try {
+            val json = context.assets.open("$ATLAS_DIR/index.json").bufferedReader().use { it.readText() }
+            val index = JSONObject(json)
+            if (index.optInt("format") != INDEX_FORMAT) {
+                Log.w(TAG, "Unsupported atlas index format: ${index.optInt("format")}")
+                return
+            }
+            val sheets = index.getJSONArray("sheets")
+            sheetFiles = (0 until sheets.length()).map { sheets.getJSONObject(it).getString("file") }
+
+            val icons = index.getJSONObject("icons")
+            val result = HashMap<String, Entry>(icons.length())
+            val keys = icons.keys()
+            while (keys.hasNext()) {
+                val name = keys.next()
+                // [图集序号, x, y, 宽, 高]
+                val item = icons.getJSONArray(name)
+                val x = item.getInt(1)
+                val y = item.getInt(2)
+                result[name] = Entry(item.getInt(0), Rect(x, y, x + item.getInt(3), y + item.getInt(4)))
+            }
+            entries = result
+            Log.d(TAG, "Loaded atlas index: ${entries.size} icons in ${sheetFiles.size} sheets")
+        } catch (e: Exception) {
+            // 未打包图集时使用单独的 PNG
+            Log.d(TAG, "Icon atlas not available: ${e.message}")
+        }
+    }
+}
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+Memento 仓库 - 文件列表生成基准测试
+
+功能：
+- 按配置生成合成应用目录树（文件数量、大小分布、重复内容比例）
+- 分别测量 generate_files_json.py 的扫描、哈希、写入阶段，以及冷/热缓存下的完整流程
+- 报告 files/s、MB/s、各阶段耗时和峰值内存（RSS）
+- 结果写入 JSON，便于不同版本之间对比
+
+使用方法：
+    python3 benchmark_files_json.py                                  # 默认：4 个应用 × 2000 个文件
+    python3 benchmark_files_json.py --apps 10 --files 10000          # 更大的目录树
+    python3 benchmark_files_json.py --sizes fixed:4096               # 固定大小
+    python3 benchmark_files_json.py --sizes uniform:1024:1048576     # 均匀分布
+    python3 benchmark_files_json.py --sizes lognormal:16384:1.5      # 对数正态分布（中位数, sigma）
+    python3 benchmark_files_json.py --duplicates 0.3                 # 30% 的文件与已有文件内容相同
+    python3 benchmark_files_json.py --jobs 8 --output bench.json     # 多线程并写入结果
+
+注意：合成文件刚写入，哈希阶段读取的是页缓存中的数据；各阶段的逐文件输出被丢弃，不计入终端 I/O。
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import random
+import shutil
+import platform
+import tempfile
+import argparse
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Dict, Optional, Tuple
+
+from generate_files_json import (
+    FileHashCache,
+    collect_item_hashes,
+    generate_files_json_for_type,
+    hash_file,
+    iter_item_files,
+    parse_hash_algorithms,
+    write_item_manifest,
+    _completed,
+)
+
+# 峰值内存：resource 只在类 Unix 系统可用
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+FILES_PER_DIR = 64
+MAX_SYNTHETIC_FILE_SIZE = 64 * 1024 * 1024
+SYNTHETIC_EXTENSIONS = ('.js', '.css', '.html', '.json', '.png', '.woff2', '.svg', '.wasm')
+
+
+def parse_size_distribution(spec: str):
+    """
+    解析大小分布参数，返回 rng -> 字节数 的采样函数
+
+    支持 fixed:N、uniform:MIN:MAX、lognormal:MEDIAN:SIGMA
+    """
+    kind, _, rest = spec.partition(':')
+    params = rest.split(':') if rest else []
+    try:
+        if kind == 'fixed' and len(params) == 1:
+            size = int(params[0])
+            return lambda rng: size
+        if kind == 'uniform' and len(params) == 2:
+            low, high = int(params[0]), int(params[1])
+            return lambda rng: rng.randint(low, high)
+        if kind == 'lognormal' and len(params) == 2:
+            mu, sigma = math.log(float(params[0])), float(params[1])
+            return lambda rng: min(int(rng.lognormvariate(mu, sigma)), MAX_SYNTHETIC_FILE_SIZE)
+    except ValueError:
+        pass
+    raise ValueError(f"无效的大小分布: {spec}（可用: fixed:N, uniform:MIN:MAX, lognormal:MEDIAN:SIGMA）")
+
+
+def build_synthetic_tree(base_path: Path, apps: int, files: int, sample_size, duplicates: float,
+                         seed: int) -> Dict[str, int]:
+    """
+    生成 base_path/apps/<app>/... 合成目录树
+
+    Returns:
+        数据集统计（应用数、文件数、总字节数、重复文件数）
+    """
+    rng = random.Random(seed)
+    stats = {'apps': apps, 'files': 0, 'bytes': 0, 'duplicate_files': 0}
+    written: List[Path] = []
+
+    for app_index in range(apps):
+        app_path = base_path / 'apps' / f'bench_app_{app_index:03d}'
+        for index in range(files):
+            if index % FILES_PER_DIR == 0:
+                sub_dir = app_path / 'assets' / f'd{index // FILES_PER_DIR:04d}'
+                sub_dir.mkdir(parents=True, exist_ok=True)
+            file_path = sub_dir / f'file_{index:06d}{SYNTHETIC_EXTENSIONS[index % len(SYNTHETIC_EXTENSIONS)]}'
+
+            if written and rng.random() < duplicates:
+                shutil.copyfile(rng.choice(written), file_path)
+                stats['duplicate_files'] += 1
+            else:
+                with open(file_path, 'wb') as f:
+                    f.write(rng.randbytes(max(1, sample_size(rng))))
+                written.append(file_path)
+
+            stats['files'] += 1
+            stats['bytes'] += file_path.stat().st_size
+
+    return stats
+
+
+def peak_rss_mb() -> Optional[float]:
+    """当前进程启动以来的累计峰值 RSS（MiB），平台不支持时返回 None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KiB 为单位，macOS 以字节为单位
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _rate(count: float, seconds: float) -> float:
+    return count / seconds if seconds > 0 else float('inf')
+
+
+def run_phases(base_path: Path, stats: Dict[str, int], jobs: int, chunking: bool,
+               algorithms: Tuple[str, ...], rounds: int) -> Dict[str, Dict[str, float]]:
+    """
+    分阶段测量，每个阶段重复 rounds 次取最快一次
+
+    scan: iter_item_files 遍历并 stat
+    hash: 对扫描结果计算哈希（collect_item_hashes，与正式流程相同）
+    write: write_item_manifest 序列化并写入 files.json
+    end_to_end_cold / end_to_end_cached: generate_files_json_for_type 完整流程（无缓存 / 缓存全部命中）
+
+    write 和 end_to_end_cold 每轮之前删除已生成的 files.json（不计时），否则 write_if_changed
+    发现内容相同后只做字节比较，测不到真正的写入。
+
+    内存：peak_rss_mb 是进程启动以来的累计峰值，rss_growth_mb 是该阶段使累计峰值增长的量
+    （峰值在之前的阶段已达到时为 0）。
+    """
+    type_path = base_path / 'apps'
+    item_paths = sorted(p for p in type_path.iterdir() if p.is_dir())
+    total_mb = stats['bytes'] / (1024 * 1024)
+    executor = ThreadPoolExecutor(max_workers=jobs) if jobs > 1 else None
+    phases: Dict[str, Dict[str, float]] = {}
+
+    def best_of(func, setup=None):
+        best = float('inf')
+        result = None
+        for _ in range(rounds):
+            if setup is not None:
+                setup()
+            start = time.perf_counter()
+            result = func()
+            best = min(best, time.perf_counter() - start)
+        return best, result
+
+    def remove_manifests():
+        for item_path in item_paths:
+            (item_path / 'files.json').unlink(missing_ok=True)
+
+    def record(name: str, seconds: float, rss_before: Optional[float], **values):
+        rss_after = peak_rss_mb()
+        phases[name] = {'seconds': seconds, 'files_per_s': _rate(stats['files'], seconds), **values,
+                        'peak_rss_mb': rss_after,
+                        'rss_growth_mb': None if rss_after is None else rss_after - rss_before}
+
+    try:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            def scan():
+                return [(item_path, list(iter_item_files(item_path))) for item_path in item_paths]
+
+            rss_before = peak_rss_mb()
+            seconds, scanned = best_of(scan)
+            record('scan', seconds, rss_before)
+
+            def hash_files():
+                manifests = []
+                for item_path, entries in scanned:
+                    pending = [
+                        (relative, path, None, stat.st_size,
+                         executor.submit(hash_file, path, chunking, algorithms) if executor is not None
+                         else _completed(hash_file(path, chunking, algorithms)))
+                        for relative, path, stat in entries
+                    ]
+                    manifests.append((item_path, pending))
+                return [(item_path, collect_item_hashes(pending)) for item_path, pending in manifests]
+
+            rss_before = peak_rss_mb()
+            seconds, manifests = best_of(hash_files)
+            record('hash', seconds, rss_before, mb_per_s=_rate(total_mb, seconds))
+
+            def write():
+                return sum(1 for item_path, files_info in manifests if write_item_manifest(item_path, files_info))
+
+            rss_before = peak_rss_mb()
+            seconds, _ = best_of(write, remove_manifests)
+            record('write', seconds, rss_before)
+
+            def end_to_end_cold():
+                return generate_files_json_for_type(base_path, 'apps', executor=executor,
+                                                    chunking=chunking, algorithms=algorithms)
+
+            rss_before = peak_rss_mb()
+            seconds, _ = best_of(end_to_end_cold, remove_manifests)
+            record('end_to_end_cold', seconds, rss_before, mb_per_s=_rate(total_mb, seconds))
+
+            cache = FileHashCache(base_path / '.bench_cache.json', base_path)
+            generate_files_json_for_type(base_path, 'apps', cache=cache, executor=executor,
+                                         chunking=chunking, algorithms=algorithms)
+
+            def end_to_end_cached():
+                return generate_files_json_for_type(base_path, 'apps', cache=cache, executor=executor,
+                                                    chunking=chunking, algorithms=algorithms)
+
+            rss_before = peak_rss_mb()
+            seconds, _ = best_of(end_to_end_cached)
+            record('end_to_end_cached', seconds, rss_before)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    return phases
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Memento 仓库 - 文件列表生成基准测试',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+示例:
+  %(prog)s                                    # 默认：4 个应用 × 2000 个文件
+  %(prog)s --apps 10 --files 10000            # 10 万个文件
+  %(prog)s --sizes lognormal:16384:1.5        # 对数正态大小分布
+  %(prog)s --duplicates 0.3                   # 30%% 重复内容
+  %(prog)s --jobs 8 --output bench.json       # 多线程并写入 JSON 结果
+        """
+    )
+    parser.add_argument('--apps', type=int, default=4, help='合成应用数量（默认为 4）')
+    parser.add_argument('--files', type=int, default=2000, help='每个应用的文件数量（默认为 2000）')
+    parser.add_argument('--sizes', type=str, default='lognormal:8192:1.5',
+                        help='文件大小分布: fixed:N, uniform:MIN:MAX, lognormal:MEDIAN:SIGMA（默认为 lognormal:8192:1.5）')
+    parser.add_argument('--duplicates', type=float, default=0.1, help='与已有文件内容相同的比例 0-1（默认为 0.1）')
+    parser.add_argument('--seed', type=int, default=1, help='随机种子（默认为 1），相同参数生成相同的目录树')
+    parser.add_argument('--jobs', '-j', type=int, default=1, help='哈希线程数（默认为 1）')
+    parser.add_argument('--chunks', action='store_true', help='同时生成内容定义分块')
+    parser.add_argument('--hash', type=str, default='md5', help='整文件哈希算法，逗号分隔（默认为 md5）')
+    parser.add_argument('--rounds', type=int, default=1, help='每个阶段重复次数，取最快一次（默认为 1）')
+    parser.add_argument('--workdir', type=str, help='合成目录树的位置（默认为临时目录，结束后删除）')
+    parser.add_argument('--output', type=str, help='把结果写入 JSON 文件')
+    args = parser.parse_args()
+
+    try:
+        sample_size = parse_size_distribution(args.sizes)
+        algorithms = parse_hash_algorithms(args.hash)
+    except ValueError as e:
+        parser.error(str(e))
+    if not 0 <= args.duplicates <= 1:
+        parser.error('--duplicates 必须在 0 到 1 之间')
+
+    with contextlib.ExitStack() as stack:
+        if args.workdir:
+            base_path = Path(args.workdir).resolve()
+            if base_path.exists():
+                parser.error(f'--workdir 已存在: {base_path}')
+        else:
+            base_path = Path(stack.enter_context(tempfile.TemporaryDirectory(prefix='files_json_bench_')))
+
+        print("=" * 60)
+        print("⏱️  文件列表生成基准测试")
+        print("=" * 60)
+        print(f"📁 目录: {base_path}")
+        print(f"🧪 {args.apps} 个应用 × {args.files} 个文件, 大小分布 {args.sizes}, 重复比例 {args.duplicates}")
+
+        start = time.perf_counter()
+        stats = build_synthetic_tree(base_path, args.apps, args.files, sample_size, args.duplicates, args.seed)
+        print(f"🏗️  生成完成: {stats['files']} 个文件, {stats['bytes'] / (1024 * 1024):.1f} MiB "
+              f"({time.perf_counter() - start:.1f} s)")
+
+        phases = run_phases(base_path, stats, args.jobs, args.chunks, algorithms, args.rounds)
+
+    print(f"\n{'阶段':<20}{'耗时 (s)':>10}{'files/s':>14}{'MB/s':>10}{'RSS 增长 (MiB)':>16}")
+    for name, values in phases.items():
+        mb_per_s = f"{values['mb_per_s']:.1f}" if 'mb_per_s' in values else '-'
+        growth = f"{values['rss_growth_mb']:.1f}" if values['rss_growth_mb'] is not None else '-'
+        print(f"{name:<20}{values['seconds']:>10.3f}{values['files_per_s']:>14.0f}{mb_per_s:>10}{growth:>16}")
+    rss = peak_rss_mb()
+    if rss is not None:
+        print(f"\n💾 累计峰值 RSS: {rss:.1f} MiB")
+
+    results = {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'config': {
+            'apps': args.apps,
+            'files_per_app': args.files,
+            'sizes': args.sizes,
+            'duplicates': args.duplicates,
+            'seed': args.seed,
+            'jobs': args.jobs,
+            'chunks': args.chunks,
+            'hash': list(algorithms),
+            'rounds': args.rounds,
+        },
+        'dataset': stats,
+        'phases': phases,
+        'peak_rss_mb': rss,
+    }
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"\n✅ 结果已写入: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
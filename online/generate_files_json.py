@@ -6,6 +6,7 @@ Memento 仓库 - 文件列表生成工具
 - 自动扫描指定目录下的所有应用和脚本
 - 计算每个文件的 MD5 和大小
 - 生成 files.json 文件
+- 使用持久化的 stat 缓存，未变化的文件不再重复计算 MD5
 
 使用方法：
     python3 generate_files_json.py
@@ -14,185 +15,2433 @@ Memento 仓库 - 文件列表生成工具
     python3 generate_files_json.py --app password_manager  # 只处理指定应用
     python3 generate_files_json.py --script ai_encouragement_bot  # 只处理指定脚本
     python3 generate_files_json.py --dry-run              # 预览不写入
+    python3 generate_files_json.py --rehash               # 忽略缓存，重新计算全部 MD5
+    python3 generate_files_json.py --jobs 8               # 多线程并行计算哈希
+    python3 generate_files_json.py --chunks               # 为大文件生成分块列表（增量更新）
+    python3 generate_files_json.py --hash md5,sha256      # 单次读取同时计算多个哈希
+    python3 generate_files_json.py --benchmark-hashes     # 测量本机各哈希算法速度
+    python3 generate_files_json.py --dedup                # 跨应用内容去重（共享 blob 存储）
+    python3 generate_files_json.py --compress             # 生成 gzip/br/zstd 预压缩文件
+    python3 generate_files_json.py --catalog              # 生成单请求加载的聚合目录
+    python3 generate_files_json.py --app my_app --watch   # 监听变化并增量更新
+    python3 generate_files_json.py --history              # 记录版本号和版本间增量
+    python3 generate_files_json.py --pack                 # 每个应用/脚本生成单文件归档
+    python3 generate_files_json.py --benchmark-scan 100000  # 测量目录扫描速度
+    python3 generate_files_json.py --quiet --metrics-json metrics.json  # CI：只输出摘要和各阶段指标
+    python3 generate_files_json.py --progress --profile run.prof        # 单行进度 + cProfile
+    python3 generate_files_json.py --verify --verify-report report.json # 发布前校验 files.json 与磁盘一致
+
+忽略规则：
+    每个应用/脚本目录可以放置 .filesignore（gitignore 语法），
+    在默认规则（files.json、README.md、隐藏文件等）之后生效，可用 !README.md 重新包含。
 """
 
 import os
 import sys
 import json
+import time
 import hashlib
+import gzip
+import mmap
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
 import argparse
+import re
+import heapq
+import tempfile
+import threading
+import contextlib
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Iterable, Optional, Tuple
+
+# 可选依赖：未安装时只生成 gzip 预压缩文件
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# 默认缓存文件（位于仓库根目录，不会被扫描到任何应用/脚本中）
+DEFAULT_CACHE_FILE = '.files_json_cache.json'
+CACHE_VERSION = 1
+
+# 哈希读取缓冲区大小，超过 MMAP_THRESHOLD 的文件改用 mmap 直接交给 hashlib
+HASH_BUFFER_SIZE = 1024 * 1024
+MMAP_THRESHOLD = 8 * 1024 * 1024
+
+# 默认只计算 MD5；--hash 可追加 sha256、blake2b 等算法
+DEFAULT_HASH_ALGORITHMS = ('md5',)
+# 跨应用去重：共享 blob 存储目录（相对仓库根目录），以及内容地址优先使用的摘要
+BLOB_STORE_DIR = 'blobs'
+DEDUP_REPORT_FILE = 'dedup_report.json'
+DEDUP_MIN_SIZE = 1024
+# blob 内容地址的候选算法（按优先级）；--hash 中都没有时额外计算 sha256，不使用 MD5
+BLOB_HASH_PREFERENCE = ('sha256', 'blake2b', 'sha512')
+
+# 预压缩：编码 -> 文件后缀；只压缩文本类文件，压缩后不小于原大小 90% 的视为无收益
+COMPRESSION_SUFFIXES = {'gzip': '.gz', 'br': '.br', 'zstd': '.zst'}
+COMPRESSIBLE_EXTENSIONS = {
+    '.html', '.htm', '.js', '.mjs', '.css', '.json', '.map', '.svg',
+    '.txt', '.xml', '.md', '.wasm', '.ttf', '.otf', '.ico',
+}
+COMPRESS_MIN_SIZE = 1024
+COMPRESS_MAX_RATIO = 0.9
+# 记录 --compress 生成了哪些变体（隐藏文件，不会进入 files.json）；未记录的 .gz/.br/.zst 视为普通资源
+COMPRESSED_VARIANTS_FILE = '.compressed_variants.json'
+
+# 聚合目录：合并 apps.json、scripts.json 和所有 files.json，客户端一次请求即可加载整个商店
+CATALOG_FILE = 'catalog.json'
+CATALOG_BINARY_FILE = 'catalog.msgpack'
+CATALOG_FORMAT = 1
+CATALOG_SOURCES = {'apps': 'apps.json', 'scripts': 'scripts.json'}
+
+# 监听模式：事件防抖时间和轮询回退的扫描间隔（秒）
+WATCH_DEBOUNCE = 0.15
+WATCH_POLL_INTERVAL = 0.5
+
+# 版本历史：保留上一版 files.json，并记录最近若干个版本之间的增量
+HISTORY_FILE = 'files.history.json'
+PREVIOUS_MANIFEST_FILE = 'files.prev.json'
+RECORDED_MANIFEST_FILE = 'files.recorded.json'
+HISTORY_MAX_DELTAS = 20
+
+# 忽略规则：默认规则在前，应用/脚本目录下 .filesignore 中的规则在后（gitignore 语法，后者优先）
+IGNORE_FILE = '.filesignore'
+DEFAULT_IGNORE_RULES = (
+    'files.json',          # 文件列表本身
+    'files.prev.json',     # 上一版文件列表
+    'files.recorded.json', # 版本历史记录的当前版本文件列表
+    'files.history.json',  # 版本历史与增量
+    'files.pack',          # 单文件打包
+    'files.*.tmp',         # 原子写入的临时文件
+    'Thumbs.db',           # Windows 系统文件
+    'README.md',           # 说明文档
+    'LICENSE',             # 许可证文件
+    '.*',                  # 隐藏文件和目录（.DS_Store、.gitignore、.gitkeep 等）
+)
+
+# 输出与指标
+OUTPUT_MODES = ('normal', 'quiet', 'progress')
+PROGRESS_INTERVAL = 0.1
+SLOWEST_FILES_LIMIT = 20
+METRICS_FORMAT = 1
+
+# 流式写入：序列化结果按块与现有文件比较，块大小同时也是写入缓冲
+WRITE_CHUNK_SIZE = 64 * 1024
+
+# 校验报告格式版本
+VERIFY_REPORT_FORMAT = 1
+
+# 打包：每个应用/脚本一个归档，头部为 JSON 索引，客户端可整包下载或按 Range 读取单个文件
+PACK_FILE = 'files.pack'
+PACK_MAGIC = b'MPAK'
+PACK_FORMAT = 1
+PACK_PREFIX = struct.Struct('>4sHI')  # magic, 格式版本, 索引长度
+
+BENCHMARK_HASH_ALGORITHMS = ('md5', 'sha1', 'sha256', 'sha512', 'blake2b', 'blake2s', 'sha3_256')
+
+# 内容定义分块（CDC）参数：只对不小于 CHUNK_MIN_FILE_SIZE 的文件生成分块列表
+CHUNK_MIN_SIZE = 4 * 1024
+CHUNK_AVG_BITS = 14  # 平均分块约 16 KiB
+CHUNK_MAX_SIZE = 64 * 1024
+CHUNK_MIN_FILE_SIZE = 64 * 1024
+CHUNK_HASH = 'sha256'
+
+# Gear 表：由固定种子派生，保证不同机器、不同版本之间切分结果一致
+_GEAR = [
+    int.from_bytes(hashlib.md5(f'memento-cdc-{i}'.encode()).digest()[:8], 'big')
+    for i in range(256)
+]
+_U64 = 0xFFFFFFFFFFFFFFFF
+_CHUNK_MASK = ((1 << CHUNK_AVG_BITS) - 1) << (64 - CHUNK_AVG_BITS)
+
+
+def parse_hash_algorithms(value: str) -> Tuple[str, ...]:
+    """
+    解析 --hash 参数（逗号分隔），md5 始终保留在首位以兼容旧客户端
+
+    Raises:
+        ValueError: 包含 hashlib 不支持或长度不固定的算法
+    """
+    algorithms = ['md5']
+    for name in value.split(','):
+        name = name.strip().lower()
+        if not name or name in algorithms:
+            continue
+        if name not in hashlib.algorithms_available or name.startswith('shake_'):
+            raise ValueError(f"不支持的哈希算法: {name}")
+        algorithms.append(name)
+    return tuple(algorithms)
+
+
+def calculate_hashes(file_path: str, algorithms: Tuple[str, ...] = DEFAULT_HASH_ALGORITHMS) -> Dict[str, str]:
+    """
+    单次读取文件，同时计算多个哈希值
+
+    所有哈希对象共享同一个读取缓冲区，文件只读一遍。
+
+    Args:
+        file_path: 文件路径
+        algorithms: 哈希算法名称列表
+
+    Returns:
+        算法名 -> 十六进制摘要，失败时返回空字典
+    """
+    hashers = [hashlib.new(name) for name in algorithms]
+    try:
+        with open(file_path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size >= MMAP_THRESHOLD:
+                # 大文件使用 mmap，避免逐块复制到 Python 对象
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    for hasher in hashers:
+                        hasher.update(mm)
+            else:
+                # 分块读取到复用的缓冲区，避免大文件占用过多内存
+                buffer = bytearray(HASH_BUFFER_SIZE)
+                view = memoryview(buffer)
+                while True:
+                    n = f.readinto(buffer)
+                    if not n:
+                        break
+                    chunk = view[:n]
+                    for hasher in hashers:
+                        hasher.update(chunk)
+        return {name: hasher.hexdigest() for name, hasher in zip(algorithms, hashers)}
+    except Exception as e:
+        print(f"  ❌ 计算哈希失败: {file_path} - {e}")
+        return {}
 
 
 def calculate_md5(file_path: str) -> str:
     """计算文件的 MD5 值"""
-    hash_md5 = hashlib.md5()
+    return calculate_hashes(file_path, ('md5',)).get('md5', '')
+
+
+def benchmark_hash_algorithms(algorithms: Tuple[str, ...], size_mb: int = 64, rounds: int = 3,
+                              combined: Tuple[str, ...] = ()) -> Dict[str, float]:
+    """
+    在本机测量各哈希算法的吞吐量（MB/s），用于挑选足够安全且最便宜的算法
+
+    Args:
+        algorithms: 要测试的算法
+        size_mb: 测试数据大小（MiB）
+        rounds: 每个算法重复次数，取最快一次
+        combined: 额外测量这组算法单次遍历组合计算的吞吐量
+
+    Returns:
+        算法名 -> MB/s
+    """
+    data = os.urandom(size_mb * 1024 * 1024)
+    view = memoryview(data)
+    results = {}
+
+    for name in algorithms:
+        best = float('inf')
+        for _ in range(rounds):
+            hasher = hashlib.new(name)
+            start = time.perf_counter()
+            for offset in range(0, len(data), HASH_BUFFER_SIZE):
+                hasher.update(view[offset:offset + HASH_BUFFER_SIZE])
+            hasher.hexdigest()
+            best = min(best, time.perf_counter() - start)
+        results[name] = size_mb / best if best > 0 else float('inf')
+
+    # 组合计算（单次遍历更新所有算法）的吞吐量
+    if len(combined) > 1:
+        best = float('inf')
+        for _ in range(rounds):
+            hashers = [hashlib.new(name) for name in combined]
+            start = time.perf_counter()
+            for offset in range(0, len(data), HASH_BUFFER_SIZE):
+                chunk = view[offset:offset + HASH_BUFFER_SIZE]
+                for hasher in hashers:
+                    hasher.update(chunk)
+            for hasher in hashers:
+                hasher.hexdigest()
+            best = min(best, time.perf_counter() - start)
+        results['+'.join(combined)] = size_mb / best if best > 0 else float('inf')
+
+    return results
+
+
+def find_chunk_boundaries(data) -> List[Tuple[int, int]]:
+    """
+    使用 Gear 滚动哈希对数据做内容定义分块
+
+    切分点只取决于附近的内容，文件中间插入或删除字节时，
+    其余分块的边界和哈希保持不变，客户端只需拉取变化的分块。
+
+    Args:
+        data: bytes / mmap 等支持切片的缓冲区
+
+    Returns:
+        (offset, length) 列表
+    """
+    boundaries = []
+    total = len(data)
+    gear = _GEAR
+    mask = _CHUNK_MASK
+    start = 0
+
+    while start < total:
+        end = min(start + CHUNK_MAX_SIZE, total)
+        cut = end
+        if end - start > CHUNK_MIN_SIZE:
+            h = 0
+            for i, byte in enumerate(data[start + CHUNK_MIN_SIZE:end], start + CHUNK_MIN_SIZE):
+                h = ((h << 1) + gear[byte]) & _U64
+                if not h & mask:
+                    cut = i + 1
+                    break
+        boundaries.append((start, cut - start))
+        start = cut
+
+    return boundaries
+
+
+def calculate_chunks(data) -> List[Dict[str, any]]:
+    """计算分块列表（offset、length 和强哈希）"""
+    view = memoryview(data)
     try:
-        with open(file_path, "rb") as f:
-            # 分块读取，避免大文件占用过多内存
-            for chunk in iter(lambda: f.read(4096), b""):
-                hash_md5.update(chunk)
-        return hash_md5.hexdigest()
+        return [
+            {
+                "offset": offset,
+                "length": length,
+                CHUNK_HASH: hashlib.new(CHUNK_HASH, view[offset:offset + length]).hexdigest(),
+            }
+            for offset, length in find_chunk_boundaries(data)
+        ]
+    finally:
+        view.release()
+
+
+class RunMetrics:
+    """
+    一次运行的性能指标：各阶段耗时、哈希字节数、最慢的文件
+
+    哈希在线程池中进行，记录方法加锁；阶段耗时为墙钟时间，
+    hash_cpu 为各文件哈希耗时之和（多线程时大于 hash）。
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.files_scanned = 0
+        self.files_hashed = 0
+        self.files_done = 0
+        self.bytes_hashed = 0
+        self.hash_cpu = 0.0
+        self._slowest: List[Tuple[float, str, int]] = []
+        self._lock = threading.Lock()
+        self._last_progress = 0.0
+
+    def add_time(self, phase: str, seconds: float):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def record_hash(self, file_path: str, size: int, seconds: float):
+        with self._lock:
+            self.files_hashed += 1
+            self.bytes_hashed += size
+            self.hash_cpu += seconds
+            item = (seconds, file_path, size)
+            if len(self._slowest) < SLOWEST_FILES_LIMIT:
+                heapq.heappush(self._slowest, item)
+            elif item > self._slowest[0]:
+                heapq.heapreplace(self._slowest, item)
+
+    def file_done(self):
+        """collect 阶段每完成一个文件调用一次，进度模式下节流刷新进度行"""
+        self.files_done += 1
+        if OUTPUT_MODE == 'progress':
+            now = time.perf_counter()
+            if now - self._last_progress >= PROGRESS_INTERVAL or self.files_done == self.files_scanned:
+                self._last_progress = now
+                sys.stderr.write(f"\r  ⏳ {self.files_done}/{self.files_scanned} 个文件, "
+                                 f"已哈希 {self.bytes_hashed / (1024 * 1024):.1f} MiB")
+                sys.stderr.flush()
+
+    def finish_progress(self):
+        if OUTPUT_MODE == 'progress' and self._last_progress:
+            sys.stderr.write('\n')
+            sys.stderr.flush()
+            self._last_progress = 0.0
+
+    def to_dict(self, base_path: Optional[Path] = None, cache: Optional['FileHashCache'] = None) -> Dict[str, any]:
+        def display(path: str) -> str:
+            if base_path is not None:
+                try:
+                    return Path(path).relative_to(base_path).as_posix()
+                except ValueError:
+                    pass
+            return path
+
+        elapsed = time.perf_counter() - self.started
+        hash_seconds = self.phases.get('hash', 0.0)
+        return {
+            'format': METRICS_FORMAT,
+            'elapsed_seconds': elapsed,
+            'phases': dict(sorted(self.phases.items())),
+            'hash_cpu_seconds': self.hash_cpu,
+            'files': {
+                'scanned': self.files_scanned,
+                'hashed': self.files_hashed,
+                'cached': cache.hits if cache is not None else 0,
+            },
+            'bytes_hashed': self.bytes_hashed,
+            'hash_mb_per_s': self.bytes_hashed / (1024 * 1024) / hash_seconds if hash_seconds > 0 else None,
+            'slowest_files': [
+                {'path': display(path), 'seconds': seconds, 'size': size}
+                for seconds, path, size in sorted(self._slowest, reverse=True)
+            ],
+        }
+
+
+OUTPUT_MODE = 'normal'
+# --verify-report - 时 stdout 只输出 JSON 报告，常规信息改写到 stderr
+INFO_TO_STDERR = False
+METRICS = RunMetrics()
+
+
+def set_output_mode(mode: str):
+    """设置输出模式：normal 逐文件输出，quiet 只输出警告和摘要，progress 额外显示单行进度"""
+    global OUTPUT_MODE
+    if mode not in OUTPUT_MODES:
+        raise ValueError(f"未知的输出模式: {mode}")
+    OUTPUT_MODE = mode
+
+
+def info(message: str = ''):
+    """输出逐文件/逐项目的常规信息，quiet/progress 模式下不输出（警告和错误直接 print）"""
+    if OUTPUT_MODE == 'normal':
+        print(message, file=sys.stderr if INFO_TO_STDERR else sys.stdout)
+
+
+def _timed_iter(iterable, phase: str):
+    """包装生成器，把每次取下一个元素的耗时计入指定阶段"""
+    iterator = iter(iterable)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            METRICS.add_time(phase, time.perf_counter() - start)
+            return
+        METRICS.add_time(phase, time.perf_counter() - start)
+        yield item
+
+
+def _hash_file_timed(file_path: str, size: int, chunking: bool,
+                     algorithms: Tuple[str, ...]) -> Dict[str, any]:
+    """hash_file 并记录耗时和字节数（可在线程池中调用）"""
+    start = time.perf_counter()
+    fields = hash_file(file_path, chunking, algorithms)
+    METRICS.record_hash(file_path, size, time.perf_counter() - start)
+    return fields
+
+
+def hash_file(file_path: str, chunking: bool = False,
+              algorithms: Tuple[str, ...] = DEFAULT_HASH_ALGORITHMS) -> Dict[str, any]:
+    """
+    计算文件的哈希字段
+
+    Args:
+        file_path: 文件路径
+        chunking: 是否同时生成分块列表（仅对足够大的文件生效）
+        algorithms: 整文件哈希算法
+
+    Returns:
+        哈希字段字典（各算法摘要，可能包含 chunks），失败时返回空字典
+    """
+    if not chunking or get_file_size(file_path) < CHUNK_MIN_FILE_SIZE:
+        return calculate_hashes(file_path, algorithms)
+
+    try:
+        with open(file_path, "rb") as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            fields = {name: hashlib.new(name, mm).hexdigest() for name in algorithms}
+            fields["chunks"] = calculate_chunks(mm)
+            return fields
     except Exception as e:
-        print(f"  ❌ 计算 MD5 失败: {file_path} - {e}")
-        return ""
+        print(f"  ❌ 计算分块失败: {file_path} - {e}")
+        return {}
+
+
+def get_file_size(file_path: str) -> int:
+    """获取文件大小（字节）"""
+    try:
+        return os.path.getsize(file_path)
+    except Exception as e:
+        print(f"  ❌ 获取文件大小失败: {file_path} - {e}")
+        return 0
+
+
+class FileHashCache:
+    """
+    持久化的文件哈希缓存
+
+    以 相对路径 + size + mtime_ns + inode 作为指纹，指纹未变化的文件
+    直接复用上次计算的 MD5，只有新增或修改过的文件才会重新读取计算。
+    """
+
+    FINGERPRINT_KEYS = ('size', 'mtime_ns', 'ino')
+
+    def __init__(self, cache_path: Path, base_path: Path, rehash: bool = False):
+        self.cache_path = cache_path
+        self.base_path = base_path
+        self.rehash = rehash
+        self.entries: Dict[str, Dict[str, any]] = {}
+        self.hits = 0
+        self.misses = 0
+        self._seen = set()
+        self._scanned_prefixes = set()
+        self._base_prefix = os.path.join(os.fspath(base_path), '')
+
+    def load(self):
+        """从磁盘加载缓存，文件损坏或版本不符时视为空缓存"""
+        if self.rehash or not self.cache_path.exists():
+            return
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == CACHE_VERSION:
+                self.entries = data.get('files', {})
+        except Exception as e:
+            print(f"  ⚠️  读取缓存失败，将重新计算: {self.cache_path} - {e}")
+            self.entries = {}
+
+    def save(self):
+        """写回缓存，并清理已扫描目录中不再存在的条目"""
+        entries = {
+            key: value for key, value in self.entries.items()
+            if key in self._seen
+            or not any(key.startswith(prefix) for prefix in self._scanned_prefixes)
+        }
+        tmp_path = self.cache_path.with_name(self.cache_path.name + '.tmp')
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': CACHE_VERSION, 'files': entries}, f,
+                          ensure_ascii=False, separators=(',', ':'), sort_keys=True)
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            print(f"  ⚠️  写入缓存失败: {self.cache_path} - {e}")
+
+    def mark_scanned(self, item_path: Path):
+        """记录本次扫描过的应用/脚本目录，用于清理过期条目"""
+        self._scanned_prefixes.add(self._key(item_path) + '/')
+
+    def _key(self, file_path) -> str:
+        path = os.fspath(file_path)
+        if path.startswith(self._base_prefix):
+            path = path[len(self._base_prefix):]
+        return path.replace(os.sep, '/')
+
+    def lookup(self, file_path, stat: os.stat_result,
+               required: Tuple[str, ...] = ('md5',)) -> Optional[Dict[str, any]]:
+        """指纹一致且包含所需字段时返回缓存的哈希字段，否则返回 None"""
+        key = self._key(file_path)
+        self._seen.add(key)
+        entry = self.entries.get(key)
+        if (entry
+                and entry.get('size') == stat.st_size
+                and entry.get('mtime_ns') == stat.st_mtime_ns
+                and entry.get('ino') == stat.st_ino
+                and all(field in entry for field in required)):
+            self.hits += 1
+            return {k: v for k, v in entry.items() if k not in self.FINGERPRINT_KEYS}
+        self.misses += 1
+        return None
+
+    def store(self, file_path, stat: os.stat_result, fields: Dict[str, any], merge: bool = False):
+        """
+        记录文件的指纹和哈希字段（md5、sha256、chunks 等）
+
+        merge 为 True 且指纹未变时，保留旧条目中本次没有计算的字段。
+        """
+        key = self._key(file_path)
+        self._seen.add(key)
+        previous = self.entries.get(key)
+        if (merge and previous
+                and all(previous.get(k) == v for k, v in
+                        zip(self.FINGERPRINT_KEYS, (stat.st_size, stat.st_mtime_ns, stat.st_ino)))):
+            fields = {**{k: v for k, v in previous.items() if k not in self.FINGERPRINT_KEYS}, **fields}
+        self.entries[key] = {
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'ino': stat.st_ino,
+            **fields,
+        }
+
+
+def load_compressed_variants(item_path: Path) -> set:
+    """读取应用/脚本目录中由 --compress 生成的变体相对路径；记录不存在或损坏时返回空集合"""
+    try:
+        with open(os.path.join(item_path, COMPRESSED_VARIANTS_FILE), 'r', encoding='utf-8') as f:
+            return set(json.load(f))
+    except (OSError, ValueError, TypeError):
+        return set()
+
+
+def _translate_glob(pattern: str) -> str:
+    """把 gitignore 风格的通配符转换为正则（不含锚点）"""
+    out = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == '*':
+            if pattern.startswith('**/', i):
+                out.append('(?:.*/)?')
+                i += 3
+                continue
+            if pattern.startswith('**', i):
+                out.append('.*')
+                i += 2
+                continue
+            out.append('[^/]*')
+        elif c == '?':
+            out.append('[^/]')
+        elif c == '[':
+            end = pattern.find(']', i + 2 if pattern.startswith('[!', i) or pattern.startswith('[]', i) else i + 1)
+            if end == -1:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith('!'):
+                    body = '^' + body[1:]
+                out.append('[' + body.replace('\\', '\\\\') + ']')
+                i = end
+        elif c == '\\' and i + 1 < n:
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return ''.join(out)
+
+
+class IgnoreRules:
+    """
+    编译后的 gitignore 风格忽略规则
+
+    支持 # 注释、! 取反、结尾 / 只匹配目录、开头或中间的 / 锚定到应用/脚本根目录、
+    * ? [...] ** 通配符。规则在构造时编译一次；没有取反规则时合并为单个正则。
+    匹配对象是相对于应用/脚本目录、使用正斜杠的路径。
+    """
+
+    def __init__(self, lines):
+        self.rules: List[Tuple[re.Pattern, bool, bool]] = []
+        for raw in lines:
+            line = raw.rstrip('\n').rstrip('\r')
+            if not line.endswith('\\ '):
+                line = line.rstrip()
+            if not line or line.startswith('#'):
+                continue
+            negate = line.startswith('!')
+            if negate:
+                line = line[1:]
+            elif line.startswith('\\#') or line.startswith('\\!'):
+                line = line[1:]
+            dir_only = line.endswith('/')
+            line = line.rstrip('/')
+            if not line:
+                continue
+            anchored = '/' in line
+            line = line.lstrip('/')
+            regex = ('^' if anchored else '^(?:.*/)?') + _translate_glob(line) + '$'
+            self.rules.append((re.compile(regex), negate, dir_only))
+
+        # 快速路径：没有取反规则时，任一规则命中即忽略
+        self._combined = {}
+        if not any(negate for _, negate, _ in self.rules):
+            for is_dir in (False, True):
+                patterns = [regex.pattern for regex, _, dir_only in self.rules if is_dir or not dir_only]
+                self._combined[is_dir] = re.compile('|'.join(f'(?:{p})' for p in patterns)) if patterns else None
+
+    def match(self, relative_path: str, is_dir: bool = False) -> bool:
+        """判断相对路径是否被忽略（最后一条命中的规则生效）"""
+        if self._combined:
+            combined = self._combined[is_dir]
+            return combined is not None and combined.match(relative_path) is not None
+        for regex, negate, dir_only in reversed(self.rules):
+            if dir_only and not is_dir:
+                continue
+            if regex.match(relative_path):
+                return not negate
+        return False
+
+
+_default_ignore_rules: Optional[IgnoreRules] = None
+_ignore_rules_cache: Dict[str, Tuple[Tuple[int, int], IgnoreRules]] = {}
+
+
+def default_ignore_rules() -> IgnoreRules:
+    """默认忽略规则（只编译一次）"""
+    global _default_ignore_rules
+    if _default_ignore_rules is None:
+        _default_ignore_rules = IgnoreRules(DEFAULT_IGNORE_RULES)
+    return _default_ignore_rules
+
+
+def load_ignore_rules(item_path: Path) -> IgnoreRules:
+    """
+    读取应用/脚本目录下的 .filesignore，与默认规则合并编译
+
+    结果按 .filesignore 的 mtime/大小缓存，监听模式下修改规则文件后会重新编译。
+    """
+    ignore_path = os.path.join(item_path, IGNORE_FILE)
+    try:
+        st = os.stat(ignore_path)
+    except OSError:
+        return default_ignore_rules()
+
+    fingerprint = (st.st_mtime_ns, st.st_size)
+    cached = _ignore_rules_cache.get(ignore_path)
+    if cached is not None and cached[0] == fingerprint:
+        return cached[1]
+    try:
+        with open(ignore_path, 'r', encoding='utf-8') as f:
+            rules = IgnoreRules(DEFAULT_IGNORE_RULES + tuple(f.read().splitlines()))
+    except (OSError, UnicodeDecodeError) as e:
+        print(f"  ⚠️  读取忽略规则失败，使用默认规则: {ignore_path} - {e}")
+        return default_ignore_rules()
+    _ignore_rules_cache[ignore_path] = (fingerprint, rules)
+    return rules
+
+
+def should_ignore_file(file_name: str) -> bool:
+    """判断文件是否应该被忽略（按默认规则）"""
+    return default_ignore_rules().match(file_name)
+
+
+def iter_item_files(item_path: Path, rules: Optional[IgnoreRules] = None):
+    """
+    遍历应用/脚本目录，按确定顺序逐个产出 (相对路径, 文件路径, stat)
+
+    基于 os.scandir：目录判断使用 d_type，不额外 stat；每个文件只 stat 一次，
+    结果交给调用方复用。顺序与 os.walk 自顶向下、文件和子目录分别排序一致。
+    被忽略的目录整体跳过，不会进入；指向目录的符号链接不跟随。
+    --compress 生成并记录在 .compressed_variants.json 中的变体不会产出。
+
+    Args:
+        item_path: 应用/脚本目录路径
+        rules: 忽略规则，默认读取目录下的 .filesignore
+
+    Yields:
+        (使用正斜杠的相对路径, 文件绝对路径字符串, os.stat_result)
+    """
+    if rules is None:
+        rules = load_ignore_rules(item_path)
+    match = rules.match
+    generated = load_compressed_variants(item_path)
+
+    # 栈中保存 (目录路径, 相对路径前缀)，子目录逆序入栈以保持深度优先的排序顺序
+    stack = [(os.fspath(item_path), '')]
+    while stack:
+        dir_path, prefix = stack.pop()
+        try:
+            with os.scandir(dir_path) as it:
+                entries = list(it)
+        except OSError:
+            continue
+
+        files = []
+        dirs = []
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                continue
+            relative = prefix + entry.name
+            if is_dir:
+                if not entry.is_symlink() and not match(relative, True):
+                    dirs.append((entry.name, entry.path, relative + '/'))
+            elif not match(relative) and relative not in generated:
+                files.append((entry.name, relative, entry))
+
+        files.sort(key=lambda item: item[0])
+        for _, relative, entry in files:
+            try:
+                stat = entry.stat()
+            except OSError as e:
+                print(f"  ❌ 获取文件信息失败: {entry.path} - {e}")
+                continue
+            yield relative, entry.path, stat
+
+        dirs.sort(key=lambda item: item[0], reverse=True)
+        stack.extend((path, relative) for _, path, relative in dirs)
+
+
+def list_item_files(item_path: Path) -> List[Tuple[str, str, os.stat_result]]:
+    """
+    遍历应用/脚本目录，返回按确定顺序排列的 (相对路径, 文件路径, stat) 列表
+
+    Args:
+        item_path: 应用/脚本目录路径
+
+    Returns:
+        文件列表
+    """
+    return list(iter_item_files(item_path))
+
+
+def benchmark_directory_scan(file_count: int, rounds: int = 3) -> Dict[str, float]:
+    """
+    生成合成目录树，对比 os.walk 基线实现与 scandir 扫描器的速度
+
+    基线复现旧实现：os.walk + 排序 + 每个文件构造 Path、relative_to、逐文件匹配忽略列表并 stat。
+
+    Args:
+        file_count: 合成文件数量
+        rounds: 重复次数，取最快一次
+
+    Returns:
+        指标字典（秒、files/s、加速比）
+    """
+    legacy_ignores = ['files.json', 'files.prev.json', 'files.history.json', 'files.pack',
+                      '.DS_Store', 'Thumbs.db', '.gitkeep', '.gitignore', 'README.md', 'LICENSE']
+
+    def legacy_scan(item_path: Path) -> int:
+        count = 0
+        for root, dirs, files in os.walk(item_path):
+            dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+            for file_name in sorted(files):
+                ignore_patterns = list(legacy_ignores)
+                if file_name in ignore_patterns or file_name.startswith('.'):
+                    continue
+                file_path = Path(root) / file_name
+                str(file_path.relative_to(item_path)).replace(os.sep, '/')
+                file_path.stat()
+                count += 1
+        return count
+
+    def scandir_scan(item_path: Path) -> int:
+        return sum(1 for _ in iter_item_files(item_path))
+
+    with tempfile.TemporaryDirectory(prefix='files_json_scan_') as tmp:
+        item_path = Path(tmp) / 'bench_app'
+        per_dir = 100
+        for index in range(file_count):
+            sub = item_path / f"d{index // (per_dir * per_dir):03d}" / f"s{(index // per_dir) % per_dir:03d}"
+            if index % per_dir == 0:
+                sub.mkdir(parents=True, exist_ok=True)
+            (sub / f"file_{index:07d}.js").touch()
+        (item_path / 'README.md').touch()
+        (item_path / '.DS_Store').touch()
+
+        results = {'files': file_count}
+        for name, scan in (('os.walk', legacy_scan), ('scandir', scandir_scan)):
+            best = float('inf')
+            for _ in range(rounds):
+                start = time.perf_counter()
+                found = scan(item_path)
+                best = min(best, time.perf_counter() - start)
+            if found != file_count:
+                raise RuntimeError(f"{name} 扫描结果数量不符: {found} != {file_count}")
+            results[f'{name}_seconds'] = best
+            results[f'{name}_files_per_s'] = file_count / best if best > 0 else float('inf')
+        results['speedup'] = results['os.walk_seconds'] / results['scandir_seconds'] if results['scandir_seconds'] > 0 else float('inf')
+    return results
+
+
+def _completed(value) -> Future:
+    """包装一个已完成的 Future，使串行模式与线程池模式共用同一套收集逻辑"""
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+def submit_item_hashes(item_path: Path, cache: Optional[FileHashCache] = None,
+                       executor: Optional[ThreadPoolExecutor] = None,
+                       chunking: bool = False,
+                       algorithms: Tuple[str, ...] = DEFAULT_HASH_ALGORITHMS) -> List[Tuple]:
+    """
+    遍历应用/脚本目录，并把需要计算的哈希提交到线程池
+
+    Args:
+        item_path: 应用/脚本目录路径
+        cache: 文件哈希缓存（可选），命中时跳过哈希计算
+        executor: 线程池（可选），为空时在当前线程计算
+        chunking: 是否生成分块列表
+        algorithms: 整文件哈希算法
+
+    Returns:
+        待收集的 (相对路径, 文件路径, stat, 大小, 哈希字段 Future) 列表
+    """
+    pending = []
+
+    if cache is not None:
+        cache.mark_scanned(item_path)
+
+    # 生成器逐个产出文件，线程池模式下边遍历边计算哈希；遍历耗时计入 walk，其余计入 hash
+    submit_start = time.perf_counter()
+    walk_before = METRICS.phases.get('walk', 0.0)
+    for relative_path_str, file_path, stat in _timed_iter(iter_item_files(item_path), 'walk'):
+        METRICS.files_scanned += 1
+        file_size = stat.st_size
+        if cache is not None:
+            required = algorithms + ('chunks',) if chunking and file_size >= CHUNK_MIN_FILE_SIZE else algorithms
+            fields = cache.lookup(file_path, stat, required)
+            if fields is not None:
+                # 只输出本次请求的字段，缓存中多余的字段保留在缓存里
+                fields = {k: fields[k] for k in required}
+                pending.append((relative_path_str, file_path, None, file_size, _completed(fields)))
+                continue
+
+        if executor is not None:
+            future = executor.submit(_hash_file_timed, file_path, file_size, chunking, algorithms)
+        else:
+            future = _completed(_hash_file_timed(file_path, file_size, chunking, algorithms))
+        pending.append((relative_path_str, file_path, stat, file_size, future))
+
+    METRICS.add_time('hash', time.perf_counter() - submit_start - (METRICS.phases.get('walk', 0.0) - walk_before))
+    return pending
+
+
+def collect_item_hashes(pending: List[Tuple], cache: Optional[FileHashCache] = None) -> List[Dict[str, any]]:
+    """
+    按提交顺序收集 MD5 结果，生成文件列表
+
+    Args:
+        pending: submit_item_hashes 的返回值
+        cache: 文件哈希缓存（可选），新计算的哈希写回缓存
+
+    Returns:
+        文件信息列表
+    """
+    files_info = []
+
+    for relative_path_str, file_path, stat, file_size, future in pending:
+        info(f"  📄 处理文件: {relative_path_str}")
+
+        wait_start = time.perf_counter()
+        fields = future.result()
+        METRICS.add_time('hash', time.perf_counter() - wait_start)
+        METRICS.file_done()
+        md5_hash = fields.get("md5", "")
+        if cache is not None and stat is not None and md5_hash:
+            cache.store(file_path, stat, fields, merge=True)
+
+        if md5_hash and file_size > 0:
+            # path/md5/size 保持在最前，旧客户端只读取这三个字段
+            entry = {
+                "path": relative_path_str,
+                "md5": md5_hash,
+                "size": file_size
+            }
+            entry.update((k, v) for k, v in fields.items() if k != "md5")
+            files_info.append(entry)
+            chunk_note = f", Chunks: {len(entry['chunks'])}" if "chunks" in entry else ""
+            info(f"    ✓ MD5: {md5_hash}, Size: {file_size} bytes{chunk_note}")
+        else:
+            print(f"  ⚠️  跳过无效文件: {relative_path_str}")
+
+    return files_info
+
+
+def scan_item_directory(item_path: Path, cache: Optional[FileHashCache] = None,
+                        executor: Optional[ThreadPoolExecutor] = None,
+                        chunking: bool = False,
+                        algorithms: Tuple[str, ...] = DEFAULT_HASH_ALGORITHMS) -> List[Dict[str, any]]:
+    """
+    扫描应用/脚本目录，生成文件列表
+
+    Args:
+        item_path: 应用/脚本目录路径
+        cache: 文件哈希缓存（可选），命中时跳过 MD5 计算
+        executor: 线程池（可选），用于并行计算 MD5
+        chunking: 是否生成分块列表
+        algorithms: 整文件哈希算法
+
+    Returns:
+        文件信息列表
+    """
+    return collect_item_hashes(submit_item_hashes(item_path, cache, executor, chunking, algorithms), cache)
+
+
+def collect_type_manifests(base_path: Path, item_type: str, item_name: Optional[str] = None,
+                           cache: Optional[FileHashCache] = None,
+                           executor: Optional[ThreadPoolExecutor] = None,
+                           chunking: bool = False,
+                           algorithms: Tuple[str, ...] = DEFAULT_HASH_ALGORITHMS) -> List[Tuple[str, Path, List[Dict[str, any]]]]:
+    """
+    扫描指定类型（apps/scripts）下的应用/脚本，生成内存中的文件列表
+
+    Args:
+        base_path: 仓库根目录
+        item_type: 类型 (apps/scripts)
+        item_name: 指定应用/脚本名称（可选）
+        cache: 文件哈希缓存（可选）
+        executor: 线程池（可选），所有应用/脚本的文件一次性提交，跨目录并行计算
+        chunking: 是否为大文件生成内容定义分块列表（用于增量更新）
+        algorithms: 整文件哈希算法（md5 之外的结果也写入 files.json）
+
+    Returns:
+        (目录名, 目录路径, 文件信息列表) 列表，没有有效文件的目录不包含在内
+    """
+    type_path = base_path / item_type
+
+    if not type_path.exists():
+        print(f"\n⚠️  跳过: {item_type} 目录不存在")
+        return []
+
+    # 如果指定了名称，只处理该应用/脚本
+    if item_name:
+        item_dirs = [item_name]
+    else:
+        # 获取所有子目录（排除特殊目录）
+        item_dirs = [
+            d for d in os.listdir(type_path)
+            if os.path.isdir(type_path / d) and not d.startswith('.')
+        ]
+
+    # 第一阶段：遍历所有目录并提交哈希任务，使线程池可以跨应用/脚本并行
+    submitted = []
+    for item_dir in sorted(item_dirs):
+        item_path = type_path / item_dir
+
+        # 确认目录存在
+        if not item_path.exists() or not item_path.is_dir():
+            print(f"\n⚠️  跳过: {item_dir} (不是有效目录)")
+            continue
+
+        submitted.append((item_dir, item_path, submit_item_hashes(item_path, cache, executor, chunking, algorithms)))
+
+    # 第二阶段：按目录顺序收集结果，输出与串行模式完全一致
+    manifests = []
+    for item_dir, item_path, pending in submitted:
+        info(f"\n{'='*60}")
+        item_label = "应用" if item_type == "apps" else "脚本"
+        info(f"📦 处理{item_label}: {item_dir}")
+        info(f"{'='*60}")
+
+        # 收集扫描结果
+        files_info = collect_item_hashes(pending, cache)
+
+        if not files_info:
+            print(f"  ⚠️  未找到有效文件，跳过: {item_type}/{item_dir}")
+            continue
+
+        manifests.append((item_dir, item_path, files_info))
+
+    return manifests
+
+
+def iter_json_bytes(obj, **kwargs) -> Iterable[bytes]:
+    """
+    流式序列化为 UTF-8 字节块，输出与 json.dumps(obj, **kwargs) 完全相同
+
+    iterencode 产出大量小片段，这里合并为约 WRITE_CHUNK_SIZE 大小的块。
+    """
+    buffer = []
+    size = 0
+    for piece in json.JSONEncoder(**kwargs).iterencode(obj):
+        buffer.append(piece)
+        size += len(piece)
+        if size >= WRITE_CHUNK_SIZE:
+            yield ''.join(buffer).encode('utf-8')
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer).encode('utf-8')
+
+
+def _copy_prefix(src, dst, length: int):
+    src.seek(0)
+    while length > 0:
+        data = src.read(min(WRITE_CHUNK_SIZE, length))
+        if not data:
+            raise IOError("文件在写入过程中被截断")
+        dst.write(data)
+        length -= len(data)
+
+
+def write_if_changed(path: Path, chunks: Iterable[bytes]) -> bool:
+    """
+    原子地写入文件，内容与现有文件完全相同时不写入
+
+    新内容边生成边与现有文件逐块比较；一直相同则不创建任何文件，mtime 和 ETag 保持不变。
+    出现第一处差异时才创建临时文件（先复制相同的前缀），写完后 fsync 并 rename 覆盖，
+    中途崩溃不会留下截断的文件。
+
+    Returns:
+        是否实际写入
+    """
+    tmp_path = path.with_name(path.name + '.tmp')
+    try:
+        existing = open(path, 'rb')
+    except FileNotFoundError:
+        existing = None
+    out = None
+    matched = 0
+    try:
+        for chunk in chunks:
+            if out is None and existing is not None:
+                if existing.read(len(chunk)) == chunk:
+                    matched += len(chunk)
+                    continue
+            if out is None:
+                out = open(tmp_path, 'wb')
+                if matched:
+                    _copy_prefix(existing, out, matched)
+            out.write(chunk)
+
+        if out is None:
+            if existing is not None and not existing.read(1):
+                return False
+            # 新内容是现有文件的前缀（或文件不存在）
+            out = open(tmp_path, 'wb')
+            if matched:
+                _copy_prefix(existing, out, matched)
+
+        out.flush()
+        os.fsync(out.fileno())
+        out.close()
+        os.replace(tmp_path, path)
+        return True
+    except BaseException:
+        if out is not None:
+            out.close()
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+        raise
+    finally:
+        if existing is not None:
+            existing.close()
+        if out is not None and not out.closed:
+            out.close()
+
+
+def write_item_manifest(item_path: Path, files_info: List[Dict[str, any]], dry_run: bool = False) -> bool:
+    """
+    写入单个应用/脚本的 files.json
+
+    流式序列化（格式与 json.dumps(indent=2) 相同），内容未变化时不改写文件；
+    条目顺序即扫描顺序（目录内按文件名排序、深度优先），相同输入总是得到相同的字节。
+
+    Args:
+        item_path: 应用/脚本目录路径
+        files_info: 文件信息列表
+        dry_run: 是否为预览模式
+
+    Returns:
+        是否成功（预览模式、内容未变化均视为成功）
+    """
+    json_path = item_path / "files.json"
+
+    if dry_run:
+        print(f"\n  🔍 [预览模式] 将写入到: {json_path}\n")
+        for chunk in iter_json_bytes(files_info, indent=2, ensure_ascii=False):
+            sys.stdout.write(chunk.decode('utf-8'))
+        sys.stdout.write('\n')
+        return True
+
+    # 序列化与写入交替进行，总耗时计入 write，其中 serialize 单独统计
+    def timed_chunks():
+        iterator = iter_json_bytes(files_info, indent=2, ensure_ascii=False)
+        while True:
+            start = time.perf_counter()
+            chunk = next(iterator, None)
+            METRICS.add_time('serialize', time.perf_counter() - start)
+            if chunk is None:
+                return
+            yield chunk
+
+    try:
+        start = time.perf_counter()
+        written = write_if_changed(json_path, timed_chunks())
+        METRICS.add_time('write', time.perf_counter() - start)
+        if written:
+            info(f"\n  ✅ 成功生成: {json_path}")
+        else:
+            info(f"\n  ⏭️  内容未变化，跳过写入: {json_path}")
+        info(f"  📊 文件总数: {len(files_info)}")
+        info(f"  💾 总大小: {sum(f['size'] for f in files_info)} bytes")
+        return True
+    except Exception as e:
+        print(f"  ❌ 写入失败: {e}")
+        return False
+
+
+def generate_files_json_for_type(base_path: Path, item_type: str, item_name: Optional[str] = None, dry_run: bool = False,
+                                 cache: Optional[FileHashCache] = None,
+                                 executor: Optional[ThreadPoolExecutor] = None,
+                                 chunking: bool = False,
+                                 algorithms: Tuple[str, ...] = DEFAULT_HASH_ALGORITHMS) -> int:
+    """
+    生成指定类型（apps/scripts）的 files.json 文件
+
+    Args:
+        base_path: 仓库根目录
+        item_type: 类型 (apps/scripts)
+        item_name: 指定应用/脚本名称（可选）
+        dry_run: 是否为预览模式
+        cache: 文件哈希缓存（可选）
+        executor: 线程池（可选），所有应用/脚本的文件一次性提交，跨目录并行计算
+        chunking: 是否为大文件生成内容定义分块列表（用于增量更新）
+        algorithms: 整文件哈希算法（md5 之外的结果也写入 files.json）
+
+    Returns:
+        处理的应用/脚本数量
+    """
+    manifests = collect_type_manifests(base_path, item_type, item_name, cache, executor, chunking, algorithms)
+    return sum(
+        1 for _, item_path, files_info in manifests
+        if write_item_manifest(item_path, files_info, dry_run)
+    )
+
+
+def submit_manifest_verification(item_path: Path, cache: Optional[FileHashCache] = None,
+                                 executor: Optional[ThreadPoolExecutor] = None) -> Tuple[List[Dict[str, any]], List[Tuple]]:
+    """
+    校验单个应用/脚本的 files.json：先比较大小，大小一致时才提交哈希任务
+
+    Returns:
+        (已发现的问题列表, 待收集的 (路径, 条目, 文件路径, stat, 哈希字段 Future, 是否来自缓存) 列表)
+    """
+    problems = []
+    pending = []
+
+    try:
+        with open(item_path / 'files.json', 'r', encoding='utf-8') as f:
+            entries = json.load(f)
+        if not isinstance(entries, list):
+            raise ValueError('files.json 顶层不是数组')
+    except FileNotFoundError:
+        return [{'path': 'files.json', 'issue': 'manifest_missing'}], []
+    except (OSError, ValueError) as e:
+        return [{'path': 'files.json', 'issue': 'manifest_invalid', 'detail': str(e)}], []
+
+    if cache is not None:
+        cache.mark_scanned(item_path)
+
+    # 遍历一次工作区：既用于发现未列出的文件，也复用其中的 stat 结果
+    on_disk = {relative: (file_path, stat) for relative, file_path, stat in iter_item_files(item_path)}
+    listed = set()
+
+    for entry in entries:
+        relative = entry.get('path') if isinstance(entry, dict) else None
+        if not isinstance(relative, str) or not relative or relative.startswith('/') or '..' in relative.split('/'):
+            problems.append({'path': str(relative), 'issue': 'invalid_entry'})
+            continue
+        if relative in listed:
+            problems.append({'path': relative, 'issue': 'duplicate_entry'})
+            continue
+        listed.add(relative)
+
+        file_path, stat = on_disk.get(relative, (None, None))
+        if stat is None:
+            # 被忽略规则排除但确实存在的文件（如 .filesignore 改动前生成的条目）仍按列出的内容校验
+            file_path = os.path.join(item_path, *relative.split('/'))
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                problems.append({'path': relative, 'issue': 'missing'})
+                continue
+
+        if stat.st_size != entry.get('size'):
+            problems.append({'path': relative, 'issue': 'size_mismatch',
+                             'expected': entry.get('size'), 'actual': stat.st_size})
+            continue
+
+        # 条目中出现的所有整文件摘要（md5 以及 --hash 额外生成的 sha256 等）都要校验
+        algorithms = tuple(name for name in entry if name in hashlib.algorithms_available)
+        if 'md5' not in algorithms:
+            problems.append({'path': relative, 'issue': 'invalid_entry', 'detail': '缺少 md5'})
+            continue
+
+        fields = cache.lookup(file_path, stat, algorithms) if cache is not None else None
+        if fields is not None:
+            pending.append((relative, entry, file_path, stat, _completed(fields), True))
+        elif executor is not None:
+            pending.append((relative, entry, file_path, stat,
+                            executor.submit(_hash_file_timed, file_path, stat.st_size, False, algorithms), False))
+        else:
+            pending.append((relative, entry, file_path, stat,
+                            _completed(_hash_file_timed(file_path, stat.st_size, False, algorithms)), False))
+
+    problems.extend(
+        {'path': relative, 'issue': 'unlisted', 'actual': stat.st_size}
+        for relative, (_, stat) in on_disk.items() if relative not in listed
+    )
+    METRICS.files_scanned += len(pending)
+    return problems, pending
+
+
+def collect_manifest_verification(pending: List[Tuple], cache: Optional[FileHashCache] = None) -> List[Dict[str, any]]:
+    """按提交顺序收集哈希结果，返回摘要不一致或无法读取的问题列表"""
+    problems = []
+    for relative, entry, file_path, stat, future, from_cache in pending:
+        fields = future.result()
+        METRICS.file_done()
+        if not fields:
+            problems.append({'path': relative, 'issue': 'unreadable'})
+            continue
+        mismatched = [name for name in fields if name in entry and fields[name] != entry[name]]
+        if mismatched:
+            name = mismatched[0]
+            problems.append({'path': relative, 'issue': 'hash_mismatch', 'algorithm': name,
+                             'expected': entry[name], 'actual': fields[name]})
+        if cache is not None and not from_cache:
+            cache.store(file_path, stat, fields, merge=True)
+    return problems
+
+
+def verify_manifests(base_path: Path, types_to_process: List[str], item_names: Dict[str, Optional[str]],
+                     cache: Optional[FileHashCache] = None,
+                     executor: Optional[ThreadPoolExecutor] = None) -> Dict[str, any]:
+    """
+    并行校验所有选中应用/脚本的 files.json 与工作区是否一致
+
+    检查列出的每个文件是否存在、大小是否一致（不一致时不再计算哈希）、摘要是否一致，
+    并报告存在于目录中但没有列出的文件。所有目录的哈希任务一次性提交到线程池。
+
+    Returns:
+        机器可读的校验报告
+    """
+    submitted = []
+    for item_type in types_to_process:
+        type_path = base_path / item_type
+        if not type_path.is_dir():
+            continue
+        item_name = item_names.get(item_type)
+        item_dirs = [item_name] if item_name else sorted(
+            d for d in os.listdir(type_path) if os.path.isdir(type_path / d) and not d.startswith('.')
+        )
+        for item_dir in item_dirs:
+            item_path = type_path / item_dir
+            if not item_path.is_dir():
+                submitted.append((item_type, item_dir, [{'path': '', 'issue': 'item_missing'}], []))
+                continue
+            problems, pending = submit_manifest_verification(item_path, cache, executor)
+            submitted.append((item_type, item_dir, problems, pending))
+
+    report_items = []
+    files_checked = 0
+    for item_type, item_dir, problems, pending in submitted:
+        problems = problems + collect_manifest_verification(pending, cache)
+        files_checked += len(pending)
+        problems.sort(key=lambda problem: problem['path'])
+        for problem in problems:
+            detail = ''
+            if 'expected' in problem:
+                detail = f" (期望 {problem['expected']}, 实际 {problem['actual']})"
+            print(f"  ❌ {item_type}/{item_dir}/{problem['path']}: {problem['issue']}{detail}")
+        report_items.append({'type': item_type, 'item': item_dir, 'ok': not problems, 'problems': problems})
+    METRICS.finish_progress()
+
+    problem_count = sum(len(item['problems']) for item in report_items)
+    return {
+        'format': VERIFY_REPORT_FORMAT,
+        'ok': problem_count == 0,
+        'items_checked': len(report_items),
+        'files_checked': files_checked,
+        'problem_count': problem_count,
+        'items': report_items,
+    }
+
+
+def choose_blob_algorithm(algorithms: Tuple[str, ...]) -> str:
+    """选择本次运行统一使用的 blob 内容地址算法：--hash 中最强的候选，没有时为 sha256"""
+    for name in BLOB_HASH_PREFERENCE:
+        if name in algorithms:
+            return name
+    return BLOB_HASH_PREFERENCE[0]
+
+
+def blob_relative_path(digest: str) -> str:
+    """共享 blob 相对仓库根目录的路径"""
+    return f"{BLOB_STORE_DIR}/{digest[:2]}/{digest}"
+
+
+def build_blob_store(base_path: Path,
+                     manifests: List[Tuple[str, str, Path, List[Dict[str, any]]]],
+                     algorithm: str = BLOB_HASH_PREFERENCE[0],
+                     dry_run: bool = False) -> Dict[str, any]:
+    """
+    跨所有应用/脚本按内容去重，生成共享 blob 存储和去重报告
+
+    内容相同（摘要 + 大小一致）且出现不少于两次的文件会复制到
+    blobs/<前两位>/<摘要>，并在对应 files.json 条目中写入 "blob" 字段，
+    客户端可以按 blob 只下载一次再复制到各个应用目录。
+
+    Args:
+        base_path: 仓库根目录
+        manifests: (类型, 目录名, 目录路径, 文件信息列表) 列表，应覆盖整个仓库
+        algorithm: 内容地址算法，所有 blob 都以该算法的摘要命名（条目中必须包含该字段）
+        dry_run: 是否为预览模式（不写入 blob 和报告）
+
+    Returns:
+        去重报告
+    """
+    groups: Dict[Tuple[str, int], List[Tuple[Path, Dict[str, any], str]]] = {}
+    total_files = 0
+    total_bytes = 0
+
+    for item_type, item_dir, item_path, files_info in manifests:
+        for entry in files_info:
+            total_files += 1
+            total_bytes += entry['size']
+            if entry['size'] < DEDUP_MIN_SIZE:
+                continue
+            digest = entry.get(algorithm)
+            if not digest:
+                print(f"  ⚠️  缺少 {algorithm} 摘要，不参与去重: {item_type}/{item_dir}/{entry['path']}")
+                continue
+            groups.setdefault((digest, entry['size']), []).append(
+                (item_path / entry['path'], entry, f"{item_type}/{item_dir}/{entry['path']}")
+            )
+
+    duplicates = []
+    saved_bytes = 0
+    referenced = set()
+    store_path = base_path / BLOB_STORE_DIR
+
+    for (digest, size), members in sorted(groups.items()):
+        if len(members) < 2:
+            continue
+
+        relative = blob_relative_path(digest)
+        referenced.add(relative)
+        for _, entry, _ in members:
+            entry['blob'] = relative
+        saved_bytes += size * (len(members) - 1)
+        duplicates.append({
+            'hash': digest,
+            'size': size,
+            'copies': len(members),
+            'blob': relative,
+            'paths': [label for _, _, label in members],
+        })
+
+        if not dry_run:
+            store_blob(members[0][0], base_path / relative, algorithm, digest)
+
+    report = {
+        'algorithm': algorithm,
+        'total_files': total_files,
+        'total_bytes': total_bytes,
+        'unique_bytes': total_bytes - saved_bytes,
+        'saved_bytes': saved_bytes,
+        'duplicate_groups': duplicates,
+    }
+
+    print(f"\n{'='*60}")
+    print(f"🔗 跨应用去重: {len(duplicates)} 组重复内容，可节省 {saved_bytes} bytes")
+    for group in duplicates:
+        print(f"  • {group['blob']} × {group['copies']} ({group['size']} bytes)")
+
+    if dry_run:
+        print(f"  🔍 [预览模式] 不写入 blob 存储")
+        return report
+
+    # 清理不再被引用的 blob
+    if store_path.exists():
+        for blob_file in sorted(store_path.glob('*/*')):
+            relative = blob_file.relative_to(base_path).as_posix()
+            if relative not in referenced:
+                blob_file.unlink()
+                print(f"  🗑️  移除过期 blob: {relative}")
+        for shard in store_path.iterdir():
+            if shard.is_dir() and not any(shard.iterdir()):
+                shard.rmdir()
+
+    store_path.mkdir(parents=True, exist_ok=True)
+    report_path = store_path / DEDUP_REPORT_FILE
+    write_if_changed(report_path, iter_json_bytes(report, indent=2, ensure_ascii=False))
+    print(f"  ✅ 去重报告: {report_path}")
+
+    return report
+
+
+def store_blob(source: Path, target: Path, algorithm: str, digest: str):
+    """
+    把文件复制到 blob 存储
+
+    blob 是独立的副本而不是工作区文件的硬链接，原地修改应用文件不会改变已发布的 blob。
+    已存在的 blob 只在没有其他硬链接且摘要一致时复用，否则重新复制；
+    复制时边写边计算摘要，写入临时文件后 rename，源文件在此期间被修改则放弃写入。
+    """
+    if target.is_file() and target.stat().st_nlink == 1:
+        if calculate_hashes(str(target), (algorithm,)).get(algorithm) == digest:
+            return
+        print(f"  ⚠️  blob 内容与摘要不一致，重新写入: {target.name}")
+
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = target.with_name(target.name + '.tmp')
+    hasher = hashlib.new(algorithm)
+    try:
+        with open(source, 'rb') as src, open(tmp_path, 'wb') as dst:
+            for chunk in iter(lambda: src.read(HASH_BUFFER_SIZE), b''):
+                hasher.update(chunk)
+                dst.write(chunk)
+            dst.flush()
+            os.fsync(dst.fileno())
+        if hasher.hexdigest() != digest:
+            raise IOError(f"源文件在去重过程中被修改: {source}")
+        os.replace(tmp_path, target)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def available_encodings() -> Tuple[str, ...]:
+    """当前环境可用的预压缩编码（gzip 始终可用）"""
+    encodings = ['gzip']
+    if brotli is not None:
+        encodings.append('br')
+    if zstandard is not None:
+        encodings.append('zstd')
+    return tuple(encodings)
+
+
+def parse_encodings(value: str) -> Tuple[str, ...]:
+    """
+    解析 --compress 参数，auto 表示所有可用编码
+
+    Raises:
+        ValueError: 未知编码或缺少对应的可选依赖
+    """
+    if value == 'auto':
+        return available_encodings()
+    encodings = []
+    for name in value.split(','):
+        name = name.strip().lower()
+        if not name or name in encodings:
+            continue
+        if name not in COMPRESSION_SUFFIXES:
+            raise ValueError(f"不支持的压缩编码: {name}")
+        if name not in available_encodings():
+            raise ValueError(f"压缩编码 {name} 需要安装可选依赖 ({'brotli' if name == 'br' else 'zstandard'})")
+        encodings.append(name)
+    return tuple(encodings)
+
+
+class _VariantWriter:
+    """
+    把一种编码的压缩输出流式写入临时文件，同时统计大小和 MD5
+
+    使用最高压缩级别，输出与运行时间无关（gzip 头部 mtime 固定为 0，不写文件名）。
+    临时文件是隐藏文件，不会被扫描或触发监听；commit 时 rename 为目标文件。
+    """
+
+    def __init__(self, target: Path, encoding: str, source_size: int, dry_run: bool = False):
+        self.target = target
+        self.tmp_path = target.with_name(f".{target.name}.tmp")
+        self.dry_run = dry_run
+        self.size = 0
+        self.md5 = hashlib.md5()
+        self._out = open(os.devnull if dry_run else self.tmp_path, 'wb')
+
+        if encoding == 'gzip':
+            compressor = gzip.GzipFile(filename='', mode='wb', compresslevel=9, fileobj=self, mtime=0)
+            self.feed, self._flush = compressor.write, compressor.close
+        elif encoding == 'br':
+            compressor = brotli.Compressor(quality=11)
+            self.feed = lambda data: self.write(compressor.process(data))
+            self._flush = lambda: self.write(compressor.finish())
+        elif encoding == 'zstd':
+            compressor = zstandard.ZstdCompressor(level=19).compressobj(size=source_size)
+            self.feed = lambda data: self.write(compressor.compress(data))
+            self._flush = lambda: self.write(compressor.flush())
+        else:
+            self._out.close()
+            raise ValueError(f"不支持的压缩编码: {encoding}")
+
+    def write(self, data: bytes):
+        if data:
+            self._out.write(data)
+            self.md5.update(data)
+            self.size += len(data)
+
+    def finish(self):
+        self._flush()
+        if not self.dry_run:
+            self._out.flush()
+            os.fsync(self._out.fileno())
+        self._out.close()
+
+    def commit(self):
+        if not self.dry_run:
+            os.replace(self.tmp_path, self.target)
+
+    def discard(self):
+        self._out.close()
+        if not self.dry_run:
+            try:
+                os.unlink(self.tmp_path)
+            except OSError:
+                pass
+
+
+def variant_path(file_path: Path, encoding: str) -> Path:
+    """预压缩变体路径，如 index.js -> index.js.gz"""
+    return file_path.with_name(file_path.name + COMPRESSION_SUFFIXES[encoding])
+
+
+def compress_file_variants(file_path: Path, encodings: Tuple[str, ...], dry_run: bool = False) -> Dict[str, Dict[str, any]]:
+    """
+    为单个文件生成预压缩变体，没有收益的编码会删除已有的旧变体
+
+    源文件分块读取一遍，同时送入所有编码器；每个变体写入临时文件后原子替换，
+    不会把整个文件读入内存，中途失败也不会留下截断的变体。
+
+    Returns:
+        编码 -> {size, md5}
+    """
+    writers = []
+    try:
+        source_size = os.path.getsize(file_path)
+        for encoding in encodings:
+            writers.append((encoding, _VariantWriter(variant_path(file_path, encoding), encoding,
+                                                     source_size, dry_run)))
+        read_size = 0
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_BUFFER_SIZE), b''):
+                read_size += len(chunk)
+                for _, writer in writers:
+                    writer.feed(chunk)
+
+        variants = {}
+        for encoding, writer in writers:
+            writer.finish()
+            if writer.size > read_size * COMPRESS_MAX_RATIO:
+                writer.discard()
+                if not dry_run and writer.target.exists():
+                    writer.target.unlink()
+                continue
+            writer.commit()
+            variants[encoding] = {
+                "size": writer.size,
+                "md5": writer.md5.hexdigest(),
+            }
+        return variants
+    except BaseException:
+        for _, writer in writers:
+            writer.discard()
+        raise
+
+
+def load_previous_manifest(item_path: Path, file_name: str = "files.json") -> Dict[str, Dict[str, any]]:
+    """读取已有的 files.json（或其他同格式的文件列表），返回 路径 -> 条目；不存在或损坏时返回空字典"""
+    json_path = item_path / file_name
+    try:
+        with open(json_path, 'r', encoding='utf-8') as f:
+            return {entry['path']: entry for entry in json.load(f)}
+    except (OSError, ValueError, KeyError, TypeError):
+        return {}
+
+
+def compress_item_variants(item_path: Path, files_info: List[Dict[str, any]], encodings: Tuple[str, ...],
+                           min_size: int = COMPRESS_MIN_SIZE,
+                           executor: Optional[ThreadPoolExecutor] = None,
+                           dry_run: bool = False) -> Dict[str, int]:
+    """
+    为应用/脚本中的文本类文件生成 gzip/br/zstd 预压缩变体，并写入 files.json 条目的 "compressed" 字段
+
+    源文件 MD5 与上次生成的 files.json 一致且变体文件仍在时直接复用，不重新压缩。
+    生成的变体记录在目录下的 .compressed_variants.json 中：扫描时只排除这些文件，
+    清理时也只删除这些文件；与变体同名但未被记录的文件（如随应用发布的 data.json.gz）
+    视为普通资源，不会被覆盖或删除。
+
+    Args:
+        item_path: 应用/脚本目录路径
+        files_info: 文件信息列表（原地添加 compressed 字段）
+        encodings: 压缩编码
+        min_size: 小于该大小的文件不压缩
+        executor: 线程池（可选）
+        dry_run: 是否为预览模式
+
+    Returns:
+        统计信息（compressed/reused/skipped/saved_bytes）
+    """
+    previous = load_previous_manifest(item_path)
+    generated = load_compressed_variants(item_path)
+    stats = {'compressed': 0, 'reused': 0, 'skipped': 0, 'saved_bytes': 0}
+    jobs = []
+
+    for entry in files_info:
+        if entry['size'] < min_size or Path(entry['path']).suffix.lower() not in COMPRESSIBLE_EXTENSIONS:
+            continue
+
+        file_path = item_path / entry['path']
+        allowed = []
+        for enc in encodings:
+            relative = entry['path'] + COMPRESSION_SUFFIXES[enc]
+            if relative not in generated and variant_path(file_path, enc).exists():
+                print(f"  ⚠️  已存在同名资源，不生成预压缩变体: {relative}")
+                continue
+            allowed.append(enc)
+        if not allowed:
+            continue
+
+        old = previous.get(entry['path'], {})
+        old_variants = old.get('compressed', {})
+        if (old.get('md5') == entry['md5']
+                and old_variants
+                and set(old_variants) == set(allowed)
+                and all(variant_path(file_path, enc).is_file()
+                        and variant_path(file_path, enc).stat().st_size == old_variants[enc]['size']
+                        for enc in allowed)):
+            entry['compressed'] = old_variants
+            stats['reused'] += 1
+            continue
+
+        allowed = tuple(allowed)
+        if executor is not None:
+            future = executor.submit(compress_file_variants, file_path, allowed, dry_run)
+        else:
+            future = _completed(compress_file_variants(file_path, allowed, dry_run))
+        jobs.append((entry, future))
+
+    for entry, future in jobs:
+        try:
+            variants = future.result()
+        except Exception as e:
+            print(f"  ❌ 压缩失败: {entry['path']} - {e}")
+            continue
+        if variants:
+            entry['compressed'] = variants
+            stats['compressed'] += 1
+        else:
+            stats['skipped'] += 1
+
+    for entry in files_info:
+        variants = entry.get('compressed')
+        if variants:
+            stats['saved_bytes'] += entry['size'] - min(v['size'] for v in variants.values())
+
+    # 清理源文件已不存在或不再需要的旧变体（只删除之前记录为生成的文件），并更新记录
+    if not dry_run:
+        expected = {
+            entry['path'] + COMPRESSION_SUFFIXES[enc]
+            for entry in files_info
+            for enc in entry.get('compressed', {})
+        }
+        for relative in sorted(generated - expected):
+            stale_path = item_path / relative
+            if stale_path.is_file():
+                stale_path.unlink()
+                print(f"  🗑️  移除过期压缩文件: {relative}")
+        record_path = item_path / COMPRESSED_VARIANTS_FILE
+        if expected:
+            write_if_changed(record_path, iter_json_bytes(sorted(expected), indent=2, ensure_ascii=False))
+        elif record_path.exists():
+            record_path.unlink()
+
+    info(f"  🗜️  预压缩: 新生成 {stats['compressed']}, 复用 {stats['reused']}, "
+          f"无收益 {stats['skipped']}, 最多节省 {stats['saved_bytes']} bytes")
+    return stats
+
+
+def diff_manifests(old: Dict[str, Dict[str, any]], new: List[Dict[str, any]]) -> Dict[str, List]:
+    """
+    比较两个版本的文件列表（按 path 对齐，md5/size 不同即视为修改）
+
+    Returns:
+        {"added": [条目], "removed": [路径], "modified": [{path, old_md5, md5, size}]}
+    """
+    new_by_path = {entry['path']: entry for entry in new}
+    added, modified = [], []
+    for entry in new:
+        previous = old.get(entry['path'])
+        if previous is None:
+            added.append({'path': entry['path'], 'md5': entry['md5'], 'size': entry['size']})
+        elif previous.get('md5') != entry['md5'] or previous.get('size') != entry['size']:
+            modified.append({
+                'path': entry['path'],
+                'old_md5': previous.get('md5'),
+                'md5': entry['md5'],
+                'size': entry['size'],
+            })
+    removed = sorted(path for path in old if path not in new_by_path)
+    return {'added': added, 'removed': removed, 'modified': modified}
+
+
+def update_manifest_history(item_path: Path, files_info: List[Dict[str, any]], dry_run: bool = False) -> int:
+    """
+    在写入新 files.json 之前更新版本历史
+
+    内容（path/md5/size）有变化时：版本号加一，把上一版文件列表保存为 files.prev.json，
+    并在 files.history.json 中追加一条增量，客户端据此只下载变化的文件、删除已移除的文件。
+
+    增量基于 files.recorded.json（历史最后记录的版本的文件列表）计算，而不是磁盘上的 files.json：
+    即使中间有未记录历史的运行改写了 files.json，版本号也不会漏加。
+
+    Returns:
+        当前版本号
+    """
+    history_path = item_path / HISTORY_FILE
+    history = {'version': 0, 'deltas': []}
+    if history_path.exists():
+        try:
+            with open(history_path, 'r', encoding='utf-8') as f:
+                history = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"  ⚠️  读取版本历史失败，将重新开始计数: {e}")
 
+    recorded_path = item_path / RECORDED_MANIFEST_FILE
+    previous_name = RECORDED_MANIFEST_FILE if recorded_path.exists() else "files.json"
+    previous = load_previous_manifest(item_path, previous_name)
+    version = history.get('version', 0)
+    delta = diff_manifests(previous, files_info)
+    changed = any(delta.values())
+    recorded = [{'path': entry['path'], 'md5': entry['md5'], 'size': entry['size']} for entry in files_info]
 
-def get_file_size(file_path: str) -> int:
-    """获取文件大小（字节）"""
-    try:
-        return os.path.getsize(file_path)
-    except Exception as e:
-        print(f"  ❌ 获取文件大小失败: {file_path} - {e}")
-        return 0
+    if version and not changed:
+        info(f"  🏷️  版本未变化: v{version}")
+        if not dry_run:
+            write_if_changed(recorded_path, iter_json_bytes(recorded, indent=2, ensure_ascii=False))
+        return version
+
+    if not version and (not previous or not changed):
+        # 首次记录历史：当前内容即为 v1
+        new_version = 1
+        history = {'version': new_version, 'deltas': []}
+    else:
+        # 旧 files.json 没有历史记录时视为 v1
+        base_version = version or 1
+        new_version = base_version + 1
+        deltas = history.get('deltas', []) + [{'from': base_version, 'to': new_version, **delta}]
+        history = {'version': new_version, 'deltas': deltas[-HISTORY_MAX_DELTAS:]}
 
+    info(f"  🏷️  版本: v{new_version} (新增 {len(delta['added'])}, 修改 {len(delta['modified'])}, "
+          f"删除 {len(delta['removed'])})")
+    if dry_run:
+        return new_version
 
-def should_ignore_file(file_name: str) -> bool:
-    """判断文件是否应该被忽略"""
-    ignore_patterns = [
-        'files.json',      # 文件列表本身
-        '.DS_Store',       # macOS 系统文件
-        'Thumbs.db',       # Windows 系统文件
-        '.gitkeep',        # Git 占位文件
-        '.gitignore',      # Git 配置
-        'README.md',       # 说明文档
-        'LICENSE',         # 许可证文件
-    ]
-
-    # 检查是否匹配忽略模式
-    if file_name in ignore_patterns:
-        return True
+    if previous:
+        with open(item_path / previous_name, 'rb') as f:
+            write_if_changed(item_path / PREVIOUS_MANIFEST_FILE, iter(lambda: f.read(WRITE_CHUNK_SIZE), b''))
+    write_if_changed(recorded_path, iter_json_bytes(recorded, indent=2, ensure_ascii=False))
+    write_if_changed(history_path, iter_json_bytes(history, indent=2, ensure_ascii=False))
+    return new_version
 
-    # 忽略隐藏文件
-    if file_name.startswith('.'):
-        return True
 
-    return False
+def read_pack_index(pack_path: Path) -> Optional[Dict[str, any]]:
+    """读取归档头部索引，文件不存在或格式不符时返回 None"""
+    try:
+        with open(pack_path, 'rb') as f:
+            magic, version, index_len = PACK_PREFIX.unpack(f.read(PACK_PREFIX.size))
+            if magic != PACK_MAGIC or version != PACK_FORMAT:
+                return None
+            return json.loads(f.read(index_len).decode('utf-8'))
+    except (OSError, ValueError, struct.error):
+        return None
 
 
-def scan_item_directory(item_path: Path) -> List[Dict[str, any]]:
+def build_item_pack(item_path: Path, files_info: List[Dict[str, any]], dry_run: bool = False) -> Dict[str, any]:
     """
-    扫描应用/脚本目录，生成文件列表
+    把应用/脚本的所有文件打包为 files.pack，并在每个 files.json 条目中记录 pack_offset
 
-    Args:
-        item_path: 应用/脚本目录路径
+    归档格式：
+        "MPAK" | u16 格式版本 | u32 索引长度 | JSON 索引 | 文件数据（按 files.json 顺序紧密排列）
+    索引中的 offset 为相对归档开头的绝对偏移，可直接用于 Range 请求。
+    输出只取决于文件内容和顺序；输入（path/md5/size）与现有归档一致时跳过重建。
 
     Returns:
-        文件信息列表
+        归档信息 {path, size, files, rebuilt}
     """
-    files_info = []
+    pack_path = item_path / PACK_FILE
 
-    # 递归遍历目录
-    for root, dirs, files in os.walk(item_path):
-        # 排除隐藏目录
-        dirs[:] = [d for d in dirs if not d.startswith('.')]
+    # 先按相对偏移生成索引，再根据索引长度换算为绝对偏移
+    relative = []
+    offset = 0
+    for entry in files_info:
+        relative.append((entry, offset))
+        offset += entry['size']
+    data_size = offset
 
-        for file_name in sorted(files):
-            if should_ignore_file(file_name):
-                continue
+    def encode_index(base: int) -> bytes:
+        return json.dumps({
+            'files': [
+                {'path': entry['path'], 'offset': base + rel, 'length': entry['size'], 'md5': entry['md5']}
+                for entry, rel in relative
+            ],
+        }, ensure_ascii=False, sort_keys=True, separators=(',', ':')).encode('utf-8')
 
-            file_path = Path(root) / file_name
+    # 索引长度会随偏移的位数变化，迭代到稳定为止
+    base = PACK_PREFIX.size
+    index = encode_index(base)
+    while PACK_PREFIX.size + len(index) != base:
+        base = PACK_PREFIX.size + len(index)
+        index = encode_index(base)
 
-            # 计算相对于应用/脚本目录的路径
-            try:
-                relative_path = file_path.relative_to(item_path)
-            except ValueError:
-                continue
+    for entry, rel in relative:
+        entry['pack_offset'] = base + rel
+    pack_size = base + data_size
+
+    existing = read_pack_index(pack_path)
+    expected = json.loads(index.decode('utf-8'))
+    if existing == expected and pack_path.exists() and pack_path.stat().st_size == pack_size:
+        info(f"  📦 归档未变化: {PACK_FILE} ({pack_size} bytes)")
+        return {'path': PACK_FILE, 'size': pack_size, 'files': len(files_info), 'rebuilt': False}
+
+    if dry_run:
+        print(f"  🔍 [预览模式] 将生成归档: {pack_path} ({pack_size} bytes)")
+        return {'path': PACK_FILE, 'size': pack_size, 'files': len(files_info), 'rebuilt': True}
+
+    tmp_path = pack_path.with_name(pack_path.name + '.tmp')
+    with open(tmp_path, 'wb') as out:
+        out.write(PACK_PREFIX.pack(PACK_MAGIC, PACK_FORMAT, len(index)))
+        out.write(index)
+        for entry, _ in relative:
+            with open(item_path / entry['path'], 'rb') as src:
+                copied = 0
+                while copied < entry['size']:
+                    chunk = src.read(min(HASH_BUFFER_SIZE, entry['size'] - copied))
+                    if not chunk:
+                        raise IOError(f"文件在打包过程中被截断: {entry['path']}")
+                    out.write(chunk)
+                    copied += len(chunk)
+    os.replace(tmp_path, pack_path)
 
-            # 使用正斜杠作为路径分隔符（跨平台兼容）
-            relative_path_str = str(relative_path).replace(os.sep, '/')
+    info(f"  📦 生成归档: {PACK_FILE} ({len(files_info)} 个文件, {pack_size} bytes)")
+    return {'path': PACK_FILE, 'size': pack_size, 'files': len(files_info), 'rebuilt': True}
 
-            print(f"  📄 处理文件: {relative_path_str}")
 
-            # 计算 MD5 和大小
-            md5_hash = calculate_md5(str(file_path))
-            file_size = get_file_size(str(file_path))
+def publish_item_manifest(item_path: Path, files_info: List[Dict[str, any]],
+                          encodings: Tuple[str, ...] = (),
+                          compress_min_size: int = COMPRESS_MIN_SIZE,
+                          history: bool = False,
+                          executor: Optional[ThreadPoolExecutor] = None,
+                          dry_run: bool = False,
+                          pack: bool = False) -> bool:
+    """
+    发布单个应用/脚本：预压缩、打包、更新版本历史，最后写入 files.json
+
+    Returns:
+        files.json 是否写入成功
+    """
+    if encodings:
+        with METRICS.phase('compress'):
+            compress_item_variants(item_path, files_info, encodings, compress_min_size, executor, dry_run)
+    if pack:
+        with METRICS.phase('pack'):
+            build_item_pack(item_path, files_info, dry_run)
+    # 已记录过版本历史的应用/脚本每次发布都更新历史，否则客户端会按旧版本号认为已是最新
+    if history or (item_path / HISTORY_FILE).exists():
+        with METRICS.phase('history'):
+            update_manifest_history(item_path, files_info, dry_run)
+    return write_item_manifest(item_path, files_info, dry_run)
+
+
+def encode_msgpack(obj) -> bytes:
+    """
+    把 JSON 兼容的数据编码为 MessagePack（只实现目录需要的类型，不依赖第三方库）
+
+    Raises:
+        TypeError: 不支持的数据类型
+    """
+    out = bytearray()
 
-            if md5_hash and file_size > 0:
-                files_info.append({
-                    "path": relative_path_str,
-                    "md5": md5_hash,
-                    "size": file_size
-                })
-                print(f"    ✓ MD5: {md5_hash}, Size: {file_size} bytes")
+    def encode(value):
+        if value is None:
+            out.append(0xc0)
+        elif value is True:
+            out.append(0xc3)
+        elif value is False:
+            out.append(0xc2)
+        elif isinstance(value, int):
+            if 0 <= value < 0x80:
+                out.append(value)
+            elif -32 <= value < 0:
+                out.append(value & 0xff)
+            elif 0 <= value <= 0xffffffff:
+                out.extend(struct.pack('>BI', 0xce, value) if value > 0xffff
+                           else struct.pack('>BH', 0xcd, value) if value > 0xff
+                           else struct.pack('>BB', 0xcc, value))
+            elif value > 0:
+                out.extend(struct.pack('>BQ', 0xcf, value))
+            else:
+                out.extend(struct.pack('>Bq', 0xd3, value))
+        elif isinstance(value, float):
+            out.extend(struct.pack('>Bd', 0xcb, value))
+        elif isinstance(value, str):
+            data = value.encode('utf-8')
+            n = len(data)
+            if n < 32:
+                out.append(0xa0 | n)
+            elif n <= 0xff:
+                out.extend(struct.pack('>BB', 0xd9, n))
+            elif n <= 0xffff:
+                out.extend(struct.pack('>BH', 0xda, n))
+            else:
+                out.extend(struct.pack('>BI', 0xdb, n))
+            out.extend(data)
+        elif isinstance(value, (list, tuple)):
+            n = len(value)
+            if n < 16:
+                out.append(0x90 | n)
+            elif n <= 0xffff:
+                out.extend(struct.pack('>BH', 0xdc, n))
+            else:
+                out.extend(struct.pack('>BI', 0xdd, n))
+            for item in value:
+                encode(item)
+        elif isinstance(value, dict):
+            n = len(value)
+            if n < 16:
+                out.append(0x80 | n)
+            elif n <= 0xffff:
+                out.extend(struct.pack('>BH', 0xde, n))
             else:
-                print(f"    ⚠️  跳过无效文件")
+                out.extend(struct.pack('>BI', 0xdf, n))
+            for key, item in value.items():
+                encode(key)
+                encode(item)
+        else:
+            raise TypeError(f"无法编码为 MessagePack: {type(value).__name__}")
 
-    return files_info
+    encode(obj)
+    return bytes(out)
 
 
-def generate_files_json_for_type(base_path: Path, item_type: str, item_name: Optional[str] = None, dry_run: bool = False) -> int:
+def build_catalog(base_path: Path,
+                  overrides: Optional[Dict[Tuple[str, str], List[Dict[str, any]]]] = None) -> Dict[str, any]:
     """
-    生成指定类型（apps/scripts）的 files.json 文件
+    合并 apps.json、scripts.json 和各自的 files.json，生成聚合目录
 
     Args:
         base_path: 仓库根目录
-        item_type: 类型 (apps/scripts)
-        item_name: 指定应用/脚本名称（可选）
-        dry_run: 是否为预览模式
+        overrides: (类型, 目录名) -> 本次生成的文件信息列表，优先于磁盘上的 files.json
 
     Returns:
-        处理的应用/脚本数量
+        目录内容（含 etag，不含 version）
     """
-    processed_count = 0
-    type_path = base_path / item_type
+    overrides = overrides or {}
+    catalog = {'format': CATALOG_FORMAT}
+    totals = {'files': 0, 'bytes': 0}
 
-    if not type_path.exists():
-        print(f"\n⚠️  跳过: {item_type} 目录不存在")
-        return 0
+    for item_type, list_name in CATALOG_SOURCES.items():
+        list_path = base_path / item_type / list_name
+        items = []
+        if list_path.exists():
+            with open(list_path, 'r', encoding='utf-8') as f:
+                items = json.load(f)
 
-    # 如果指定了名称，只处理该应用/脚本
-    if item_name:
-        item_dirs = [item_name]
-    else:
-        # 获取所有子目录（排除特殊目录）
-        item_dirs = [
-            d for d in os.listdir(type_path)
-            if os.path.isdir(type_path / d) and not d.startswith('.')
-        ]
+        merged = []
+        for item in items:
+            files_ref = item.get('files', '')
+            item_dir = files_ref.split('/', 1)[0]
+            files_info = overrides.get((item_type, item_dir))
+            if files_info is None:
+                try:
+                    with open(base_path / item_type / files_ref, 'r', encoding='utf-8') as f:
+                        files_info = json.load(f)
+                except (OSError, ValueError):
+                    print(f"  ⚠️  目录缺少文件列表: {item_type}/{files_ref}")
+                    files_info = []
 
-    for item_dir in sorted(item_dirs):
-        item_path = type_path / item_dir
+            item_size = sum(entry.get('size', 0) for entry in files_info)
+            merged_item = {
+                **item,
+                'file_list': files_info,
+                'file_count': len(files_info),
+                'total_size': item_size,
+            }
+            try:
+                with open(base_path / item_type / item_dir / HISTORY_FILE, 'r', encoding='utf-8') as f:
+                    merged_item['manifest_version'] = json.load(f).get('version', 0)
+            except (OSError, ValueError):
+                pass
+            pack_path = base_path / item_type / item_dir / PACK_FILE
+            if files_info and all('pack_offset' in entry for entry in files_info) and pack_path.exists():
+                merged_item['pack'] = {'path': f"{item_dir}/{PACK_FILE}", 'size': pack_path.stat().st_size}
+            merged.append(merged_item)
+            totals['files'] += len(files_info)
+            totals['bytes'] += item_size
 
-        # 确认目录存在
-        if not item_path.exists() or not item_path.is_dir():
-            print(f"\n⚠️  跳过: {item_dir} (不是有效目录)")
-            continue
+        catalog[item_type] = merged
+        totals[item_type] = len(merged)
 
-        print(f"\n{'='*60}")
-        item_label = "应用" if item_type == "apps" else "脚本"
-        print(f"📦 处理{item_label}: {item_dir}")
-        print(f"{'='*60}")
+    catalog['totals'] = totals
+    canonical = json.dumps(catalog, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    catalog['etag'] = hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+    return catalog
 
-        # 扫描目录
-        files_info = scan_item_directory(item_path)
 
-        if not files_info:
-            print(f"  ⚠️  未找到有效文件，跳过")
+def write_catalog(base_path: Path, catalog: Dict[str, any], dry_run: bool = False) -> int:
+    """
+    写入 JSON 和 MessagePack 两种格式的聚合目录
+
+    内容（etag）与上次相同时不重写文件，版本号只在内容变化时递增。
+
+    Returns:
+        目录版本号
+    """
+    json_path = base_path / CATALOG_FILE
+    binary_path = base_path / CATALOG_BINARY_FILE
+
+    previous = {}
+    if json_path.exists():
+        try:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                previous = json.load(f)
+        except (OSError, ValueError):
+            previous = {}
+
+    print(f"\n{'='*60}")
+    if previous.get('etag') == catalog['etag'] and binary_path.exists():
+        print(f"📚 聚合目录未变化: v{previous.get('version', 0)} (etag {catalog['etag'][:16]}…)")
+        return previous.get('version', 0)
+
+    version = previous.get('version', 0) + 1
+    ordered = {'format': catalog['format'], 'version': version, 'etag': catalog['etag']}
+    ordered.update((k, v) for k, v in catalog.items() if k not in ordered)
+
+    json_content = json.dumps(ordered, ensure_ascii=False, separators=(',', ':'))
+    binary_content = encode_msgpack(ordered)
+
+    if dry_run:
+        print(f"🔍 [预览模式] 将写入聚合目录 v{version}: {json_path} ({len(json_content.encode('utf-8'))} bytes), "
+              f"{binary_path} ({len(binary_content)} bytes)")
+        return version
+
+    write_if_changed(json_path, [json_content.encode('utf-8')])
+    write_if_changed(binary_path, [binary_content])
+
+    totals = catalog['totals']
+    print(f"📚 聚合目录 v{version}: {totals.get('apps', 0)} 个应用, {totals.get('scripts', 0)} 个脚本, "
+          f"{totals['files']} 个文件, {totals['bytes']} bytes")
+    print(f"  ✅ {json_path} ({len(json_content.encode('utf-8'))} bytes)")
+    print(f"  ✅ {binary_path} ({len(binary_content)} bytes)")
+    print(f"  🏷️  etag: {catalog['etag']}")
+    return version
+
+
+class InotifyWatcher:
+    """
+    基于 Linux inotify 的递归目录监听（通过 ctypes 调用 libc，无需第三方依赖）
+
+    Raises:
+        OSError: 当前平台不支持 inotify
+    """
+
+    # inotify 事件掩码
+    IN_MODIFY = 0x00000002
+    IN_ATTRIB = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_Q_OVERFLOW = 0x00004000
+    IN_ISDIR = 0x40000000
+    WATCH_MASK = (IN_CLOSE_WRITE | IN_ATTRIB | IN_MOVED_FROM | IN_MOVED_TO
+                  | IN_CREATE | IN_DELETE | IN_DELETE_SELF)
+
+    _EVENT_HEADER = struct.Struct('iIII')
+
+    def __init__(self, roots: List[Path]):
+        if not sys.platform.startswith('linux'):
+            raise OSError(errno.ENOSYS, 'inotify 仅支持 Linux')
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self._roots = roots
+        self._watches: Dict[int, Path] = {}
+        for root in roots:
+            self._add_tree(root)
+
+    def _add_watch(self, path: Path):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(str(path)), self.WATCH_MASK)
+        if wd >= 0:
+            self._watches[wd] = path
+
+    def _add_tree(self, root: Path):
+        self._add_watch(root)
+        for dir_path, dirs, _ in os.walk(root):
+            dirs[:] = [d for d in dirs if not d.startswith('.')]
+            for d in dirs:
+                self._add_watch(Path(dir_path) / d)
+
+    def poll(self, timeout: Optional[float]) -> set:
+        """等待事件，返回发生变化的路径集合（超时返回空集合）"""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+
+        changed = set()
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, name_len = self._EVENT_HEADER.unpack_from(data, offset)
+            offset += self._EVENT_HEADER.size
+            name = data[offset:offset + name_len].rstrip(b'\0')
+            offset += name_len
+
+            if mask & self.IN_Q_OVERFLOW:
+                # 事件队列溢出：把所有根目录视为已变化
+                changed.update(self._roots)
+                continue
+
+            parent = self._watches.get(wd)
+            if parent is None:
+                continue
+            path = parent / os.fsdecode(name) if name else parent
+            changed.add(path)
+
+            if mask & self.IN_ISDIR and mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                self._add_tree(path)
+            if mask & self.IN_DELETE_SELF:
+                self._watches.pop(wd, None)
+
+        return changed
+
+    def close(self):
+        os.close(self._fd)
+
+
+class PollingWatcher:
+    """轮询回退：定期比较 (size, mtime_ns, inode) 快照，适用于不支持 inotify 的平台"""
+
+    def __init__(self, roots: List[Path], interval: float = WATCH_POLL_INTERVAL):
+        self._roots = roots
+        self._interval = interval
+        self._snapshot = self._take_snapshot()
+
+    def _take_snapshot(self) -> Dict[Path, Tuple[int, int, int]]:
+        snapshot = {}
+        for root in self._roots:
+            for dir_path, dirs, files in os.walk(root):
+                dirs[:] = [d for d in dirs if not d.startswith('.')]
+                for file_name in files:
+                    path = Path(dir_path) / file_name
+                    try:
+                        st = path.stat()
+                    except OSError:
+                        continue
+                    snapshot[path] = (st.st_size, st.st_mtime_ns, st.st_ino)
+        return snapshot
+
+    def poll(self, timeout: Optional[float]) -> set:
+        """等待一个扫描周期，返回发生变化的路径集合"""
+        time.sleep(self._interval if timeout is None else min(timeout, self._interval))
+        snapshot = self._take_snapshot()
+        changed = {
+            path for path in snapshot.keys() | self._snapshot.keys()
+            if snapshot.get(path) != self._snapshot.get(path)
+        }
+        self._snapshot = snapshot
+        return changed
+
+    def close(self):
+        pass
+
+
+def create_watcher(roots: List[Path], force_polling: bool = False):
+    """优先使用 inotify，不可用时回退到轮询"""
+    if not force_polling:
+        try:
+            return InotifyWatcher(roots)
+        except (OSError, AttributeError) as e:
+            print(f"⚠️  inotify 不可用，使用轮询模式: {e}")
+    return PollingWatcher(roots)
+
+
+def affected_items(base_path: Path, changed: set) -> set:
+    """
+    把变化的路径映射为受影响的 (类型, 目录名)
+
+    files.json、预压缩变体和隐藏文件由本工具写入或被忽略，不会触发重新生成，避免循环；
+    被应用/脚本的 .filesignore 忽略的路径同样跳过，修改 .filesignore 本身则会触发重新生成。
+    """
+    items = set()
+    for path in changed:
+        try:
+            parts = path.relative_to(base_path).parts
+        except ValueError:
+            continue
+        if len(parts) < 2 or parts[0] not in CATALOG_SOURCES or parts[1].startswith('.'):
             continue
+        if len(parts) == 2 and not (base_path / parts[0] / parts[1]).is_dir():
+            continue
+        name = parts[-1]
+        if len(parts) == 3 and name == IGNORE_FILE:
+            items.add((parts[0], parts[1]))
+            continue
+        if len(parts) > 2:
+            if (should_ignore_file(name)
+                    or '/'.join(parts[2:]) in load_compressed_variants(base_path / parts[0] / parts[1])
+                    or (name.endswith('.tmp') and should_ignore_file(name[:-4]))
+                    or any(p.startswith('.') for p in parts[2:])):
+                continue
+            rules = load_ignore_rules(base_path / parts[0] / parts[1])
+            if rules.match('/'.join(parts[2:])) or any(
+                    rules.match('/'.join(parts[2:k]), True) for k in range(3, len(parts))):
+                continue
+        items.add((parts[0], parts[1]))
+    return items
 
-        # 生成 JSON
-        json_path = item_path / "files.json"
-        json_content = json.dumps(files_info, indent=2, ensure_ascii=False)
 
-        if dry_run:
-            print(f"\n  🔍 [预览模式] 将写入到: {json_path}")
-            print(f"\n{json_content}")
-        else:
-            try:
-                with open(json_path, 'w', encoding='utf-8') as f:
-                    f.write(json_content)
-                print(f"\n  ✅ 成功生成: {json_path}")
-                print(f"  📊 文件总数: {len(files_info)}")
-                print(f"  💾 总大小: {sum(f['size'] for f in files_info)} bytes")
-            except Exception as e:
-                print(f"  ❌ 写入失败: {e}")
+def run_watch_mode(base_path: Path, args, types_to_process: List[str], cache: FileHashCache,
+                   executor: Optional[ThreadPoolExecutor], algorithms: Tuple[str, ...],
+                   encodings: Tuple[str, ...]):
+    """
+    监听 apps/scripts 目录，防抖合并一批事件后只重新生成受影响应用/脚本的 files.json
+
+    借助哈希缓存，只有被修改过的文件会重新计算哈希。
+    """
+    roots = [base_path / t for t in types_to_process if (base_path / t).is_dir()]
+    watcher = create_watcher(roots, args.watch_poll)
+    mode = 'polling' if isinstance(watcher, PollingWatcher) else 'inotify'
+    print(f"👀 监听模式 ({mode}): {', '.join(str(r) for r in roots)}")
+    print(f"   防抖 {int(args.watch_debounce * 1000)} ms，按 Ctrl+C 退出\n")
+
+    try:
+        while True:
+            changed = watcher.poll(None)
+            if not changed:
+                continue
+
+            # 防抖：持续收集事件，直到安静一段时间
+            while True:
+                more = watcher.poll(args.watch_debounce)
+                if not more:
+                    break
+                changed |= more
+
+            targets = set()
+            for item_type, item_dir in affected_items(base_path, changed):
+                target = args.app if item_type == 'apps' else args.script
+                if item_type in types_to_process and (not target or item_dir == target):
+                    targets.add((item_type, item_dir))
+            if not targets:
                 continue
 
-        processed_count += 1
+            start = time.perf_counter()
+            hits, misses = cache.hits, cache.misses
+            overrides = {}
+            for item_type, item_dir in sorted(targets):
+                for _, item_path, files_info in collect_type_manifests(
+                        base_path, item_type, item_dir, cache, executor, args.chunks, algorithms):
+                    publish_item_manifest(item_path, files_info, encodings, args.compress_min_size,
+                                          args.history, executor, args.dry_run, args.pack)
+                    overrides[(item_type, item_dir)] = files_info
+
+            if args.catalog:
+                write_catalog(base_path, build_catalog(base_path, overrides), args.dry_run)
+            if not args.no_cache and not args.dry_run:
+                cache.save()
+
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"\n⚡ 已更新 {', '.join(f'{t}/{d}' for t, d in sorted(targets))} "
+                  f"({elapsed:.1f} ms, 重新计算 {cache.misses - misses} 个文件, 复用 {cache.hits - hits} 个)\n")
+    finally:
+        watcher.close()
 
-    return processed_count
+
+def run_verify_mode(args, base_path: Path, types_to_process: List[str], cache: Optional[FileHashCache],
+                    executor: Optional[ThreadPoolExecutor], profiler=None):
+    """执行 --verify：输出摘要、写出报告，有问题时以退出码 1 结束"""
+    # 报告输出到 stdout 时，其余信息改写到 stderr，保证 stdout 是合法的 JSON
+    with contextlib.redirect_stdout(sys.stderr) if args.verify_report == '-' else contextlib.nullcontext():
+        if profiler is not None:
+            profiler.enable()
+        try:
+            report = _run_verification(args, base_path, types_to_process, cache, executor)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+
+    if args.verify_report == '-':
+        json.dump(report, sys.stdout, indent=2, ensure_ascii=False)
+        sys.stdout.write('\n')
+    elif args.verify_report:
+        with open(args.verify_report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"📝 校验报告已写入: {args.verify_report}")
+
+    with contextlib.redirect_stdout(sys.stderr) if args.verify_report == '-' else contextlib.nullcontext():
+        report_run_metrics(args, base_path, cache, profiler)
+    sys.exit(0 if report['ok'] else 1)
+
+
+def _run_verification(args, base_path: Path, types_to_process: List[str], cache: Optional[FileHashCache],
+                      executor: Optional[ThreadPoolExecutor]) -> Dict[str, any]:
+    try:
+        info(f"\n🔎 校验模式: 比较 files.json 与工作区")
+        report = verify_manifests(base_path, types_to_process, {'apps': args.app, 'scripts': args.script},
+                                  cache, executor)
+        if cache is not None and not args.dry_run:
+            cache.save()
+    except KeyboardInterrupt:
+        print(f"\n\n⚠️  操作已取消")
+        sys.exit(1)
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    print(f"\n{'='*60}")
+    if report['ok']:
+        print(f"✅ 校验通过: {report['items_checked']} 个项目, {report['files_checked']} 个文件")
+    else:
+        print(f"❌ 校验失败: {report['problem_count']} 个问题 "
+              f"({report['items_checked']} 个项目, {report['files_checked']} 个文件)")
+    print(f"{'='*60}\n")
+    return report
+
+
+def report_run_metrics(args, base_path: Path, cache: Optional[FileHashCache], profiler=None):
+    """根据命令行参数写出指标 JSON、cProfile 结果和 tracemalloc 统计"""
+    metrics = METRICS.to_dict(base_path, cache)
+
+    if args.tracemalloc:
+        import tracemalloc
+        current, peak = tracemalloc.get_traced_memory()
+        top = tracemalloc.take_snapshot().statistics('lineno')[:10]
+        metrics['tracemalloc'] = {
+            'current_mb': current / (1024 * 1024),
+            'peak_mb': peak / (1024 * 1024),
+            'top': [{'location': str(stat.traceback), 'size_kb': stat.size / 1024, 'count': stat.count} for stat in top],
+        }
+        print(f"\n🧠 tracemalloc: 当前 {current / (1024 * 1024):.1f} MiB, 峰值 {peak / (1024 * 1024):.1f} MiB")
+        for stat in top:
+            print(f"  {stat.size / 1024:10.1f} KiB  {stat.count:7d}  {stat.traceback}")
+        tracemalloc.stop()
+
+    if profiler is not None:
+        import pstats
+        profiler.dump_stats(args.profile)
+        print(f"\n🔬 cProfile 结果已写入: {args.profile}（按累计耗时前 15 项）")
+        pstats.Stats(profiler, stream=sys.stdout).sort_stats('cumulative').print_stats(15)
+
+    if args.metrics_json:
+        try:
+            with open(args.metrics_json, 'w', encoding='utf-8') as f:
+                json.dump(metrics, f, indent=2, ensure_ascii=False)
+            print(f"📈 指标已写入: {args.metrics_json}")
+        except OSError as e:
+            print(f"  ⚠️  写入指标失败: {args.metrics_json} - {e}")
 
 
 def main():
@@ -207,6 +2456,21 @@ def main():
   %(prog)s --app password_manager             # 只处理密码管理器
   %(prog)s --script ai_encouragement_bot      # 只处理 AI 鼓励助手
   %(prog)s --dry-run                          # 预览模式，不实际写入文件
+  %(prog)s --rehash                           # 忽略缓存，重新计算全部 MD5
+  %(prog)s --jobs 8                           # 使用 8 个线程并行计算哈希
+  %(prog)s --chunks                           # 为大文件生成分块列表
+  %(prog)s --hash md5,sha256                  # 同时计算 MD5 和 SHA-256
+  %(prog)s --benchmark-hashes                 # 测量本机各哈希算法速度
+  %(prog)s --dedup --hash md5,sha256          # 跨应用去重并生成共享 blob 存储
+  %(prog)s --compress gzip,br                 # 生成 gzip/brotli 预压缩文件
+  %(prog)s --catalog                          # 生成聚合目录 catalog.json / catalog.msgpack
+  %(prog)s --app my_app --watch               # 开发时持续监听并增量更新 files.json
+  %(prog)s --history                          # 记录版本号和版本间增量（发布时使用）
+  %(prog)s --pack                             # 生成单文件归档，一次请求即可安装
+  %(prog)s --benchmark-scan 100000            # 测量 10 万文件目录树的扫描速度
+  %(prog)s --quiet --metrics-json m.json      # CI：只输出摘要，指标写入 JSON
+  %(prog)s --progress --profile run.prof      # 单行进度 + cProfile 分析
+  %(prog)s --verify --verify-report r.json    # 发布前校验，不一致时退出码为 1
         """
     )
 
@@ -243,62 +2507,348 @@ def main():
         help='仓库根目录路径（默认为当前目录）'
     )
 
+    parser.add_argument(
+        '--cache-file',
+        type=str,
+        default=None,
+        help=f'哈希缓存文件路径（默认为 <base-path>/{DEFAULT_CACHE_FILE}）'
+    )
+
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='禁用哈希缓存'
+    )
+
+    parser.add_argument(
+        '--rehash',
+        action='store_true',
+        help='忽略已有缓存，重新计算所有文件的 MD5（并刷新缓存）'
+    )
+
+    parser.add_argument(
+        '--jobs', '-j',
+        type=int,
+        default=1,
+        help='并行计算哈希的线程数，0 表示使用 CPU 核心数（默认为 1）'
+    )
+
+    parser.add_argument(
+        '--chunks',
+        action='store_true',
+        help=f'为不小于 {CHUNK_MIN_FILE_SIZE // 1024} KiB 的文件生成内容定义分块列表（offset/length/{CHUNK_HASH}），供客户端增量下载'
+    )
+
+    parser.add_argument(
+        '--hash',
+        type=str,
+        default=','.join(DEFAULT_HASH_ALGORITHMS),
+        help='逗号分隔的哈希算法列表，如 md5,sha256,blake2b；单次读取同时计算，md5 始终保留'
+    )
+
+    parser.add_argument(
+        '--benchmark-hashes',
+        type=int,
+        nargs='?',
+        const=64,
+        metavar='SIZE_MB',
+        help='测量本机各哈希算法的吞吐量（MB/s）后退出，默认测试数据 64 MiB'
+    )
+
+    parser.add_argument(
+        '--dedup',
+        action='store_true',
+        help=f'跨所有应用/脚本按内容去重，生成共享 blob 存储 ({BLOB_STORE_DIR}/) 和去重报告；'
+             f'blob 以 --hash 中最强的 {"/".join(BLOB_HASH_PREFERENCE)} 摘要命名，都没有时额外计算 sha256'
+    )
+
+    parser.add_argument(
+        '--compress',
+        type=str,
+        nargs='?',
+        const='auto',
+        metavar='ENCODINGS',
+        help='为文本类文件生成预压缩变体（gzip,br,zstd；默认 auto 为所有可用编码），并记录到 files.json'
+    )
+
+    parser.add_argument(
+        '--compress-min-size',
+        type=int,
+        default=COMPRESS_MIN_SIZE,
+        help=f'小于该字节数的文件不压缩（默认为 {COMPRESS_MIN_SIZE}）'
+    )
+
+    parser.add_argument(
+        '--catalog',
+        action='store_true',
+        help=f'额外生成聚合目录 {CATALOG_FILE} / {CATALOG_BINARY_FILE}（合并 apps.json、scripts.json 和所有 files.json）；'
+             f'{CATALOG_FILE} 已存在时总会同步更新'
+    )
+
+    parser.add_argument(
+        '--watch',
+        action='store_true',
+        help='生成后持续监听目录变化，只重新生成受影响应用/脚本的 files.json（Linux 使用 inotify，其他平台轮询）'
+    )
+
+    parser.add_argument(
+        '--watch-debounce',
+        type=float,
+        default=WATCH_DEBOUNCE,
+        help=f'监听模式的事件防抖时间（秒，默认为 {WATCH_DEBOUNCE}）'
+    )
+
+    parser.add_argument(
+        '--watch-poll',
+        action='store_true',
+        help='监听模式强制使用轮询（例如网络文件系统上 inotify 不可靠时）'
+    )
+
+    parser.add_argument(
+        '--history',
+        action='store_true',
+        help=f'记录版本历史：内容变化时版本号加一，保存 {PREVIOUS_MANIFEST_FILE} 并在 {HISTORY_FILE} 中追加增量；'
+             f'{HISTORY_FILE} 已存在的应用/脚本总会更新历史'
+    )
+
+    parser.add_argument(
+        '--pack',
+        action='store_true',
+        help=f'为每个应用/脚本生成单文件归档 {PACK_FILE}（头部带索引），并在条目中记录 pack_offset'
+    )
+
+    parser.add_argument(
+        '--benchmark-scan',
+        type=int,
+        nargs='?',
+        const=100000,
+        metavar='FILES',
+        help='生成合成目录树，对比 os.walk 基线与 scandir 扫描器的速度后退出（默认 100000 个文件）'
+    )
+
+    parser.add_argument(
+        '--quiet', '-q',
+        action='store_true',
+        help='不输出逐文件/逐项目信息，只输出警告、错误和最终摘要'
+    )
+    parser.add_argument(
+        '--progress',
+        action='store_true',
+        help='同 --quiet，并在 stderr 上显示单行进度'
+    )
+    parser.add_argument(
+        '--metrics-json',
+        type=str,
+        metavar='FILE',
+        help='把各阶段耗时（walk/hash/serialize/write 等）、哈希字节数和最慢的文件写入 JSON'
+    )
+    parser.add_argument(
+        '--profile',
+        type=str,
+        metavar='FILE',
+        help='使用 cProfile 分析本次运行，结果写入 FILE（可用 python -m pstats 查看）'
+    )
+    parser.add_argument(
+        '--tracemalloc',
+        action='store_true',
+        help='使用 tracemalloc 跟踪内存分配，输出峰值和分配最多的代码位置（会明显变慢）'
+    )
+
+    parser.add_argument(
+        '--verify',
+        action='store_true',
+        help='只校验现有 files.json 与磁盘是否一致（大小、MD5、未列出的文件），不写入；有问题时退出码为 1'
+    )
+    parser.add_argument(
+        '--verify-report',
+        type=str,
+        metavar='FILE',
+        help='把 --verify 的结果写入 JSON 报告（- 表示输出到 stdout）'
+    )
+
     args = parser.parse_args()
 
+    try:
+        algorithms = parse_hash_algorithms(args.hash)
+        encodings = parse_encodings(args.compress) if args.compress else ()
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.benchmark_hashes is not None:
+        candidates = tuple(dict.fromkeys(BENCHMARK_HASH_ALGORITHMS + algorithms))
+        print(f"⏱️  哈希算法基准测试 ({args.benchmark_hashes} MiB 随机数据)")
+        results = benchmark_hash_algorithms(candidates, args.benchmark_hashes, combined=algorithms)
+        width = max(len(name) for name in results)
+        for name, mb_per_s in sorted(results.items(), key=lambda item: -item[1]):
+            print(f"  {name:<{width}}  {mb_per_s:10.1f} MB/s")
+        return
+
+    if args.benchmark_scan is not None:
+        print(f"⏱️  目录扫描基准测试 ({args.benchmark_scan} 个文件)")
+        results = benchmark_directory_scan(args.benchmark_scan)
+        for name in ('os.walk', 'scandir'):
+            print(f"  {name:<8}  {results[f'{name}_seconds']:8.3f} s  {results[f'{name}_files_per_s']:12.0f} files/s")
+        print(f"  加速比: {results['speedup']:.2f}x")
+        return
+
+    if args.progress:
+        set_output_mode('progress')
+    elif args.quiet:
+        set_output_mode('quiet')
+    if args.verify and args.verify_report == '-':
+        global INFO_TO_STDERR
+        INFO_TO_STDERR = True
+
     # 确定基础路径
     base_path = Path(args.base_path).resolve()
 
-    print("="*60)
-    print("🚀 Memento 仓库 - 文件列表生成工具")
-    print("="*60)
-    print(f"📁 仓库路径: {base_path}")
+    info("="*60)
+    info("🚀 Memento 仓库 - 文件列表生成工具")
+    info("="*60)
+    info(f"📁 仓库路径: {base_path}")
 
     # 确定处理类型
     if args.app:
         types_to_process = ['apps']
-        print(f"🎯 目标应用: {args.app}")
+        info(f"🎯 目标应用: {args.app}")
     elif args.script:
         types_to_process = ['scripts']
-        print(f"🎯 目标脚本: {args.script}")
+        info(f"🎯 目标脚本: {args.script}")
     elif args.type == 'all':
         types_to_process = ['apps', 'scripts']
-        print(f"🎯 目标类型: 全部 (apps + scripts)")
+        info(f"🎯 目标类型: 全部 (apps + scripts)")
     else:
         types_to_process = [args.type]
-        print(f"🎯 目标类型: {args.type}")
+        info(f"🎯 目标类型: {args.type}")
+
+    # 去重统一使用一种强哈希作为 blob 内容地址
+    blob_algorithm = None
+    if args.dedup:
+        blob_algorithm = choose_blob_algorithm(algorithms)
+        if blob_algorithm not in algorithms:
+            algorithms = algorithms + (blob_algorithm,)
+        info(f"🔗 去重内容地址: {blob_algorithm}")
+
+    info(f"🔐 哈希算法: {', '.join(algorithms)}")
+
+    if encodings:
+        info(f"🗜️  预压缩: {', '.join(encodings)} (≥ {args.compress_min_size} bytes)")
+
+    if args.chunks:
+        info(f"🧩 分块模式: 开启 (≥ {CHUNK_MIN_FILE_SIZE // 1024} KiB 的文件)")
+
+    # 应用商店优先读取聚合目录：已发布过目录时每次写入 files.json 都同步刷新，避免客户端拿到过期的文件列表
+    if not args.catalog and (base_path / CATALOG_FILE).exists():
+        args.catalog = True
+        info(f"📚 聚合目录: 已存在 {CATALOG_FILE}，将同步更新")
 
     if args.dry_run:
-        print(f"🔍 运行模式: 预览模式（不写入文件）")
+        info(f"🔍 运行模式: 预览模式（不写入文件）")
     else:
-        print(f"✍️  运行模式: 正常模式（将写入文件）")
+        info(f"✍️  运行模式: 正常模式（将写入文件）")
 
     # 检查目录是否存在
     if not base_path.exists():
         print(f"\n❌ 错误: 目录不存在 - {base_path}")
         sys.exit(1)
 
+    # 加载哈希缓存
+    cache = None
+    if not args.no_cache:
+        cache_path = Path(args.cache_file).resolve() if args.cache_file else base_path / DEFAULT_CACHE_FILE
+        cache = FileHashCache(cache_path, base_path, rehash=args.rehash)
+        cache.load()
+        info(f"🗃️  哈希缓存: {cache_path}{' (rehash)' if args.rehash else ''}")
+    elif args.watch:
+        # 监听模式依赖缓存实现增量哈希，--no-cache 时只使用内存缓存
+        cache = FileHashCache(base_path / DEFAULT_CACHE_FILE, base_path, rehash=True)
+
+    # 创建哈希线程池（hashlib 在计算大块数据时会释放 GIL）
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    executor = ThreadPoolExecutor(max_workers=jobs) if jobs > 1 else None
+    if executor is not None:
+        info(f"⚡ 并行线程数: {jobs}")
+
+    profiler = None
+    if args.profile:
+        import cProfile
+        profiler = cProfile.Profile()
+    if args.tracemalloc:
+        import tracemalloc
+        tracemalloc.start(25)
+
+    if args.verify:
+        run_verify_mode(args, base_path, types_to_process, cache, executor, profiler)
+        return
+
     # 生成文件列表
     try:
-        total_processed = 0
-        for item_type in types_to_process:
-            item_name = args.app if item_type == 'apps' else args.script
-            processed_count = generate_files_json_for_type(
+        if profiler is not None:
+            profiler.enable()
+
+        # 去重需要整个仓库的视图：扫描全部应用/脚本，但只写入选中的目标
+        scan_types = ['apps', 'scripts'] if args.dedup else types_to_process
+        collected = []
+        for item_type in scan_types:
+            item_name = None if args.dedup else (args.app if item_type == 'apps' else args.script)
+            for item_dir, item_path, files_info in collect_type_manifests(
                 base_path,
                 item_type,
                 item_name,
-                args.dry_run
-            )
-            total_processed += processed_count
+                cache,
+                executor,
+                args.chunks,
+                algorithms
+            ):
+                collected.append((item_type, item_dir, item_path, files_info))
+        METRICS.finish_progress()
+
+        if args.dedup:
+            with METRICS.phase('dedup'):
+                build_blob_store(base_path, collected, blob_algorithm, args.dry_run)
+
+        total_processed = 0
+        for item_type, item_dir, item_path, files_info in collected:
+            if item_type not in types_to_process:
+                continue
+            target = args.app if item_type == 'apps' else args.script
+            if target and item_dir != target:
+                continue
+            if publish_item_manifest(item_path, files_info, encodings, args.compress_min_size,
+                                     args.history, executor, args.dry_run, args.pack):
+                total_processed += 1
+
+        if args.catalog:
+            overrides = {(item_type, item_dir): files_info for item_type, item_dir, _, files_info in collected}
+            with METRICS.phase('catalog'):
+                write_catalog(base_path, build_catalog(base_path, overrides), args.dry_run)
+
+        if cache is not None and not args.dry_run:
+            with METRICS.phase('cache_save'):
+                cache.save()
+
+        if profiler is not None:
+            profiler.disable()
 
         print(f"\n{'='*60}")
         print(f"✨ 完成!")
         print(f"📊 处理总数: {total_processed}")
+        if cache is not None:
+            print(f"🗃️  缓存命中: {cache.hits}, 未命中: {cache.misses}")
+        print(f"⏱️  耗时: {time.perf_counter() - METRICS.started:.2f} s, "
+              f"哈希 {METRICS.bytes_hashed / (1024 * 1024):.1f} MiB")
         print(f"{'='*60}\n")
+        report_run_metrics(args, base_path, cache, profiler)
 
         if total_processed == 0:
             print("⚠️  警告: 未处理任何项目，请检查目录结构")
             sys.exit(1)
 
+        if args.watch:
+            if args.dedup:
+                print("⚠️  监听模式不会更新去重 blob 存储，请在发布前完整运行一次 --dedup")
+            run_watch_mode(base_path, args, types_to_process, cache, executor, algorithms, encodings)
+
     except KeyboardInterrupt:
         print(f"\n\n⚠️  操作已取消")
         sys.exit(1)
@@ -307,6 +2857,9 @@ def main():
         import traceback
         traceback.print_exc()
         sys.exit(1)
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
 
 
 if __name__ == "__main__":
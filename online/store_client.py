@@ -0,0 +1,452 @@
+#!/usr/bin/env python3
+"""
+Memento 仓库 - 参考安装客户端
+
+功能：
+- 按应用商店（app_store_manager.dart / download_manager.dart）的协议安装应用：
+  {base}/apps.json -> {base}/{files} -> {base}/{id}/{path}
+- 每个主机一个 keep-alive 连接池，并发下载数有上限
+- 边下载边计算 MD5，校验通过后才把 .part 文件改名为目标文件
+- 中断留下的 .part 文件通过 Range 请求续传
+- 已存在且大小、MD5 一致的文件直接跳过
+- 源可以是 URL，也可以是本地目录（自动用 store_server.py 在随机端口上提供）
+- 报告安装耗时、吞吐、请求数、连接数和单文件延迟分位数，便于衡量协议改动
+
+使用方法：
+    python3 store_client.py --source apps --all                         # 从本地目录安装全部应用
+    python3 store_client.py --source http://127.0.0.1:8899/apps --app timeline --dest ./installed
+    python3 store_client.py --source apps --all --rounds 5 --json result.json  # 重复安装，输出指标
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import shutil
+import hashlib
+import argparse
+import tempfile
+import threading
+import http.client
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Dict, Optional, Tuple
+from urllib.parse import quote, urlsplit
+
+from store_server import DEFAULT_HOST, _serve_process
+
+
+DEFAULT_CONCURRENCY = 8
+DEFAULT_TIMEOUT = 30
+DEFAULT_RETRIES = 2
+READ_CHUNK_SIZE = 64 * 1024
+PART_SUFFIX = '.part'
+
+
+class InstallError(Exception):
+    """单个文件安装失败"""
+
+
+class ConnectionPool:
+    """
+    同一主机的 HTTP/1.1 keep-alive 连接池
+
+    连接在请求之间复用；服务器要求关闭或请求出错时丢弃，下次按需新建。
+    """
+
+    def __init__(self, scheme: str, host: str, port: Optional[int], size: int, timeout: float):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._idle: 'queue.LifoQueue[http.client.HTTPConnection]' = queue.LifoQueue(maxsize=size)
+        self._lock = threading.Lock()
+        self.stats = {'connections': 0, 'requests': 0, 'bytes': 0}
+        self.status_counts: Dict[int, int] = {}
+
+    def _new_connection(self) -> http.client.HTTPConnection:
+        with self._lock:
+            self.stats['connections'] += 1
+        if self.scheme == 'https':
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def _release(self, conn: http.client.HTTPConnection, reusable: bool):
+        if reusable:
+            try:
+                self._idle.put_nowait(conn)
+                return
+            except queue.Full:
+                pass
+        conn.close()
+
+    def request(self, path: str, headers: Optional[Dict[str, str]] = None,
+                sink=None, sink_status: Tuple[int, ...] = (200,)) -> Tuple[int, Dict[str, str], bytes]:
+        """
+        发送 GET 请求
+
+        Args:
+            sink: 提供时，状态码属于 sink_status 的响应体按块传给 sink(chunk)，返回的 body 为空
+
+        Returns:
+            (状态码, 小写响应头, 响应体)
+        """
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._new_connection()
+
+        body = []
+        reusable = False
+        try:
+            try:
+                conn.request('GET', path, headers=headers or {})
+                response = conn.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # 空闲连接已被服务器关闭：新建连接重试一次
+                conn.close()
+                conn = self._new_connection()
+                conn.request('GET', path, headers=headers or {})
+                response = conn.getresponse()
+
+            response_headers = {name.lower(): value for name, value in response.getheaders()}
+            received = 0
+            while True:
+                chunk = response.read(READ_CHUNK_SIZE)
+                if not chunk:
+                    break
+                received += len(chunk)
+                if sink is not None and response.status in sink_status:
+                    sink(chunk)
+                else:
+                    body.append(chunk)
+            reusable = not response.will_close
+        finally:
+            self._release(conn, reusable)
+
+        with self._lock:
+            self.stats['requests'] += 1
+            self.stats['bytes'] += received
+            self.status_counts[response.status] = self.status_counts.get(response.status, 0) + 1
+        return response.status, response_headers, b''.join(body)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class StoreClient:
+    """按 files.json 协议安装应用"""
+
+    def __init__(self, base_url: str, dest: Path, concurrency: int = DEFAULT_CONCURRENCY,
+                 timeout: float = DEFAULT_TIMEOUT, retries: int = DEFAULT_RETRIES):
+        parts = urlsplit(base_url.rstrip('/'))
+        if parts.scheme not in ('http', 'https'):
+            raise ValueError(f"不支持的源地址: {base_url}")
+        self.base_path = parts.path
+        self.dest = dest
+        self.concurrency = concurrency
+        self.retries = retries
+        self.pool = ConnectionPool(parts.scheme, parts.hostname, parts.port, concurrency, timeout)
+        self.counts = {'downloaded': 0, 'resumed': 0, 'skipped': 0, 'failed': 0, 'retries': 0}
+        self.file_latencies: List[float] = []
+        self._lock = threading.Lock()
+
+    def _url_path(self, relative: str) -> str:
+        return quote(f"{self.base_path}/{relative}", safe="/-._~")
+
+    def get_json(self, relative: str):
+        status, _, body = self.pool.request(self._url_path(relative))
+        if status != 200:
+            raise InstallError(f"{relative}: HTTP {status}")
+        return json.loads(body.decode('utf-8'))
+
+    def fetch_apps(self) -> List[Dict]:
+        return self.get_json('apps.json')
+
+    def _count(self, key: str):
+        with self._lock:
+            self.counts[key] += 1
+
+    def install_file(self, app_id: str, entry: Dict) -> str:
+        """
+        安装单个文件
+
+        Returns:
+            'skipped'、'resumed' 或 'downloaded'
+        """
+        target = self.dest / app_id / entry['path']
+        expected_md5 = entry['md5'].lower()
+        size = entry['size']
+
+        # 已存在：大小一致时再计算 MD5
+        if target.is_file() and target.stat().st_size == size:
+            if file_md5(target) == expected_md5:
+                return 'skipped'
+
+        target.parent.mkdir(parents=True, exist_ok=True)
+        part = target.with_name(target.name + PART_SUFFIX)
+        url_path = self._url_path(f"{app_id}/{entry['path']}")
+
+        for attempt in range(self.retries + 1):
+            offset = part.stat().st_size if part.is_file() else 0
+            if offset > size:
+                part.unlink()
+                offset = 0
+
+            # 续传前先把已下载部分计入 MD5
+            hasher = hashlib.md5()
+            if offset:
+                with open(part, 'rb') as f:
+                    for chunk in iter(lambda: f.read(READ_CHUNK_SIZE), b''):
+                        hasher.update(chunk)
+
+            resume = 0 < offset < size
+            try:
+                with open(part, 'ab' if resume else ('r+b' if offset else 'wb')) as f:
+                    def sink(chunk: bytes):
+                        hasher.update(chunk)
+                        f.write(chunk)
+
+                    status = 200
+                    if offset < size:
+                        headers = {'Range': f'bytes={offset}-'} if resume else {}
+                        status, _, _ = self.pool.request(url_path, headers, sink, (206,) if resume else (200,))
+                if status != (206 if resume else 200):
+                    if resume and status == 200:
+                        # 服务器不支持 Range：丢弃已下载部分，从头开始
+                        part.unlink(missing_ok=True)
+                    raise InstallError(f"HTTP {status}")
+            except (InstallError, OSError, http.client.HTTPException) as e:
+                if attempt == self.retries:
+                    raise InstallError(str(e)) from e
+                self._count('retries')
+                continue
+
+            actual = hasher.hexdigest()
+            if part.stat().st_size != size or actual != expected_md5:
+                part.unlink(missing_ok=True)
+                if attempt == self.retries:
+                    raise InstallError(f"MD5 不匹配（期望 {expected_md5}，实际 {actual}）")
+                self._count('retries')
+                continue
+
+            os.replace(part, target)
+            return 'resumed' if offset else 'downloaded'
+        raise InstallError("下载失败")
+
+    def _install_task(self, app_id: str, entry: Dict) -> Optional[str]:
+        start = time.perf_counter()
+        try:
+            result = self.install_file(app_id, entry)
+        except InstallError as e:
+            print(f"❌ {app_id}/{entry['path']}: {e}", file=sys.stderr)
+            self._count('failed')
+            return None
+        with self._lock:
+            self.counts[result] += 1
+            if result != 'skipped':
+                self.file_latencies.append(time.perf_counter() - start)
+        return result
+
+    def install(self, apps: List[Dict]) -> Dict[str, any]:
+        """
+        安装应用：先取回所有 files.json，再在有界线程池中并发下载全部文件
+
+        Returns:
+            每个应用的文件数、字节数和耗时
+        """
+        start = time.perf_counter()
+        manifests = {}
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = {app['id']: executor.submit(self.get_json, app['files']) for app in apps}
+            for app_id, future in futures.items():
+                manifests[app_id] = future.result()
+            manifest_seconds = time.perf_counter() - start
+
+            app_futures = {
+                app_id: [executor.submit(self._install_task, app_id, entry) for entry in entries]
+                for app_id, entries in manifests.items()
+            }
+            per_app = {}
+            for app_id, futures_list in app_futures.items():
+                results = [future.result() for future in futures_list]
+                per_app[app_id] = {
+                    'files': len(results),
+                    'bytes': sum(entry['size'] for entry in manifests[app_id]),
+                    'failed': results.count(None),
+                    # 从开始安装到该应用最后一个文件完成
+                    'seconds': time.perf_counter() - start,
+                }
+        return {'manifest_seconds': manifest_seconds, 'apps': per_app}
+
+
+def file_md5(path: Path) -> str:
+    hasher = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(READ_CHUNK_SIZE), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def percentile_ms(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * p), len(ordered) - 1)] * 1000
+
+
+def start_local_server(directory: Path) -> Tuple[multiprocessing.Process, str]:
+    """在随机端口上用 store_server.py 提供目录的上一级，返回 (进程, 源地址)"""
+    directory = directory.resolve()
+    ready = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_serve_process, args=(str(directory.parent), DEFAULT_HOST, 0, ready),
+                                      daemon=True)
+    process.start()
+    port = ready.get(timeout=10)
+    return process, f"http://{DEFAULT_HOST}:{port}/{quote(directory.name)}"
+
+
+def run_round(base_url: str, dest: Path, app_ids: Optional[List[str]], args) -> Dict[str, any]:
+    """执行一次安装并返回指标"""
+    client = StoreClient(base_url, dest, args.concurrency, args.timeout, args.retries)
+    try:
+        start = time.perf_counter()
+        apps = client.fetch_apps()
+        if app_ids is not None:
+            known = {app['id'] for app in apps}
+            missing = [app_id for app_id in app_ids if app_id not in known]
+            if missing:
+                raise InstallError(f"apps.json 中没有: {', '.join(missing)}")
+            apps = [app for app in apps if app['id'] in app_ids]
+        result = client.install(apps)
+        elapsed = time.perf_counter() - start
+    finally:
+        client.pool.close()
+
+    transferred = client.pool.stats['bytes']
+    return {
+        'seconds': elapsed,
+        'manifest_seconds': result['manifest_seconds'],
+        'apps': result['apps'],
+        **client.counts,
+        'requests': client.pool.stats['requests'],
+        'connections': client.pool.stats['connections'],
+        'bytes_transferred': transferred,
+        'mb_per_second': transferred / elapsed / (1024 * 1024) if elapsed else 0.0,
+        'status': {str(code): count for code, count in sorted(client.pool.status_counts.items())},
+        'file_latency_ms': {
+            'p50': percentile_ms(client.file_latencies, 0.5),
+            'p90': percentile_ms(client.file_latencies, 0.9),
+            'p99': percentile_ms(client.file_latencies, 0.99),
+        },
+    }
+
+
+def print_round(label: str, metrics: Dict[str, any]):
+    print(f"\n📊 {label}")
+    print(f"  安装耗时: {metrics['seconds']:.3f}s（files.json {metrics['manifest_seconds']:.3f}s）")
+    print(f"  下载: {metrics['downloaded']}   续传: {metrics['resumed']}   跳过: {metrics['skipped']}   "
+          f"失败: {metrics['failed']}   重试: {metrics['retries']}")
+    print(f"  请求: {metrics['requests']}   连接: {metrics['connections']}   "
+          f"状态码: {', '.join(f'{code}×{count}' for code, count in metrics['status'].items())}")
+    print(f"  传输: {metrics['bytes_transferred']} 字节, {metrics['mb_per_second']:.1f} MB/s")
+    latency = metrics['file_latency_ms']
+    print(f"  单文件延迟 p50/p90/p99: {latency['p50']:.2f} / {latency['p90']:.2f} / {latency['p99']:.2f} ms")
+    for app_id, app in metrics['apps'].items():
+        print(f"    {app_id}: {app['files']} 个文件, {app['bytes']} 字节, {app['seconds']:.3f}s"
+              + (f", {app['failed']} 个失败" if app['failed'] else ''))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Memento 仓库 - 参考安装客户端',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+示例:
+  %(prog)s --source apps --all                                   # 从本地目录安装全部应用（临时目录）
+  %(prog)s --source http://127.0.0.1:8899/apps --app timeline --dest ./installed
+  %(prog)s --source apps --all --rounds 5 --json result.json      # 冷安装 5 次并输出指标
+  %(prog)s --source apps --all --dest ./installed --keep          # 第二次运行只校验并跳过已有文件
+        """
+    )
+    parser.add_argument('--source', type=str, required=True,
+                        help='源地址（如 http://127.0.0.1:8899/apps）或包含 apps.json 的本地目录')
+    parser.add_argument('--app', type=str, action='append', help='要安装的应用 ID（可重复）')
+    parser.add_argument('--all', action='store_true', help='安装 apps.json 中的全部应用')
+    parser.add_argument('--dest', type=str, help='安装目录（默认为临时目录，结束后删除）')
+    parser.add_argument('--concurrency', '-c', type=int, default=DEFAULT_CONCURRENCY,
+                        help=f'最大并发下载数，也是连接池大小（默认为 {DEFAULT_CONCURRENCY}）')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT, help=f'单次请求超时秒数（默认为 {DEFAULT_TIMEOUT}）')
+    parser.add_argument('--retries', type=int, default=DEFAULT_RETRIES, help=f'每个文件的重试次数（默认为 {DEFAULT_RETRIES}）')
+    parser.add_argument('--rounds', type=int, default=1, help='重复安装次数（默认为 1）')
+    parser.add_argument('--keep', action='store_true', help='各轮之间不清空安装目录（测量跳过/续传）')
+    parser.add_argument('--json', type=str, help='把指标写入 JSON 文件')
+    args = parser.parse_args()
+
+    if not args.all and not args.app:
+        parser.error('需要 --app ID 或 --all')
+
+    process = None
+    base_url = args.source
+    if '://' not in args.source:
+        directory = Path(args.source)
+        if not (directory / 'apps.json').is_file():
+            print(f"❌ 目录中没有 apps.json: {directory}")
+            sys.exit(1)
+        process, base_url = start_local_server(directory)
+
+    temporary = args.dest is None
+    dest = Path(tempfile.mkdtemp(prefix='memento-store-')) if temporary else Path(args.dest)
+
+    print("=" * 60)
+    print(f"📦 安装客户端: {base_url}")
+    print(f"   目标目录: {dest}{'（临时）' if temporary else ''}")
+    print(f"   并发: {args.concurrency}   轮数: {args.rounds}")
+    print("=" * 60)
+
+    rounds = []
+    failed = False
+    try:
+        for round_index in range(args.rounds):
+            if round_index and not args.keep and dest.exists():
+                shutil.rmtree(dest)
+            dest.mkdir(parents=True, exist_ok=True)
+            try:
+                metrics = run_round(base_url, dest, None if args.all else args.app, args)
+            except (InstallError, OSError, ValueError, http.client.HTTPException) as e:
+                print(f"❌ {e}")
+                failed = True
+                break
+            rounds.append(metrics)
+            print_round(f"第 {round_index + 1} 轮", metrics)
+            failed = failed or metrics['failed'] > 0
+    finally:
+        if process is not None:
+            process.terminate()
+            process.join()
+        if temporary:
+            shutil.rmtree(dest, ignore_errors=True)
+
+    if len(rounds) > 1:
+        seconds = sorted(metrics['seconds'] for metrics in rounds)
+        print(f"\n⏱️  安装耗时 最小/中位/最大: {seconds[0]:.3f} / {seconds[len(seconds) // 2]:.3f} / "
+              f"{seconds[-1]:.3f}s")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'source': base_url, 'concurrency': args.concurrency, 'rounds': rounds},
+                      f, indent=2, ensure_ascii=False)
+        print(f"\n✅ 结果已写入: {args.json}")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
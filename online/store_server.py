@@ -0,0 +1,617 @@
+#!/usr/bin/env python3
+"""
+Memento 仓库 - 本地商店服务器
+
+功能：
+- 为 app_store_manager.dart 内置的 http://127.0.0.1:8899 本地源提供 online/ 目录
+- 基于 asyncio，支持大量并发连接和 HTTP/1.1 keep-alive
+- 文件内容与 files.json 一致时 ETag 直接使用其中的 MD5，支持 If-None-Match / If-Modified-Since 返回 304
+- 支持 Range 请求（单区间）
+- 使用 sendfile 零拷贝发送文件
+- 客户端支持时优先发送 generate_files_json.py --compress 生成的预压缩文件
+- 自带负载基准测试（--benchmark）
+
+使用方法：
+    python3 store_server.py                        # 在 127.0.0.1:8899 提供当前目录
+    python3 store_server.py --root online --port 8899
+    python3 store_server.py --benchmark            # 启动服务器并压测
+    python3 store_server.py --benchmark --target http://127.0.0.1:8000  # 压测其他服务器
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import mimetypes
+import multiprocessing
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import List, Dict, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+from generate_files_json import CATALOG_SOURCES, COMPRESSION_SUFFIXES, DEFAULT_CACHE_FILE, FileHashCache, calculate_md5
+
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8899
+MAX_HEADER_SIZE = 64 * 1024
+KEEP_ALIVE_TIMEOUT = 15
+# 不超过该大小的请求体读掉后继续复用连接，更大的直接关闭连接
+MAX_DRAIN_SIZE = 64 * 1024
+
+# 预压缩编码优先级（Accept-Encoding 中的名称）
+ENCODING_PREFERENCE = ('br', 'zstd', 'gzip')
+
+mimetypes.add_type('application/javascript', '.js')
+mimetypes.add_type('application/javascript', '.mjs')
+mimetypes.add_type('application/json', '.json')
+mimetypes.add_type('application/json', '.map')
+mimetypes.add_type('application/wasm', '.wasm')
+mimetypes.add_type('font/woff', '.woff')
+mimetypes.add_type('font/woff2', '.woff2')
+mimetypes.add_type('application/x-msgpack', '.msgpack')
+
+STATUS_TEXT = {
+    200: 'OK',
+    206: 'Partial Content',
+    304: 'Not Modified',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    416: 'Range Not Satisfiable',
+}
+
+
+class ManifestIndex:
+    """
+    files.json 索引：路径 -> (md5, size, 预压缩变体)
+
+    按应用/脚本懒加载，files.json 的 mtime 变化时自动重新读取（配合 --watch 使用）。
+    磁盘文件的 MD5 按 size + mtime_ns + inode 记录：优先复用 generate_files_json.py 的哈希缓存，
+    没有记录时计算一次，之后文件不变就不再读取。
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+        self._items: Dict[Path, Tuple[int, Dict[str, Dict[str, any]]]] = {}
+        self._hash_cache: Optional[FileHashCache] = None
+        self._hash_cache_mtime_ns = None
+        self._content_md5: Dict[str, Tuple[Tuple[int, int, int], str]] = {}
+
+    def lookup(self, relative_parts: Tuple[str, ...]) -> Optional[Dict[str, any]]:
+        """返回 files.json 条目，不在任何清单中时返回 None"""
+        if len(relative_parts) < 3 or relative_parts[0] not in CATALOG_SOURCES:
+            return None
+
+        manifest_path = self.root / relative_parts[0] / relative_parts[1] / 'files.json'
+        try:
+            mtime_ns = manifest_path.stat().st_mtime_ns
+        except OSError:
+            self._items.pop(manifest_path, None)
+            return None
+
+        cached = self._items.get(manifest_path)
+        if cached is None or cached[0] != mtime_ns:
+            try:
+                with open(manifest_path, 'r', encoding='utf-8') as f:
+                    entries = {entry['path']: entry for entry in json.load(f)}
+            except (OSError, ValueError, KeyError, TypeError):
+                entries = {}
+            cached = (mtime_ns, entries)
+            self._items[manifest_path] = cached
+
+        return cached[1].get('/'.join(relative_parts[2:]))
+
+    def known_md5(self, file_path: Path, stat: os.stat_result) -> Optional[str]:
+        """已记录的文件内容 MD5（指纹与当前 stat 一致时），没有记录时返回 None"""
+        fingerprint = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+        known = self._content_md5.get(os.fspath(file_path))
+        if known and known[0] == fingerprint:
+            return known[1]
+
+        cache_path = self.root / DEFAULT_CACHE_FILE
+        try:
+            cache_mtime_ns = cache_path.stat().st_mtime_ns
+        except OSError:
+            cache_mtime_ns = None
+        if cache_mtime_ns is None:
+            # 没有运行过 generate_files_json.py（缓存文件不进入版本库），由调用方计算
+            self._hash_cache = self._hash_cache_mtime_ns = None
+            return None
+        if self._hash_cache is None or cache_mtime_ns != self._hash_cache_mtime_ns:
+            self._hash_cache = FileHashCache(cache_path, self.root)
+            self._hash_cache.load()
+            self._hash_cache_mtime_ns = cache_mtime_ns
+
+        cached = self._hash_cache.lookup(file_path, stat)
+        if cached is None:
+            return None
+        self._content_md5[os.fspath(file_path)] = (fingerprint, cached['md5'])
+        return cached['md5']
+
+    def hash_file(self, file_path: Path, stat: os.stat_result) -> str:
+        """计算并记录文件内容的 MD5（在线程池中调用）"""
+        md5 = calculate_md5(os.fspath(file_path))
+        if md5:
+            self._content_md5[os.fspath(file_path)] = ((stat.st_size, stat.st_mtime_ns, stat.st_ino), md5)
+        return md5
+
+
+class StoreServer:
+    """asyncio 静态文件服务器"""
+
+    def __init__(self, root: Path, quiet: bool = False):
+        self.root = root.resolve()
+        self.index = ManifestIndex(self.root)
+        self.quiet = quiet
+        self.requests = 0
+        self.bytes_sent = 0
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """处理一个连接上的所有请求（HTTP/1.1 keep-alive）"""
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), KEEP_ALIVE_TIMEOUT)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._send_simple(writer, 400, keep_alive=False)
+                    break
+
+                keep_alive = await self._handle_request(head, reader, writer)
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            try:
+                writer.close()
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _handle_request(self, head: bytes, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> bool:
+        """处理单个请求，返回连接是否保持"""
+        try:
+            lines = head.decode('latin-1').split('\r\n')
+            method, target, version = lines[0].split(' ', 2)
+        except ValueError:
+            await self._send_simple(writer, 400, keep_alive=False)
+            return False
+
+        headers = {}
+        for line in lines[1:]:
+            if ':' in line:
+                name, value = line.split(':', 1)
+                headers[name.strip().lower()] = value.strip()
+
+        connection = headers.get('connection', '').lower()
+        keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+        self.requests += 1
+
+        # 请求体不会被使用，但必须读掉，否则会被当成同一连接上的下一个请求
+        if 'transfer-encoding' in headers:
+            keep_alive = False
+        elif headers.get('content-length', '0') != '0':
+            try:
+                body_size = int(headers['content-length'])
+            except ValueError:
+                await self._send_simple(writer, 400, keep_alive=False)
+                return False
+            if keep_alive and 0 < body_size <= MAX_DRAIN_SIZE:
+                try:
+                    await asyncio.wait_for(reader.readexactly(body_size), KEEP_ALIVE_TIMEOUT)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError):
+                    return False
+            else:
+                keep_alive = False
+
+        if method not in ('GET', 'HEAD'):
+            await self._send_simple(writer, 405, keep_alive, {'Allow': 'GET, HEAD'})
+            return keep_alive
+
+        file_path, relative_parts = self._resolve(target)
+        if file_path is None:
+            await self._send_simple(writer, 404, keep_alive)
+            self._log(method, target, 404)
+            return keep_alive
+
+        status = await self._send_file(writer, method, file_path, relative_parts, headers, keep_alive)
+        self._log(method, target, status)
+        return keep_alive
+
+    def _resolve(self, target: str) -> Tuple[Optional[Path], Tuple[str, ...]]:
+        """
+        把请求路径映射到 root 下的文件，拒绝目录穿越和隐藏文件
+
+        反斜杠、盘符和 NUL 在 Windows 上会被当作路径分隔或绝对路径，一律拒绝；
+        最终路径解析后（包括符号链接）仍必须位于 root 之内。
+        """
+        path = unquote(urlsplit(target).path)
+        if '\\' in path or ':' in path or '\0' in path:
+            return None, ()
+        parts = tuple(p for p in path.split('/') if p)
+        if any(p in ('.', '..') or p.startswith('.') for p in parts):
+            return None, ()
+
+        file_path = self.root.joinpath(*parts)
+        if file_path.is_dir():
+            file_path = file_path / 'index.html'
+            parts = parts + ('index.html',)
+        if not file_path.is_file() or not file_path.resolve().is_relative_to(self.root):
+            return None, ()
+        return file_path, parts
+
+    async def _etag(self, file_path: Path, relative_parts: Tuple[str, ...],
+                    stat: os.stat_result) -> Tuple[str, Dict[str, any]]:
+        """
+        优先使用 files.json 中的 MD5 作为强 ETag
+
+        只看文件内容是否与 files.json 记录的 size/md5 一致，与 mtime 先后无关：
+        复制、checkout 或跳过未变化的 files.json 写入后仍然使用强 ETag。
+        文件在 files.json 生成之后被修改时，退回到基于 stat 的弱 ETag。
+        """
+        entry = self.index.lookup(relative_parts)
+        if entry and entry.get('size') == stat.st_size:
+            md5 = self.index.known_md5(file_path, stat)
+            if md5 is None:
+                md5 = await asyncio.get_running_loop().run_in_executor(None, self.index.hash_file, file_path, stat)
+            if md5 == entry['md5']:
+                return f'"{entry["md5"]}"', entry.get('compressed', {})
+        return f'W/"{stat.st_size:x}-{stat.st_mtime_ns:x}"', {}
+
+    def _choose_encoding(self, file_path: Path, stat: os.stat_result, accept_encoding: str,
+                         variants: Dict[str, Dict[str, any]]) -> Optional[Tuple[str, Path]]:
+        """
+        按客户端 Accept-Encoding 选择预压缩文件
+
+        变体必须与 files.json 中记录的大小一致，或者不早于源文件，避免发送过期内容。
+        """
+        accepted = set()
+        for token in accept_encoding.split(','):
+            name, _, params = token.strip().partition(';')
+            if params.replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+                continue
+            accepted.add(name.strip().lower())
+
+        for encoding in ENCODING_PREFERENCE:
+            if encoding not in accepted:
+                continue
+            variant = file_path.with_name(file_path.name + COMPRESSION_SUFFIXES[encoding])
+            try:
+                variant_stat = variant.stat()
+            except OSError:
+                continue
+            recorded = variants.get(encoding)
+            if (recorded and recorded.get('size') == variant_stat.st_size) \
+                    or (not recorded and variant_stat.st_mtime_ns >= stat.st_mtime_ns):
+                return encoding, variant
+        return None
+
+    async def _send_file(self, writer: asyncio.StreamWriter, method: str, file_path: Path,
+                         relative_parts: Tuple[str, ...], headers: Dict[str, str], keep_alive: bool) -> int:
+        stat = file_path.stat()
+        etag, variants = await self._etag(file_path, relative_parts, stat)
+        content_type = mimetypes.guess_type(file_path.name)[0] or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type in ('application/javascript', 'application/json'):
+            content_type += '; charset=utf-8'
+
+        response_headers = {
+            'Content-Type': content_type,
+            'Last-Modified': formatdate(stat.st_mtime, usegmt=True),
+            'Cache-Control': 'no-cache',
+            'Accept-Ranges': 'bytes',
+            'Vary': 'Accept-Encoding',
+            'Access-Control-Allow-Origin': '*',
+        }
+
+        # 预压缩变体（Range 请求始终针对原始文件）
+        send_path, size, encoding = file_path, stat.st_size, None
+        if 'range' not in headers:
+            chosen = self._choose_encoding(file_path, stat, headers.get('accept-encoding', ''), variants)
+            if chosen:
+                encoding, send_path = chosen
+                size = send_path.stat().st_size
+                etag = etag[:-1] + f'-{encoding}"'
+                response_headers['Content-Encoding'] = encoding
+        response_headers['ETag'] = etag
+
+        # 条件请求
+        if self._not_modified(headers, etag, stat):
+            await self._send_head(writer, 304, response_headers, keep_alive)
+            return 304
+
+        status, offset, length = 200, 0, size
+        range_header = headers.get('range')
+        if range_header and (headers.get('if-range') in (None, etag)):
+            parsed = self._parse_range(range_header, size)
+            if parsed is None:
+                response_headers['Content-Range'] = f'bytes */{size}'
+                await self._send_simple(writer, 416, keep_alive, response_headers)
+                return 416
+            if parsed:
+                offset, end = parsed
+                length = end - offset + 1
+                status = 206
+                response_headers['Content-Range'] = f'bytes {offset}-{end}/{size}'
+
+        response_headers['Content-Length'] = str(length)
+        await self._send_head(writer, status, response_headers, keep_alive)
+
+        if method == 'GET' and length:
+            loop = asyncio.get_running_loop()
+            with open(send_path, 'rb') as f:
+                # 零拷贝：底层使用 os.sendfile，不支持时 asyncio 自动回退到读写
+                await loop.sendfile(writer.transport, f, offset, length)
+            self.bytes_sent += length
+        return status
+
+    @staticmethod
+    def _not_modified(headers: Dict[str, str], etag: str, stat: os.stat_result) -> bool:
+        if_none_match = headers.get('if-none-match')
+        if if_none_match is not None:
+            tags = [t.strip() for t in if_none_match.split(',')]
+            weak = etag[2:] if etag.startswith('W/') else etag
+            return '*' in tags or any((t[2:] if t.startswith('W/') else t) == weak for t in tags)
+
+        if_modified_since = headers.get('if-modified-since')
+        if if_modified_since:
+            try:
+                return int(stat.st_mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    @staticmethod
+    def _parse_range(value: str, size: int):
+        """
+        解析单区间 Range 头
+
+        Returns:
+            (start, end)；无法满足时返回 None；格式不支持（如多区间）时返回 () 表示发送完整文件
+        """
+        unit, _, spec = value.partition('=')
+        if unit.strip() != 'bytes' or ',' in spec:
+            return ()
+        start_text, _, end_text = spec.strip().partition('-')
+        try:
+            if not start_text:
+                suffix = int(end_text)
+                if suffix <= 0:
+                    return None
+                start, end = max(size - suffix, 0), size - 1
+            else:
+                start = int(start_text)
+                end = int(end_text) if end_text else size - 1
+        except ValueError:
+            return ()
+        if start >= size or start > end:
+            return None
+        return start, min(end, size - 1)
+
+    async def _send_head(self, writer: asyncio.StreamWriter, status: int, headers: Dict[str, str], keep_alive: bool):
+        lines = [f'HTTP/1.1 {status} {STATUS_TEXT[status]}', f'Date: {formatdate(usegmt=True)}',
+                 'Server: memento-store']
+        lines.extend(f'{name}: {value}' for name, value in headers.items())
+        lines.append(f'Connection: {"keep-alive" if keep_alive else "close"}')
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+        await writer.drain()
+
+    async def _send_simple(self, writer: asyncio.StreamWriter, status: int, keep_alive: bool,
+                           headers: Optional[Dict[str, str]] = None):
+        body = f'{status} {STATUS_TEXT[status]}\n'.encode()
+        response_headers = dict(headers or {})
+        response_headers['Content-Type'] = 'text/plain; charset=utf-8'
+        response_headers['Content-Length'] = str(len(body))
+        await self._send_head(writer, status, response_headers, keep_alive)
+        writer.write(body)
+        await writer.drain()
+
+    def _log(self, method: str, target: str, status: int):
+        if not self.quiet:
+            print(f"  {method} {target} -> {status}")
+
+
+async def serve(root: Path, host: str, port: int, quiet: bool = False, ready=None):
+    """启动服务器并一直运行"""
+    server = StoreServer(root, quiet)
+    listener = await asyncio.start_server(server.handle_connection, host, port,
+                                          limit=MAX_HEADER_SIZE, backlog=1024, reuse_address=True)
+    bound_port = listener.sockets[0].getsockname()[1]
+    if ready is not None:
+        ready.put(bound_port)
+    else:
+        print(f"🚀 Memento 商店服务器: http://{host}:{bound_port}/ (root: {server.root})")
+    async with listener:
+        await listener.serve_forever()
+
+
+def _serve_process(root: str, host: str, port: int, ready):
+    try:
+        asyncio.run(serve(Path(root), host, port, quiet=True, ready=ready))
+    except KeyboardInterrupt:
+        pass
+
+
+# ==================== 负载基准测试 ====================
+
+def collect_benchmark_paths(root: Path) -> List[str]:
+    """收集所有 files.json 中列出的文件 URL 路径"""
+    paths = []
+    for item_type in CATALOG_SOURCES:
+        type_path = root / item_type
+        if not type_path.is_dir():
+            continue
+        for manifest in sorted(type_path.glob('*/files.json')):
+            try:
+                with open(manifest, 'r', encoding='utf-8') as f:
+                    entries = json.load(f)
+            except (OSError, ValueError):
+                continue
+            item_dir = manifest.parent.name
+            paths.extend(f'/{item_type}/{item_dir}/{entry["path"]}' for entry in entries)
+    return paths
+
+
+async def _benchmark_worker(host: str, port: int, paths: List[str], counter: List[int], total: int,
+                            latencies: List[float], stats: Dict[str, int], extra_headers: str):
+    reader = writer = None
+    while True:
+        index = counter[0]
+        if index >= total:
+            break
+        counter[0] += 1
+        path = paths[index % len(paths)]
+
+        if writer is None:
+            reader, writer = await asyncio.open_connection(host, port, limit=MAX_HEADER_SIZE)
+            stats['connections'] += 1
+
+        start = time.perf_counter()
+        writer.write(f'GET {path} HTTP/1.1\r\nHost: {host}\r\n{extra_headers}\r\n'.encode())
+        head = await reader.readuntil(b'\r\n\r\n')
+        lines = head.decode('latin-1').split('\r\n')
+        status = int(lines[0].split(' ', 2)[1])
+        headers = {}
+        for line in lines[1:]:
+            if ':' in line:
+                name, value = line.split(':', 1)
+                headers[name.strip().lower()] = value.strip()
+
+        if 'content-length' in headers:
+            body = await reader.readexactly(int(headers['content-length']))
+        else:
+            body = await reader.read()
+        latencies.append(time.perf_counter() - start)
+        stats['bytes'] += len(body)
+        stats[f'status_{status}'] = stats.get(f'status_{status}', 0) + 1
+
+        if headers.get('connection', '').lower() == 'close' or lines[0].startswith('HTTP/1.0') \
+                and headers.get('connection', '').lower() != 'keep-alive':
+            writer.close()
+            reader = writer = None
+
+    if writer is not None:
+        writer.close()
+
+
+async def run_benchmark(host: str, port: int, paths: List[str], connections: int, requests: int,
+                        extra_headers: str = '') -> Dict[str, any]:
+    """以固定并发连接数发送请求，统计吞吐和延迟"""
+    counter = [0]
+    latencies: List[float] = []
+    stats = {'bytes': 0, 'connections': 0}
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        _benchmark_worker(host, port, paths, counter, requests, latencies, stats, extra_headers)
+        for _ in range(connections)
+    ))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+
+    def percentile(p: float) -> float:
+        return latencies[min(int(len(latencies) * p), len(latencies) - 1)] * 1000 if latencies else 0.0
+
+    return {
+        'requests': len(latencies),
+        'seconds': elapsed,
+        'requests_per_second': len(latencies) / elapsed if elapsed else 0.0,
+        'mb_per_second': stats['bytes'] / elapsed / (1024 * 1024) if elapsed else 0.0,
+        'latency_ms': {'p50': percentile(0.5), 'p90': percentile(0.9), 'p99': percentile(0.99)},
+        **stats,
+    }
+
+
+def benchmark_main(args):
+    root = Path(args.root).resolve()
+    paths = collect_benchmark_paths(root)
+    if not paths:
+        print(f"❌ 未在 {root} 中找到任何 files.json，无法压测")
+        sys.exit(1)
+
+    process = None
+    if args.target:
+        target = urlsplit(args.target)
+        host, port = target.hostname, target.port or 80
+    else:
+        ready = multiprocessing.Queue()
+        process = multiprocessing.Process(target=_serve_process, args=(str(root), args.host, 0, ready), daemon=True)
+        process.start()
+        host, port = args.host, ready.get(timeout=10)
+
+    print("=" * 60)
+    print(f"⏱️  负载基准测试: http://{host}:{port}/")
+    print(f"   {len(paths)} 个文件, {args.connections} 个并发连接, {args.requests} 个请求")
+    print("=" * 60)
+
+    scenarios = [
+        ('完整下载', ''),
+        ('gzip 协商', 'Accept-Encoding: gzip, br\r\n'),
+        ('Range 0-1023', 'Range: bytes=0-1023\r\n'),
+    ]
+    results = {}
+    try:
+        for label, extra_headers in scenarios:
+            result = asyncio.run(run_benchmark(host, port, paths, args.connections, args.requests, extra_headers))
+            results[label] = result
+            codes = ', '.join(f"{k[7:]}×{v}" for k, v in sorted(result.items()) if k.startswith('status_'))
+            print(f"\n📊 {label}")
+            print(f"  请求/秒: {result['requests_per_second']:.0f}   吞吐: {result['mb_per_second']:.1f} MB/s")
+            print(f"  延迟 p50/p90/p99: {result['latency_ms']['p50']:.2f} / {result['latency_ms']['p90']:.2f} / "
+                  f"{result['latency_ms']['p99']:.2f} ms")
+            print(f"  连接数: {result['connections']}   状态码: {codes}")
+    finally:
+        if process is not None:
+            process.terminate()
+            process.join()
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"\n✅ 结果已写入: {args.json}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Memento 仓库 - 本地商店服务器',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+示例:
+  %(prog)s                                    # 在 127.0.0.1:8899 提供当前目录
+  %(prog)s --root online                      # 指定仓库目录
+  %(prog)s --benchmark                        # 启动服务器并压测
+  %(prog)s --benchmark --target http://127.0.0.1:8000   # 压测其他服务器（如 python -m http.server）
+        """
+    )
+    parser.add_argument('--root', type=str, default=str(Path(__file__).parent),
+                        help='要提供的仓库目录（默认为脚本所在的 online/ 目录）')
+    parser.add_argument('--host', type=str, default=DEFAULT_HOST, help=f'监听地址（默认为 {DEFAULT_HOST}）')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'监听端口（默认为 {DEFAULT_PORT}）')
+    parser.add_argument('--quiet', action='store_true', help='不输出访问日志')
+    parser.add_argument('--benchmark', action='store_true', help='运行负载基准测试')
+    parser.add_argument('--target', type=str, help='压测指定服务器而不是启动内置服务器')
+    parser.add_argument('--connections', type=int, default=64, help='压测并发连接数（默认为 64）')
+    parser.add_argument('--requests', type=int, default=5000, help='每个场景的请求总数（默认为 5000）')
+    parser.add_argument('--json', type=str, help='把压测结果写入 JSON 文件')
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark_main(args)
+        return
+
+    root = Path(args.root)
+    if not root.is_dir():
+        print(f"❌ 错误: 目录不存在 - {root}")
+        sys.exit(1)
+
+    try:
+        asyncio.run(serve(root, args.host, args.port, args.quiet))
+    except KeyboardInterrupt:
+        print(f"\n⚠️  服务器已停止")
+
+
+if __name__ == "__main__":
+    main()
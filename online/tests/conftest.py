@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# online/ 下的脚本以模块名互相导入（store_client 导入 store_server 等）
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
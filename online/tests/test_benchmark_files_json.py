@@ -0,0 +1,24 @@
+import benchmark_files_json as bench
+from generate_files_json import write_item_manifest
+
+
+def test_write_phases_write_every_round(tmp_path, monkeypatch):
+    sample_size = bench.parse_size_distribution('fixed:256')
+    stats = bench.build_synthetic_tree(tmp_path, 2, 20, sample_size, 0.0, 1)
+
+    written = []
+
+    def recording_write(item_path, files_info, dry_run=False):
+        result = write_item_manifest(item_path, files_info, dry_run)
+        written.append(result)
+        return result
+
+    monkeypatch.setattr(bench, 'write_item_manifest', recording_write)
+    phases = bench.run_phases(tmp_path, stats, 1, False, ('md5',), 3)
+
+    # 每轮都重新写入两个应用的 files.json，而不是只比较出内容相同
+    assert written == [True] * 6
+    assert set(phases) == {'scan', 'hash', 'write', 'end_to_end_cold', 'end_to_end_cached'}
+    for values in phases.values():
+        if values['peak_rss_mb'] is not None:
+            assert values['rss_growth_mb'] >= 0
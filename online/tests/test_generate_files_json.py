@@ -0,0 +1,87 @@
+import json
+import os
+
+import pytest
+
+import generate_files_json as gen
+
+
+def chunked(data: bytes, size: int = 4):
+    return (data[i:i + size] for i in range(0, len(data), size))
+
+
+def test_write_if_changed_skips_identical_content(tmp_path):
+    path = tmp_path / 'files.json'
+    assert gen.write_if_changed(path, chunked(b'{"a": 1}'))
+    os.utime(path, ns=(1_000_000_000, 1_000_000_000))
+
+    assert not gen.write_if_changed(path, chunked(b'{"a": 1}'))
+    assert path.stat().st_mtime_ns == 1_000_000_000
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['files.json']
+
+
+@pytest.mark.parametrize('new', [b'{"a": 2}', b'{"a": 1}, "b": 2}', b'{"a"', b''])
+def test_write_if_changed_replaces_different_content(tmp_path, new):
+    path = tmp_path / 'files.json'
+    path.write_bytes(b'{"a": 1}')
+
+    assert gen.write_if_changed(path, chunked(new))
+    assert path.read_bytes() == new
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['files.json']
+
+
+def test_write_if_changed_keeps_old_file_on_error(tmp_path):
+    path = tmp_path / 'files.json'
+    path.write_bytes(b'{"a": 1}')
+
+    def failing():
+        yield b'{"b"'
+        raise RuntimeError('serialization failed')
+
+    with pytest.raises(RuntimeError):
+        gen.write_if_changed(path, failing())
+    assert path.read_bytes() == b'{"a": 1}'
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['files.json']
+
+
+def manifest(**files):
+    return [{'path': path, 'md5': md5, 'size': len(md5)} for path, md5 in files.items()]
+
+
+def read_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_history_records_delta_between_versions(tmp_path):
+    v1 = manifest(**{'index.js': 'aaaa', 'style.css': 'bbbb'})
+    v2 = manifest(**{'index.js': 'cccccc', 'main.js': 'dddd'})
+
+    assert gen.update_manifest_history(tmp_path, v1) == 1
+    assert gen.update_manifest_history(tmp_path, v1) == 1
+    assert gen.update_manifest_history(tmp_path, v2) == 2
+
+    history = read_json(tmp_path / gen.HISTORY_FILE)
+    assert history['version'] == 2
+    assert history['deltas'] == [{
+        'from': 1,
+        'to': 2,
+        'added': [{'path': 'main.js', 'md5': 'dddd', 'size': 4}],
+        'removed': ['style.css'],
+        'modified': [{'path': 'index.js', 'old_md5': 'aaaa', 'md5': 'cccccc', 'size': 6}],
+    }]
+    assert read_json(tmp_path / gen.PREVIOUS_MANIFEST_FILE) == v1
+    assert read_json(tmp_path / gen.RECORDED_MANIFEST_FILE) == v2
+
+
+def test_history_ignores_unrecorded_files_json(tmp_path):
+    v1 = manifest(**{'index.js': 'aaaa'})
+    v2 = manifest(**{'index.js': 'bbbb'})
+    assert gen.update_manifest_history(tmp_path, v1) == 1
+
+    # 不带 --history 的运行已经把 files.json 改写为新内容
+    (tmp_path / 'files.json').write_text(json.dumps(v2), encoding='utf-8')
+
+    assert gen.update_manifest_history(tmp_path, v2) == 2
+    delta = read_json(tmp_path / gen.HISTORY_FILE)['deltas'][-1]
+    assert delta['modified'] == [{'path': 'index.js', 'old_md5': 'aaaa', 'md5': 'bbbb', 'size': 4}]
@@ -0,0 +1,100 @@
+import json
+import shutil
+import http.client
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import pytest
+
+from generate_files_json import DEFAULT_CACHE_FILE
+from store_client import StoreClient, start_local_server, file_md5
+
+
+APPS_DIR = Path(__file__).resolve().parent.parent / 'apps'
+
+
+@pytest.fixture
+def served_apps(tmp_path):
+    """在随机端口上提供 online/apps 的副本（没有 generate_files_json.py 的哈希缓存）"""
+    apps = tmp_path / 'online' / 'apps'
+    shutil.copytree(APPS_DIR, apps)
+    assert not (apps.parent / DEFAULT_CACHE_FILE).exists()
+    process, base_url = start_local_server(apps)
+    try:
+        yield apps, base_url
+    finally:
+        process.terminate()
+        process.join(5)
+
+
+def _head(base_url: str, relative: str):
+    parts = urlsplit(base_url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=10)
+    try:
+        conn.request('HEAD', f"{parts.path}/{relative}")
+        response = conn.getresponse()
+        response.read()
+        return response.status, dict((k.lower(), v) for k, v in response.getheaders())
+    finally:
+        conn.close()
+
+
+def test_install_all_apps_without_hash_cache(served_apps, tmp_path):
+    apps, base_url = served_apps
+    client = StoreClient(base_url, tmp_path / 'installed')
+    try:
+        catalog = client.fetch_apps()
+        result = client.install(catalog)
+    finally:
+        client.pool.close()
+
+    assert catalog
+    assert all(app['failed'] == 0 for app in result['apps'].values())
+    assert client.counts['failed'] == 0
+    for app in catalog:
+        app_dir = apps / app['files'].split('/', 1)[0]
+        with open(apps / app['files'], 'r', encoding='utf-8') as f:
+            entries = json.load(f)
+        assert client.counts['downloaded'] >= len(entries)
+        for entry in entries:
+            installed = tmp_path / 'installed' / app['id'] / entry['path']
+            assert file_md5(installed) == entry['md5']
+            assert installed.read_bytes() == (app_dir / entry['path']).read_bytes()
+
+
+def test_strong_etag_follows_content_not_mtime(served_apps):
+    apps, base_url = served_apps
+    app_dir = next(path.parent for path in sorted(apps.glob('*/files.json')))
+    with open(app_dir / 'files.json', 'r', encoding='utf-8') as f:
+        entry = json.load(f)[0]
+    relative = f"{app_dir.name}/{entry['path']}"
+
+    status, headers = _head(base_url, relative)
+    assert status == 200
+    assert headers['etag'] == f'"{entry["md5"]}"'
+
+    # 复制（新的 mtime 和 inode）后内容不变，仍是强 ETag
+    target = app_dir / entry['path']
+    copy = target.with_name(target.name + '.copy')
+    shutil.copy(target, copy)
+    copy.replace(target)
+    assert _head(base_url, relative)[1]['etag'] == f'"{entry["md5"]}"'
+
+    # 内容改变后退回弱 ETag
+    data = bytearray(target.read_bytes())
+    data[0] ^= 1
+    target.write_bytes(bytes(data))
+    assert _head(base_url, relative)[1]['etag'].startswith('W/')
+
+
+@pytest.mark.parametrize('relative', [
+    '..%5C..%5Csecret.txt',
+    '%2e%2e/%2e%2e/secret.txt',
+    'C:%5Csecret.txt',
+    'link.txt',
+])
+def test_paths_outside_root_are_rejected(served_apps, relative):
+    apps, base_url = served_apps
+    (apps.parent.parent / 'secret.txt').write_text('secret')
+    (apps / 'link.txt').symlink_to(apps.parent.parent / 'secret.txt')
+    assert _head(base_url, relative)[0] == 404
@@ -1,26 +1,246 @@
 #!/usr/bin/env python3
 """
 Dart Import Converter - Convert relative imports to package imports
+
+Files are scanned in parallel across a process pool. Only the directive header
+of each file (comments, library/import/export/part) is read, and changes are
+streamed to CSV or JSONL instead of being collected in memory.
+
+Incremental runs reuse per-file results from a content-hash cache
+(--incremental) and/or limit the scan to files changed in git
+(--changed-since REF, --staged), e.g. as a pre-commit hook:
+
+    python scripts/convert_imports_v2.py --staged --incremental --check
 """
 
 import os
 import re
 import sys
 import csv
+import json
+import time
+import hashlib
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Tuple, Optional
+from typing import List, Tuple, Optional, Dict, Iterable, Iterator, TextIO
+
+
+# Compiled once per process and shared by every file
+RELATIVE_IMPORT_PATTERN = re.compile(r"import\s+['\"]((\.\./)+[^'\"]+)['\"];")
+HEADER_DIRECTIVE_PATTERN = re.compile(r"(library|import|export|part)\b|@|#!")
+DIRECTIVE_PATTERN = re.compile(r"\b(import|export|part)\s+(?!of\b)(['\"])([^'\"]+)\2([^;]*);")
+CONDITIONAL_URI_PATTERN = re.compile(r"\bif\s*\([^)]*\)\s*(['\"])([^'\"]+)\1")
+COMMENT_PATTERN = re.compile(r"//[^\n]*|/\*.*?\*/", re.S)
+IDENTIFIER_PATTERN = re.compile(r"[A-Za-z_$][\w$]*")
+
+SAMPLE_LIMIT = 20
+FILES_PER_TASK = 32
+
+# Bump when conversion logic changes so cached results are discarded
+CACHE_VERSION = 1
+DEFAULT_CACHE_PATH = os.path.join('.dart_tool', 'import_converter_cache.json')
+
+
+def iter_header_lines(lines) -> Iterator[Tuple[int, str]]:
+    """
+    Yield (line_num, line) for the directive header of a Dart file
+
+    The header is everything before the first declaration: blank lines,
+    comments, annotations and library/import/export/part directives (which
+    may span several lines). Dart does not allow directives after the first
+    declaration, so scanning can stop there.
+    """
+    in_block_comment = False
+    in_directive = False
+
+    for line_num, line in enumerate(lines, 1):
+        stripped = line.strip()
+
+        if in_block_comment:
+            if '*/' in stripped:
+                in_block_comment = False
+        elif in_directive:
+            if ';' in stripped:
+                in_directive = False
+        elif not stripped or stripped.startswith('//'):
+            pass
+        elif stripped.startswith('/*'):
+            in_block_comment = '*/' not in stripped[2:]
+        elif HEADER_DIRECTIVE_PATTERN.match(stripped):
+            in_directive = not stripped.startswith(('@', '#!')) and ';' not in stripped
+        else:
+            return
+
+        yield line_num, line
+
+
+def parse_directives(lines) -> List[Dict]:
+    """
+    Parse the import/export/part directives in the header of a Dart file
+
+    Multi-line directives, show/hide combinators, `deferred as` and
+    conditional imports (`if (dart.library.io) 'uri'`) are supported;
+    conditional URIs are reported as extra directives of the same kind.
+
+    Returns:
+        List of {'kind', 'uri', 'line', 'end_line', 'deferred', 'prefix', 'show', 'hide'}
+        in source order; show/hide are lists of names, or None without that combinator
+    """
+    header = ''.join(line for _, line in iter_header_lines(lines))
+    # Blank out comments but keep newlines, so match offsets still map to line numbers
+    header = COMMENT_PATTERN.sub(lambda m: re.sub(r'[^\n]', ' ', m.group()), header)
+
+    directives = []
+    for match in DIRECTIVE_PATTERN.finditer(header):
+        kind, uri, tail = match.group(1), match.group(3), match.group(4)
+        line = header.count('\n', 0, match.start(1)) + 1
+        end_line = line + header.count('\n', match.start(1), match.end())
+        deferred = re.search(r'\bdeferred\s+as\b', tail) is not None
+        # Tail tokens: [deferred] [as prefix] then any number of show/hide name lists
+        prefix = None
+        combinators = {'show': None, 'hide': None}
+        current = None
+        tokens = IDENTIFIER_PATTERN.findall(CONDITIONAL_URI_PATTERN.sub(' ', tail))
+        for i, token in enumerate(tokens):
+            if token in combinators:
+                current = token
+                combinators[current] = combinators[current] or []
+            elif token == 'as' and i + 1 < len(tokens):
+                prefix = tokens[i + 1]
+                current = None
+            elif current and token != prefix:
+                combinators[current].append(token)
+        directive = {'kind': kind, 'uri': uri, 'line': line, 'end_line': end_line, 'deferred': deferred,
+                     'prefix': prefix, **combinators}
+        directives.append(directive)
+        for conditional in CONDITIONAL_URI_PATTERN.finditer(tail):
+            directives.append({**directive, 'uri': conditional.group(2)})
+    return directives
+
+
+class ConversionCache:
+    """
+    Per-file conversion results keyed by content hash
+
+    A file whose size and mtime are unchanged is not read at all; otherwise its
+    sha1 is compared with the cached one, and only files with new content are
+    scanned again. Results are only valid for the package name they were made for.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, package_name: str = "Memento"):
+        self.path = path
+        self.package_name = package_name
+        self.files: Dict[str, Dict] = {}
+        self.hits = 0
+        self._digests: Dict[str, str] = {}
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('version') == CACHE_VERSION and data.get('package') == self.package_name:
+            self.files = data.get('files', {})
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': CACHE_VERSION, 'package': self.package_name, 'files': self.files},
+                      f, separators=(',', ':'), sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def lookup(self, file_path: str, st: os.stat_result) -> Optional[List[Dict]]:
+        """Cached changes for an unchanged file, or None when it has to be scanned"""
+        entry = self.files.get(file_path)
+        if entry is None:
+            return None
+        if entry['size'] == st.st_size and entry['mtime_ns'] == st.st_mtime_ns:
+            self.hits += 1
+            return entry['changes']
+        try:
+            with open(file_path, 'rb') as f:
+                digest = hashlib.sha1(f.read()).hexdigest()
+        except OSError:
+            return None
+        self._digests[file_path] = digest
+        if digest != entry['hash']:
+            return None
+        entry['size'], entry['mtime_ns'] = st.st_size, st.st_mtime_ns
+        self.hits += 1
+        return entry['changes']
+
+    def store(self, file_path: str, st: os.stat_result, changes: List[Dict]):
+        digest = self._digests.pop(file_path, None)
+        if digest is None:
+            try:
+                with open(file_path, 'rb') as f:
+                    digest = hashlib.sha1(f.read()).hexdigest()
+            except OSError:
+                return
+        self.files[file_path] = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'hash': digest,
+                                 'changes': changes}
+
+    def forget(self, file_path: str):
+        self.files.pop(file_path, None)
+        self._digests.pop(file_path, None)
+
+    def prune(self, present: Iterable[str]):
+        """Drop entries for files that no longer exist (full scans only)"""
+        present = set(present)
+        for file_path in [path for path in self.files if path not in present]:
+            del self.files[file_path]
+
+
+def git_changed_dart_files(lib_dir: str = "lib", base_ref: Optional[str] = None,
+                           staged: bool = False) -> List[str]:
+    """
+    Dart files under lib_dir that differ from base_ref (or are staged)
+
+    With base_ref, tracked files changed in the working tree since base_ref
+    and untracked files are included. Deleted files are skipped.
+
+    Raises:
+        RuntimeError: git is unavailable, this is not a repository, or the ref is unknown
+    """
+    def git(*args: str) -> List[str]:
+        try:
+            result = subprocess.run(['git', *args], capture_output=True, text=True, check=True)
+        except (OSError, subprocess.CalledProcessError) as e:
+            stderr = getattr(e, 'stderr', '') or str(e)
+            raise RuntimeError(f"git {' '.join(args)} failed: {stderr.strip()}")
+        return [line for line in result.stdout.splitlines() if line]
+
+    top = git('rev-parse', '--show-toplevel')[0]
+    if staged:
+        names = git('diff', '--cached', '--name-only', '--diff-filter=ACMR')
+    else:
+        names = git('diff', '--name-only', '--diff-filter=ACMR', base_ref or 'HEAD')
+        names += git('ls-files', '--others', '--exclude-standard', '--full-name')
+
+    lib_prefix = os.path.normpath(lib_dir) + os.sep
+    dart_files = set()
+    for name in names:
+        if not name.endswith('.dart'):
+            continue
+        file_path = os.path.relpath(os.path.join(top, name))
+        if (file_path + os.sep).startswith(lib_prefix) or file_path.startswith(lib_prefix):
+            if os.path.isfile(file_path):
+                dart_files.add(file_path)
+    return sorted(dart_files)
 
 
 class DartImportConverter:
     def __init__(self, package_name: str = "Memento"):
         self.package_name = package_name
-        self.changes = []
+        self.total_changes = 0
+        self.sample_changes = []
 
     def convert_relative_to_package_import(self, import_line: str, current_file: str) -> Optional[Tuple[str, str]]:
         """Convert relative import to package import"""
-        pattern = r"import\s+['\"]((\.\./)+[^'\"]+)['\"];"
-
-        match = re.match(pattern, import_line.strip())
+        match = RELATIVE_IMPORT_PATTERN.match(import_line.strip())
         if not match:
             return None
 
@@ -62,84 +282,130 @@ class DartImportConverter:
 
         return new_import, conversion_note
 
-    def process_dart_file(self, file_path: str, dry_run: bool = True) -> bool:
-        """Process a single Dart file"""
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-
-            lines = content.split('\n')
-            new_lines = []
-            modified = False
-
-            for line_num, line in enumerate(lines, 1):
-                result = self.convert_relative_to_package_import(line, file_path)
-                if result:
-                    new_import, conversion_note = result
-                    self.changes.append({
-                        'file': file_path,
-                        'line': line_num,
-                        'old': line.strip(),
-                        'new': new_import,
-                        'note': conversion_note
-                    })
-
-                    if not dry_run:
-                        new_lines.append(new_import)
-                    else:
-                        new_lines.append(line)
-                    modified = True
-                else:
-                    new_lines.append(line)
+    def process_dart_file(self, file_path: str, dry_run: bool = True) -> List[Dict]:
+        """
+        Process a single Dart file
 
-            if modified and not dry_run:
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write('\n'.join(new_lines))
+        Only the directive header is scanned. The rest of the file is read
+        only when a conversion has to be written back.
 
-            return modified
+        Returns:
+            List of changes for this file (empty when nothing to convert)
+        """
+        changes = []
+        try:
+            # newline='' keeps the original line endings so rewritten files stay CRLF/LF as they were
+            with open(file_path, 'r', encoding='utf-8', newline='') as f:
+                for line_num, line in iter_header_lines(f):
+                    result = self.convert_relative_to_package_import(line, file_path)
+                    if result:
+                        new_import, conversion_note = result
+                        changes.append({
+                            'file': file_path,
+                            'line': line_num,
+                            'old': line.strip(),
+                            'new': new_import,
+                            'note': conversion_note
+                        })
+
+            if changes and not dry_run:
+                with open(file_path, 'r', encoding='utf-8', newline='') as f:
+                    lines = f.read().split('\n')
+                for change in changes:
+                    line = lines[change['line'] - 1]
+                    lines[change['line'] - 1] = change['new'] + ('\r' if line.endswith('\r') else '')
+                with open(file_path, 'w', encoding='utf-8', newline='') as f:
+                    f.write('\n'.join(lines))
 
         except Exception as e:
             print(f"Error processing {file_path}: {e}", file=sys.stderr)
-            return False
+            return []
+
+        return changes
 
     def find_dart_files(self, lib_dir: str = "lib") -> List[str]:
-        """Find all Dart files"""
+        """Find all Dart files (sorted, so output order is stable)"""
         dart_files = []
         if not os.path.exists(lib_dir):
             print(f"Directory {lib_dir} does not exist", file=sys.stderr)
             return dart_files
 
         for root, dirs, files in os.walk(lib_dir):
-            for file in files:
+            dirs.sort()
+            for file in sorted(files):
                 if file.endswith('.dart'):
                     dart_files.append(os.path.join(root, file))
 
         return dart_files
 
-    def export_changes_to_csv(self, filename: str = "import_changes.csv"):
-        """Export all changes to CSV file"""
-        if not self.changes:
-            print("No changes to export")
+    def iter_file_changes(self, dart_files: List[str], dry_run: bool = True,
+                          jobs: int = 0) -> Iterator[List[Dict]]:
+        """
+        Yield the change list of each file, in the order of dart_files
+
+        Files are processed in a process pool in batches; jobs=1 runs in this process.
+        """
+        jobs = jobs if jobs > 0 else (os.cpu_count() or 1)
+        if jobs == 1 or len(dart_files) < FILES_PER_TASK:
+            for file_path in dart_files:
+                yield self.process_dart_file(file_path, dry_run)
             return
 
-        with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-            fieldnames = ['file', 'line', 'old_import', 'new_import', 'conversion_note']
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-
-            writer.writeheader()
-            for change in self.changes:
-                writer.writerow({
-                    'file': change['file'],
-                    'line': change['line'],
-                    'old_import': change['old'],
-                    'new_import': change['new'],
-                    'conversion_note': change['note']
-                })
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            yield from executor.map(_process_file, [(self.package_name, path, dry_run) for path in dart_files],
+                                    chunksize=FILES_PER_TASK)
 
-        print(f"Changes exported to: {filename}")
+    def iter_file_changes_cached(self, dart_files: List[str], cache: ConversionCache, dry_run: bool = True,
+                                 jobs: int = 0) -> Iterator[List[Dict]]:
+        """
+        Same as iter_file_changes, but unchanged files are answered from the cache
 
-    def run(self, dry_run: bool = True, export_csv: bool = False):
-        """Execute conversion"""
+        In apply mode, files with cached pending conversions are still processed
+        so they actually get rewritten.
+        """
+        stats = {}
+        to_process = []
+        for file_path in dart_files:
+            try:
+                st = os.stat(file_path)
+            except OSError:
+                continue
+            stats[file_path] = st
+            cached = cache.lookup(file_path, st)
+            if cached is None or (cached and not dry_run):
+                to_process.append(file_path)
+
+        processed = iter(zip(to_process, self.iter_file_changes(to_process, dry_run, jobs)))
+        next_processed = next(processed, None)
+        for file_path in dart_files:
+            if file_path not in stats:
+                continue
+            if next_processed is not None and next_processed[0] == file_path:
+                changes = next_processed[1]
+                next_processed = next(processed, None)
+                if changes and not dry_run:
+                    # Rewritten on disk: rescan next time
+                    cache.forget(file_path)
+                else:
+                    cache.store(file_path, stats[file_path], changes)
+                yield changes
+            else:
+                yield cache.files[file_path]['changes']
+
+    def run(self, dry_run: bool = True, export_csv: Optional[str] = None, export_jsonl: Optional[str] = None,
+            jobs: int = 0, lib_dir: str = "lib", files: Optional[List[str]] = None,
+            cache: Optional[ConversionCache] = None) -> int:
+        """
+        Execute conversion
+
+        Args:
+            files: Only process these files (e.g. from git); default is every file under lib_dir
+            cache: Reuse results for unchanged files
+
+        Returns:
+            Number of conversions found
+        """
+        start = time.perf_counter()
         print("=" * 70)
         print("Dart Import Converter")
         print(f"Package Name: {self.package_name}")
@@ -147,36 +413,76 @@ class DartImportConverter:
         print("=" * 70)
         print()
 
-        dart_files = self.find_dart_files("lib")
-        print(f"Found {len(dart_files)} Dart files\n")
+        if files is None:
+            dart_files = self.find_dart_files(lib_dir)
+            print(f"Found {len(dart_files)} Dart files\n")
+        else:
+            dart_files = files
+            print(f"Selected {len(dart_files)} changed Dart files\n")
+        discover_seconds = time.perf_counter() - start
+
+        writers = []
+        if export_csv:
+            writers.append(ChangeWriter(export_csv, 'csv'))
+        if export_jsonl:
+            writers.append(ChangeWriter(export_jsonl, 'jsonl'))
 
         total_files_modified = 0
-        for file_path in dart_files:
-            if self.process_dart_file(file_path, dry_run):
+        scan_start = time.perf_counter()
+        try:
+            if cache is not None:
+                file_changes = self.iter_file_changes_cached(dart_files, cache, dry_run, jobs)
+            else:
+                file_changes = self.iter_file_changes(dart_files, dry_run, jobs)
+            for changes in file_changes:
+                if not changes:
+                    continue
                 total_files_modified += 1
+                self.total_changes += len(changes)
+                for writer in writers:
+                    writer.write(changes)
+                if len(self.sample_changes) < SAMPLE_LIMIT:
+                    self.sample_changes.extend(changes[:SAMPLE_LIMIT - len(self.sample_changes)])
+        finally:
+            for writer in writers:
+                writer.close()
+        if cache is not None:
+            if files is None:
+                cache.prune(dart_files)
+            cache.save()
+        scan_seconds = time.perf_counter() - scan_start
+        total_seconds = time.perf_counter() - start
 
         print("\n" + "=" * 70)
         print("Summary:")
         print(f"  Files scanned: {len(dart_files)}")
         print(f"  Files to modify: {total_files_modified}")
-        print(f"  Total conversions: {len(self.changes)}")
-
-        if export_csv:
-            self.export_changes_to_csv()
+        print(f"  Total conversions: {self.total_changes}")
+        if cache is not None:
+            print(f"  Cached results: {cache.hits}")
+        print(f"  Time: {total_seconds:.3f}s (discover {discover_seconds:.3f}s, scan {scan_seconds:.3f}s, "
+              f"{len(dart_files) / scan_seconds if scan_seconds > 0 else 0:.0f} files/s)")
+
+        for writer in writers:
+            if writer.count:
+                print(f"Changes exported to: {writer.path}")
+            else:
+                print(f"No changes to export ({writer.path} contains only the header)"
+                      if writer.fmt == 'csv' else f"No changes to export ({writer.path} is empty)")
 
-        if self.changes:
+        if self.sample_changes:
             print("\n" + "=" * 70)
-            print("Sample conversions (first 20):")
+            print(f"Sample conversions (first {SAMPLE_LIMIT}):")
             print("=" * 70)
 
-            for i, change in enumerate(self.changes[:20], 1):
+            for i, change in enumerate(self.sample_changes, 1):
                 print(f"\n[{i}] File: {change['file']}")
                 print(f"    Line: {change['line']}")
                 print(f"    {change['note']}")
 
-            if len(self.changes) > 20:
-                print(f"\n    ... and {len(self.changes) - 20} more conversions")
-                print(f"    Use --export-csv to export all changes to CSV")
+            if self.total_changes > SAMPLE_LIMIT:
+                print(f"\n    ... and {self.total_changes - SAMPLE_LIMIT} more conversions")
+                print(f"    Use --export-csv or --export-jsonl to export all changes")
 
             print("\n" + "=" * 70)
             if dry_run:
@@ -187,31 +493,114 @@ class DartImportConverter:
         else:
             print("\n[OK]    All files already use correct package imports")
 
+        return self.total_changes
+
+
+class ChangeWriter:
+    """Stream change records to a CSV or JSONL file as they are produced"""
+
+    CSV_FIELDS = ['file', 'line', 'old_import', 'new_import', 'conversion_note']
+    # JSONL key order; records read back from the cache have their keys sorted
+    RECORD_FIELDS = ('file', 'line', 'old', 'new', 'note')
+
+    def __init__(self, path: str, fmt: str = 'csv'):
+        self.path = path
+        self.fmt = fmt
+        self.count = 0
+        self._file: TextIO = open(path, 'w', newline='', encoding='utf-8')
+        self._csv = None
+        if fmt == 'csv':
+            self._csv = csv.DictWriter(self._file, fieldnames=self.CSV_FIELDS)
+            self._csv.writeheader()
+
+    def write(self, changes: List[Dict]):
+        for change in changes:
+            if self._csv is not None:
+                self._csv.writerow({
+                    'file': change['file'],
+                    'line': change['line'],
+                    'old_import': change['old'],
+                    'new_import': change['new'],
+                    'conversion_note': change['note']
+                })
+            else:
+                record = {key: change[key] for key in self.RECORD_FIELDS}
+                self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self.count += 1
+
+    def close(self):
+        self._file.close()
+
+
+def _process_file(task: Tuple[str, str, bool]) -> List[Dict]:
+    """Process pool entry point: (package_name, file_path, dry_run) -> changes"""
+    package_name, file_path, dry_run = task
+    return _worker_converter(package_name).process_dart_file(file_path, dry_run)
+
+
+_converters: Dict[str, DartImportConverter] = {}
+
+
+def _worker_converter(package_name: str) -> DartImportConverter:
+    converter = _converters.get(package_name)
+    if converter is None:
+        converter = _converters[package_name] = DartImportConverter(package_name)
+    return converter
+
+
+def _option_value(args: List[str], name: str, default: Optional[str] = None) -> Optional[str]:
+    """Value following `name` in args; `default` when the flag is absent or has no value"""
+    try:
+        idx = args.index(name)
+    except ValueError:
+        return default
+    if idx + 1 < len(args) and not args[idx + 1].startswith('--'):
+        return args[idx + 1]
+    return default
+
 
 def print_help():
     print("""
 Dart Import Converter
 Usage:
-  python convert_imports_v2.py [--help] [--apply] [--export-csv] [--package-name NAME]
+  python convert_imports_v2.py [--help] [--apply] [--export-csv [FILE]] [--export-jsonl [FILE]]
+                               [--package-name NAME] [--jobs N] [--lib DIR]
+                               [--incremental] [--cache-file PATH] [--changed-since REF] [--staged] [--check]
 
 Options:
-  --help, -h          Show this help message
-  --apply             Apply changes (default is preview only)
-  --export-csv        Export all changes to CSV file
-  --package-name NAME Specify package name (default: Memento)
+  --help, -h           Show this help message
+  --apply              Apply changes (default is preview only)
+  --export-csv [FILE]  Stream all changes to a CSV file (default: import_changes.csv)
+  --export-jsonl [FILE]
+                       Stream all changes to a JSON Lines file (default: import_changes.jsonl)
+  --package-name NAME  Specify package name (default: Memento)
+  --jobs N             Worker processes (default: CPU count, 1 = no process pool)
+  --lib DIR            Directory to scan (default: lib)
+  --incremental        Reuse results for unchanged files from a content-hash cache
+  --cache-file PATH    Cache location (default: .dart_tool/import_converter_cache.json)
+  --changed-since REF  Only process files changed since a git ref (plus untracked files)
+  --staged             Only process files staged for commit
+  --check              Exit with status 1 when any conversion is needed
 
 Examples:
   python convert_imports_v2.py                    # Preview mode
   python convert_imports_v2.py --apply            # Apply changes
   python convert_imports_v2.py --export-csv       # Export to CSV
+  python convert_imports_v2.py --export-jsonl changes.jsonl  # Export to JSONL
+  python convert_imports_v2.py --jobs 1           # Single process
   python convert_imports_v2.py --package-name my_app  # Custom package name
+  python convert_imports_v2.py --incremental      # Only rescan files whose content changed
+  python convert_imports_v2.py --changed-since origin/main  # Files changed on this branch
+  python convert_imports_v2.py --staged --incremental --check  # Pre-commit hook
 """)
 
 
 def main():
     dry_run = True
-    export_csv = False
+    export_csv = None
+    export_jsonl = None
     package_name = "Memento"
+    jobs = 0
 
     args = sys.argv[1:]
     if '--help' in args or '-h' in args:
@@ -222,17 +611,39 @@ def main():
         dry_run = False
 
     if '--export-csv' in args:
-        export_csv = True
+        export_csv = _option_value(args, '--export-csv', 'import_changes.csv')
+
+    if '--export-jsonl' in args:
+        export_jsonl = _option_value(args, '--export-jsonl', 'import_changes.jsonl')
+
+    package_name = _option_value(args, '--package-name', package_name)
+    lib_dir = _option_value(args, '--lib', 'lib')
 
     try:
-        idx = args.index('--package-name')
-        if idx + 1 < len(args):
-            package_name = args[idx + 1]
+        jobs = int(_option_value(args, '--jobs', '0'))
     except ValueError:
-        pass
+        print("--jobs expects an integer", file=sys.stderr)
+        sys.exit(2)
+
+    files = None
+    if '--staged' in args or '--changed-since' in args:
+        try:
+            files = git_changed_dart_files(lib_dir, _option_value(args, '--changed-since'), '--staged' in args)
+        except RuntimeError as e:
+            print(e, file=sys.stderr)
+            sys.exit(2)
+
+    cache = None
+    if '--incremental' in args:
+        cache = ConversionCache(_option_value(args, '--cache-file', DEFAULT_CACHE_PATH), package_name)
+        cache.load()
 
     converter = DartImportConverter(package_name=package_name)
-    converter.run(dry_run=dry_run, export_csv=export_csv)
+    total_changes = converter.run(dry_run=dry_run, export_csv=export_csv, export_jsonl=export_jsonl, jobs=jobs,
+                                  lib_dir=lib_dir, files=files, cache=cache)
+
+    if '--check' in args and total_changes:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -3,64 +3,776 @@
 复制Material Icons到Flutter Assets目录
 将 png/black 子目录下的各个 baseline-4x.png 文件复制到flutter资源目录下，
 并重命名为对应的图标名称
+
+增量同步：
+- 大小和内容哈希都一致的图标直接跳过
+- 优先使用 reflink（写时复制）或 copy_file_range（内核内复制），不支持时退回普通复制；
+  也可以用 --mode hardlink 直接硬链接（目标与源共享同一份数据）
+- 复制在线程池中并行执行，写入临时文件后原子替换
+- 删除上游已移除的图标（--no-prune 可关闭）
+
+图集打包（--atlas，需要 Pillow）：
+- 把目标目录中的图标按行装箱合并为少量精灵图（sheet_N.png），并生成紧凑的 index.json
+  （图标名 -> [图集序号, x, y, 宽, 高]）
+- 排列只取决于图标尺寸和名称，输出是确定的；只重新生成内容变化的图集
+
+多分辨率（--densities，需要 Pillow）：
+- 由 4x 源图生成 Flutter 的分辨率变体：主资源为 1.0x，另有 2.0x/、3.0x/、4.0x/ 子目录
+- 每个输出都做无损压缩：在 RGBA、灰度+透明、调色板+tRNS 中取最小且像素完全一致的编码
+- 在进程池中并行生成，按源文件哈希缓存，源图未变的图标直接跳过
+- 目标目录已有分辨率子目录时，普通同步会拒绝执行（否则 4x 源图会覆盖 1.0x 主资源），
+  需继续使用 --densities 或先删除这些子目录
+
+使用方法：
+    python scripts/copy_icons.py                    # 增量同步
+    python scripts/copy_icons.py --dry-run          # 只显示将要进行的操作
+    python scripts/copy_icons.py --mode hardlink    # 使用硬链接
+    python scripts/copy_icons.py --jobs 16          # 指定线程数
+    python scripts/copy_icons.py --atlas            # 同步后打包图集
+    python scripts/copy_icons.py --atlas-only       # 不同步，只用现有图标打包图集
+    python scripts/copy_icons.py --densities        # 生成 1.0x/2.0x/3.0x/4.0x 变体
 """
 
 import os
+import sys
+import time
+import errno
 import shutil
+import hashlib
+import argparse
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from pathlib import Path
+from typing import Dict, List, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+ROOT_DIR = Path(__file__).parent.parent
+DEFAULT_SOURCE_DIR = ROOT_DIR / "png" / "black"
+DEFAULT_DEST_DIR = ROOT_DIR / "assets" / "icons" / "material"
+SOURCE_FILE_NAME = "baseline-4x.png"
+
+COPY_MODES = ('auto', 'hardlink', 'reflink', 'copy')
+# Linux FICLONE ioctl（btrfs、xfs、bcachefs 等支持写时复制的文件系统）
+FICLONE = 0x40049409
+HASH_BUFFER_SIZE = 1024 * 1024
+
+DEFAULT_ATLAS_DIR = ROOT_DIR / "assets" / "icons" / "material_atlas"
+ATLAS_INDEX_FILE = "index.json"
+ATLAS_FORMAT = 1
+DEFAULT_ATLAS_SIZE = 2048
+
+# 相对 4x 源图的缩放比例；1.0x 是主资源，放在目标目录本身
+DENSITY_SCALES = {'1.0x': 0.25, '2.0x': 0.5, '3.0x': 0.75, '4.0x': 1.0}
+DEFAULT_DENSITIES = '1.0x,2.0x,3.0x,4.0x'
+DEFAULT_VARIANT_CACHE = ROOT_DIR / ".dart_tool" / "icon_variants_cache.json"
+# 修改缩放或编码方式后递增，使缓存失效
+VARIANT_PIPELINE_VERSION = 1
+
+
+def collect_source_icons(source_dir: Path) -> Tuple[Dict[str, Path], List[str]]:
+    """
+    收集源目录中的图标
+
+    Returns:
+        (图标名 -> baseline-4x.png 路径, 缺少 baseline-4x.png 的图标名列表)
+    """
+    icons = {}
+    missing = []
+    with os.scandir(source_dir) as it:
+        for entry in it:
+            if not entry.is_dir():
+                continue
+            source_file = os.path.join(entry.path, SOURCE_FILE_NAME)
+            if os.path.isfile(source_file):
+                icons[entry.name] = Path(source_file)
+            else:
+                missing.append(entry.name)
+    return dict(sorted(icons.items())), sorted(missing)
+
+
+def file_digest(path: Path) -> str:
+    """计算文件内容的 sha1"""
+    hasher = hashlib.sha1()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(HASH_BUFFER_SIZE)
+            if not chunk:
+                break
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def is_up_to_date(source: Path, dest: Path) -> bool:
+    """目标已是同一文件（硬链接），或大小和内容哈希都一致"""
+    try:
+        src_stat = source.stat()
+        dst_stat = dest.stat()
+    except FileNotFoundError:
+        return False
+    if (src_stat.st_dev, src_stat.st_ino) == (dst_stat.st_dev, dst_stat.st_ino):
+        return True
+    if src_stat.st_size != dst_stat.st_size:
+        return False
+    return file_digest(source) == file_digest(dest)
+
+
+def _reflink(source: Path, tmp: Path):
+    if fcntl is None:
+        raise OSError(errno.ENOSYS, 'reflink is not supported on this platform')
+    with open(source, 'rb') as src, open(tmp, 'wb') as dst:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+
+
+def _copy_file_range(source: Path, tmp: Path):
+    with open(source, 'rb') as src, open(tmp, 'wb') as dst:
+        remaining = os.fstat(src.fileno()).st_size
+        while remaining > 0:
+            copied = os.copy_file_range(src.fileno(), dst.fileno(), remaining)
+            if copied == 0:
+                break
+            remaining -= copied
+
+
+class IconCopier:
+    """
+    按模式复制单个文件，并记住当前文件系统不支持的方式，避免每个文件都重复失败
+
+    auto 依次尝试 reflink、copy_file_range、普通复制；硬链接只在显式指定时使用，
+    因为之后修改目标会同时修改源文件。
+    """
+
+    def __init__(self, mode: str = 'auto'):
+        self.mode = mode
+        self.unsupported = set()
+        self.used: Dict[str, int] = {}
+
+    def _strategies(self):
+        if self.mode == 'hardlink':
+            return ['hardlink', 'copy']
+        if self.mode == 'reflink':
+            return ['reflink', 'copy']
+        if self.mode == 'copy':
+            return ['copy']
+        return ['reflink', 'copy_file_range', 'copy']
+
+    def copy(self, source: Path, dest: Path) -> str:
+        """原子地把 source 复制到 dest，返回实际使用的方式"""
+        tmp = dest.with_name(f".{dest.name}.tmp")
+        for strategy in self._strategies():
+            if strategy in self.unsupported:
+                continue
+            try:
+                if tmp.exists():
+                    tmp.unlink()
+                if strategy == 'hardlink':
+                    os.link(source, tmp)
+                elif strategy == 'reflink':
+                    _reflink(source, tmp)
+                    shutil.copystat(source, tmp)
+                elif strategy == 'copy_file_range':
+                    _copy_file_range(source, tmp)
+                    shutil.copystat(source, tmp)
+                else:
+                    shutil.copy2(source, tmp)
+                os.replace(tmp, dest)
+            except (OSError, AttributeError) as e:
+                if tmp.exists():
+                    tmp.unlink()
+                if strategy == 'copy':
+                    raise
+                # 文件系统/平台不支持该方式（如跨设备、不支持 FICLONE），后续文件直接跳过
+                if isinstance(e, AttributeError) or e.errno in (
+                        errno.EXDEV, errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL, errno.ENOSYS,
+                        errno.EPERM, errno.EBADF, errno.ETXTBSY):
+                    self.unsupported.add(strategy)
+                    continue
+                raise
+            self.used[strategy] = self.used.get(strategy, 0) + 1
+            return strategy
+        raise OSError(f"没有可用的复制方式: {source}")
+
+
+def density_variant_dirs(dest_dir: Path) -> List[str]:
+    """目标目录中已存在的分辨率子目录（说明主资源由 --densities 管理）"""
+    return [density for density in DENSITY_SCALES
+            if density != '1.0x' and (dest_dir / density).is_dir()]
+
+
+def sync_icons(source_dir: Path, dest_dir: Path, mode: str = 'auto', jobs: int = 0,
+               prune: bool = True, dry_run: bool = False) -> Dict:
+    """
+    增量同步图标目录
+
+    目标目录由 --densities 管理时抛出 RuntimeError：直接复制的 4x 源图会覆盖 1.0x 主资源，
+    而分辨率子目录不会随之更新。
+
+    Returns:
+        统计信息（各类数量、使用的复制方式、各阶段耗时）
+    """
+    managed = density_variant_dirs(dest_dir)
+    if managed:
+        raise RuntimeError(f"目标目录包含分辨率变体 ({', '.join(managed)})，主资源由 --densities 生成；"
+                           f"请继续使用 --densities，或删除这些子目录后再直接同步")
+
+    timings = {}
+    start = time.perf_counter()
+    icons, missing = collect_source_icons(source_dir)
+    timings['scan'] = time.perf_counter() - start
+
+    for icon_name in missing:
+        print(f"[SKIP] {icon_name}: {SOURCE_FILE_NAME} not found")
+
+    jobs = jobs if jobs > 0 else min(32, (os.cpu_count() or 1) * 4)
+    copier = IconCopier(mode)
+    stats = {'total': len(icons), 'copied': 0, 'unchanged': 0, 'skipped': len(missing),
+             'failed': 0, 'pruned': 0}
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        checks = executor.map(lambda item: (item[0], item[1], is_up_to_date(item[1], dest_dir / f"{item[0]}.png")),
+                              icons.items())
+        pending = [(name, source) for name, source, up_to_date in checks if not up_to_date]
+        stats['unchanged'] = len(icons) - len(pending)
+        timings['compare'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        if dry_run:
+            for icon_name, _ in pending:
+                print(f"[DRY] {icon_name}.png")
+        else:
+            futures = [(name, executor.submit(copier.copy, source, dest_dir / f"{name}.png"))
+                       for name, source in pending]
+            for icon_name, future in futures:
+                try:
+                    future.result()
+                    print(f"[OK] {icon_name}.png")
+                    stats['copied'] += 1
+                except Exception as e:
+                    print(f"[FAIL] {icon_name}: {e}")
+                    stats['failed'] += 1
+        timings['copy'] = time.perf_counter() - start
+
+    # 删除源目录中已不存在的图标（只处理 .png，不动其他文件）
+    start = time.perf_counter()
+    if prune:
+        expected = {f"{name}.png" for name in icons}
+        with os.scandir(dest_dir) as it:
+            orphans = sorted(entry.name for entry in it
+                             if entry.is_file() and entry.name.endswith('.png') and entry.name not in expected)
+        for file_name in orphans:
+            if dry_run:
+                print(f"[DRY] remove {file_name}")
+            else:
+                os.unlink(dest_dir / file_name)
+                print(f"[DEL] {file_name}")
+        stats['pruned'] = len(orphans)
+    timings['prune'] = time.perf_counter() - start
+
+    stats['modes'] = copier.used
+    stats['timings'] = timings
+    return stats
+
+
+def density_path(dest_dir: Path, density: str, icon_name: str) -> Path:
+    """分辨率变体的输出路径，1.0x 为主资源"""
+    if density == '1.0x':
+        return dest_dir / f"{icon_name}.png"
+    return dest_dir / density / f"{icon_name}.png"
+
+
+def _encode_png(image) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG', optimize=True)
+    return buffer.getvalue()
+
+
+def _png_candidates(image) -> List:
+    """
+    RGBA 图像的其他无损编码候选
+
+    - 单色图标（RGB 各通道恒定）：出现过的透明度各占一个调色板项，颜色都相同，tRNS 为这些透明度
+    - 灰度图标（RGB 三通道相同）：灰度+透明
+    - 其他不超过 256 色的图标：调色板量化（由调用方校验是否无损）
+    """
+    red, green, blue, alpha = image.split()
+    extrema = image.getextrema()
+    candidates = []
+    if all(low == high for low, high in extrema[:3]):
+        levels = [level for level, count in enumerate(alpha.histogram()) if count]
+        lookup = [0] * 256
+        for index, level in enumerate(levels):
+            lookup[level] = index
+        indexed = alpha.point(lookup).convert('P')
+        indexed.putpalette([extrema[0][0], extrema[1][0], extrema[2][0]] * len(levels))
+        indexed.info['transparency'] = bytes(levels)
+        candidates.append(indexed)
+    elif image.getcolors(256) is not None:
+        candidates.append(image.quantize(colors=256, method=Image.FASTOCTREE))
+    if red.tobytes() == green.tobytes() == blue.tobytes():
+        candidates.append(image.convert('LA'))
+    return candidates
+
+
+def optimize_png(image) -> Tuple[bytes, int]:
+    """
+    无损压缩
+
+    在 RGBA 和 _png_candidates() 的候选中取最小的编码，只保留解码后与原图像素完全一致的结果。
+
+    Returns:
+        (最小的 PNG 数据, 直接保存为 RGBA 时的大小)
+    """
+    image = image.convert('RGBA')
+    pixels = image.tobytes()
+    plain = _encode_png(image)
+    best = plain
+    for candidate in _png_candidates(image):
+        data = _encode_png(candidate)
+        if len(data) >= len(best):
+            continue
+        with Image.open(io.BytesIO(data)) as decoded:
+            if decoded.convert('RGBA').tobytes() == pixels:
+                best = data
+    return best, len(plain)
+
+
+def _render_variants(task: Tuple[str, str, str, List[str]]) -> Tuple[str, Dict[str, List[int]]]:
+    """
+    进程池入口：由 4x 源图生成各分辨率变体
+
+    Returns:
+        (图标名, 分辨率 -> [输出大小, 直接保存时的大小])
+    """
+    icon_name, source, dest_dir, densities = task
+    results = {}
+    with Image.open(source) as image:
+        image = image.convert('RGBA')
+        for density in densities:
+            scale = DENSITY_SCALES[density]
+            if scale == 1.0:
+                variant = image
+            else:
+                size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+                variant = image.resize(size, Image.LANCZOS)
+            data, plain_size = optimize_png(variant)
+            output = density_path(Path(dest_dir), density, icon_name)
+            if not output.exists() or output.read_bytes() != data:
+                _write_atomic(output, data)
+            results[density] = [len(data), plain_size]
+    return icon_name, results
+
+
+def build_density_variants(icons: Dict[str, Path], dest_dir: Path, densities: List[str],
+                           cache_path: Path = DEFAULT_VARIANT_CACHE, jobs: int = 0,
+                           prune: bool = True, dry_run: bool = False) -> Dict:
+    """
+    生成分辨率变体
+
+    缓存记录每个图标源文件的 sha1 和各输出的大小，源文件和输出都没有变化的图标不重新生成。
+
+    Returns:
+        统计信息（生成/跳过/删除数量，各分辨率的输出大小和节省的字节数）
+    """
+    if Image is None:
+        raise RuntimeError("生成分辨率变体需要 Pillow: pip install Pillow")
+
+    start = time.perf_counter()
+    cache = {}
+    if cache_path.exists():
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == VARIANT_PIPELINE_VERSION:
+                cache = data.get('icons', {})
+        except (OSError, ValueError):
+            cache = {}
+
+    for density in densities:
+        if density != '1.0x':
+            (dest_dir / density).mkdir(parents=True, exist_ok=True)
+
+    def check(item):
+        name, source = item
+        digest = file_digest(source)
+        entry = cache.get(name)
+        if entry and entry.get('source') == digest and all(
+                density in entry['outputs'] and density_path(dest_dir, density, name).is_file() and
+                density_path(dest_dir, density, name).stat().st_size == entry['outputs'][density][0]
+                for density in densities):
+            return name, digest, True
+        return name, digest, False
+
+    thread_jobs = jobs if jobs > 0 else min(32, (os.cpu_count() or 1) * 4)
+    with ThreadPoolExecutor(max_workers=thread_jobs) as executor:
+        checks = list(executor.map(check, icons.items()))
+    pending = [name for name, _, cached in checks if not cached]
+    digests = {name: digest for name, digest, _ in checks}
+
+    rendered = 0
+    failed = 0
+    if dry_run:
+        for icon_name in pending:
+            print(f"[DRY] {icon_name}.png ({', '.join(densities)})")
+    elif pending:
+        tasks = [(name, str(icons[name]), str(dest_dir), densities) for name in pending]
+        with ProcessPoolExecutor(max_workers=jobs if jobs > 0 else None) as executor:
+            futures = [(task[0], executor.submit(_render_variants, task)) for task in tasks]
+            for icon_name, future in futures:
+                try:
+                    _, results = future.result()
+                except Exception as e:
+                    print(f"[FAIL] {icon_name}: {e}")
+                    cache.pop(icon_name, None)
+                    failed += 1
+                    continue
+                cache[icon_name] = {'source': digests[icon_name], 'outputs': results}
+                print(f"[OK] {icon_name}.png")
+                rendered += 1
+
+    # 删除源目录中已不存在的图标
+    removed = 0
+    if prune:
+        expected = {f"{name}.png" for name in icons}
+        for directory in [dest_dir] + [dest_dir / density for density in densities if density != '1.0x']:
+            with os.scandir(directory) as it:
+                orphans = sorted(entry.name for entry in it
+                                 if entry.is_file() and entry.name.endswith('.png') and entry.name not in expected)
+            for file_name in orphans:
+                relative = (directory / file_name).relative_to(dest_dir)
+                if dry_run:
+                    print(f"[DRY] remove {relative}")
+                else:
+                    os.unlink(directory / file_name)
+                    print(f"[DEL] {relative}")
+            removed += len(orphans)
+
+    if not dry_run:
+        cache = {name: cache[name] for name in sorted(cache) if name in icons}
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        data = json.dumps({'version': VARIANT_PIPELINE_VERSION, 'icons': cache},
+                          ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        if not cache_path.exists() or cache_path.read_bytes() != data:
+            _write_atomic(cache_path, data)
+
+    # 各分辨率的输出大小；“节省”相对直接保存 RGBA PNG 计算，源图大小用于对比运行时缩放 4x 图的方案
+    source_bytes = sum(source.stat().st_size for source in icons.values())
+    per_density = {}
+    for density in densities:
+        sizes = [cache[name]['outputs'][density] for name in icons
+                 if name in cache and density in cache[name]['outputs']]
+        per_density[density] = {
+            'bytes': sum(size for size, _ in sizes),
+            'plain_bytes': sum(plain for _, plain in sizes),
+        }
+    return {
+        'total': len(icons),
+        'rendered': rendered,
+        'unchanged': len(icons) - len(pending),
+        'failed': failed,
+        'removed': removed,
+        'source_bytes': source_bytes,
+        'densities': per_density,
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def pack_shelves(sizes: List[Tuple[str, int, int]], max_size: int,
+                 padding: int = 0) -> List[Dict]:
+    """
+    按行（shelf）装箱
+
+    先按高度、宽度降序，再按名称排序，结果只取决于输入尺寸和名称。
+
+    Returns:
+        图集列表，每项为 {'width', 'height', 'rects': [(name, x, y, w, h), ...]}
+    """
+    sheets = []
+    sheet = None
+    x = y = shelf_height = 0
+    for name, width, height in sorted(sizes, key=lambda item: (-item[2], -item[1], item[0])):
+        if width > max_size or height > max_size:
+            raise ValueError(f"图标 {name} ({width}x{height}) 超过图集尺寸 {max_size}")
+        if sheet is not None and x + width > max_size:
+            # 换行
+            x = 0
+            y += shelf_height + padding
+            shelf_height = 0
+        if sheet is None or y + height > max_size:
+            sheet = {'width': 0, 'height': 0, 'rects': []}
+            sheets.append(sheet)
+            x = y = shelf_height = 0
+        sheet['rects'].append((name, x, y, width, height))
+        sheet['width'] = max(sheet['width'], x + width)
+        sheet['height'] = max(sheet['height'], y + height)
+        shelf_height = max(shelf_height, height)
+        x += width + padding
+    return sheets
+
+
+def _png_files(directory: Path) -> Dict[str, Path]:
+    with os.scandir(directory) as it:
+        return {entry.name[:-4]: Path(entry.path) for entry in sorted(it, key=lambda e: e.name)
+                if entry.is_file() and entry.name.endswith('.png')}
+
+
+def _write_atomic(path: Path, data: bytes):
+    tmp = path.with_name(f".{path.name}.tmp")
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def build_atlas(icon_dir: Path, atlas_dir: Path, max_size: int = DEFAULT_ATLAS_SIZE,
+                padding: int = 0, jobs: int = 0, dry_run: bool = False) -> Dict:
+    """
+    把 icon_dir 中的 PNG 打包为图集
+
+    每个图集记录自己的摘要（图标名、位置和内容哈希），摘要未变且文件存在的图集不重新生成。
+
+    Returns:
+        统计信息（打包前后的资源数量和大小、重新生成的图集数、耗时）
+    """
+    if Image is None:
+        raise RuntimeError("图集打包需要 Pillow: pip install Pillow")
+
+    start = time.perf_counter()
+    icons = _png_files(icon_dir)
+    jobs = jobs if jobs > 0 else min(32, (os.cpu_count() or 1) * 4)
+
+    def inspect(item):
+        name, path = item
+        with Image.open(path) as image:
+            width, height = image.size
+        return name, width, height, file_digest(path), path.stat().st_size
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        infos = list(executor.map(inspect, icons.items()))
+    digests = {name: digest for name, _, _, digest, _ in infos}
+
+    previous = {}
+    index_path = atlas_dir / ATLAS_INDEX_FILE
+    if index_path.exists():
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                old_index = json.load(f)
+            if old_index.get('format') == ATLAS_FORMAT:
+                previous = {sheet['file']: sheet.get('digest') for sheet in old_index.get('sheets', [])}
+        except (OSError, ValueError):
+            previous = {}
+
+    sheets = pack_shelves([(name, width, height) for name, width, height, _, _ in infos], max_size, padding)
+    index = {'format': ATLAS_FORMAT, 'sheets': [], 'icons': {}}
+    rebuilt = 0
+    for number, sheet in enumerate(sheets):
+        file_name = f"sheet_{number}.png"
+        hasher = hashlib.sha1(f"{sheet['width']}x{sheet['height']}".encode())
+        for name, x, y, width, height in sheet['rects']:
+            hasher.update(f"\0{name}\0{x},{y},{width},{height}\0{digests[name]}".encode())
+            index['icons'][name] = [number, x, y, width, height]
+        digest = hasher.hexdigest()
+        index['sheets'].append({'file': file_name, 'width': sheet['width'], 'height': sheet['height'],
+                                'digest': digest})
+
+        if previous.get(file_name) == digest and (atlas_dir / file_name).exists():
+            continue
+        rebuilt += 1
+        if dry_run:
+            print(f"[DRY] {file_name} ({len(sheet['rects'])} icons)")
+            continue
+        atlas_dir.mkdir(parents=True, exist_ok=True)
+        canvas = Image.new('RGBA', (sheet['width'], sheet['height']), (0, 0, 0, 0))
+        for name, x, y, _, _ in sheet['rects']:
+            with Image.open(icons[name]) as image:
+                canvas.paste(image.convert('RGBA'), (x, y))
+        _write_atomic(atlas_dir / file_name, optimize_png(canvas)[0])
+        print(f"[OK] {file_name} ({len(sheet['rects'])} icons, {sheet['width']}x{sheet['height']})")
+
+    index['icons'] = dict(sorted(index['icons'].items()))
+    index_bytes = json.dumps(index, ensure_ascii=False, separators=(',', ':'), sort_keys=True).encode('utf-8')
+    stale = []
+    if atlas_dir.exists():
+        expected = {sheet['file'] for sheet in index['sheets']}
+        stale = sorted(name for name in os.listdir(atlas_dir)
+                       if name.startswith('sheet_') and name.endswith('.png') and name not in expected)
+    if not dry_run:
+        if not index_path.exists() or index_path.read_bytes() != index_bytes:
+            atlas_dir.mkdir(parents=True, exist_ok=True)
+            _write_atomic(index_path, index_bytes)
+        for file_name in stale:
+            os.unlink(atlas_dir / file_name)
+            print(f"[DEL] {file_name}")
+
+    after_bytes = len(index_bytes)
+    if not dry_run:
+        after_bytes += sum((atlas_dir / sheet['file']).stat().st_size for sheet in index['sheets'])
+    return {
+        'icons': len(infos),
+        'sheets': len(sheets),
+        'rebuilt': rebuilt,
+        'removed': len(stale),
+        'before_assets': len(infos),
+        'before_bytes': sum(size for _, _, _, _, size in infos),
+        'after_assets': len(sheets) + 1,
+        'after_bytes': after_bytes,
+        'seconds': time.perf_counter() - start,
+    }
+
 
 def main():
+    parser = argparse.ArgumentParser(description='复制Material Icons到Flutter Assets目录（增量同步）')
+    parser.add_argument('--source', type=str, default=str(DEFAULT_SOURCE_DIR),
+                        help='源目录，每个图标一个子目录（默认为 png/black）')
+    parser.add_argument('--dest', type=str, default=str(DEFAULT_DEST_DIR),
+                        help='目标目录（默认为 assets/icons/material）')
+    parser.add_argument('--mode', choices=COPY_MODES, default='auto',
+                        help='复制方式：auto 依次尝试 reflink、copy_file_range、普通复制；hardlink 使用硬链接')
+    parser.add_argument('--jobs', '-j', type=int, default=0, help='线程数（默认为 CPU 数 × 4，最多 32）')
+    parser.add_argument('--no-prune', action='store_true', help='不删除上游已移除的图标')
+    parser.add_argument('--dry-run', action='store_true', help='只显示将要进行的操作')
+    parser.add_argument('--densities', nargs='?', const=DEFAULT_DENSITIES, default=None,
+                        help=f'由 4x 源图生成分辨率变体代替直接复制（默认为 {DEFAULT_DENSITIES}，必须包含 1.0x）')
+    parser.add_argument('--variant-cache', type=str, default=str(DEFAULT_VARIANT_CACHE),
+                        help='分辨率变体缓存文件（默认为 .dart_tool/icon_variants_cache.json）')
+    parser.add_argument('--atlas', action='store_true', help='同步后把图标打包为图集（需要 Pillow）')
+    parser.add_argument('--atlas-only', action='store_true', help='不同步，只用目标目录中现有的图标打包图集')
+    parser.add_argument('--atlas-dir', type=str, default=str(DEFAULT_ATLAS_DIR),
+                        help='图集输出目录（默认为 assets/icons/material_atlas）')
+    parser.add_argument('--atlas-size', type=int, default=DEFAULT_ATLAS_SIZE,
+                        help=f'单个图集的最大边长（默认为 {DEFAULT_ATLAS_SIZE}）')
+    parser.add_argument('--atlas-padding', type=int, default=0, help='图标之间的间距（默认为 0）')
+    parser.add_argument('--atlas-density', choices=list(DENSITY_SCALES), default='1.0x',
+                        help='打包哪个分辨率的图标（配合 --densities，默认为目标目录中的主资源）')
+    args = parser.parse_args()
+
     # 定义路径
-    source_dir = Path(__file__).parent.parent / "png" / "black"
-    dest_dir = Path(__file__).parent.parent / "assets" / "icons" / "material"
+    source_dir = Path(args.source)
+    dest_dir = Path(args.dest)
 
-    # 创建目标目录
-    dest_dir.mkdir(parents=True, exist_ok=True)
+    if args.atlas_only:
+        if not dest_dir.exists():
+            print(f"❌ 图标目录不存在: {dest_dir}")
+            sys.exit(1)
+        run_atlas(args, density_path(dest_dir, args.atlas_density, '_').parent)
+        return
 
     # 检查源目录是否存在
     if not source_dir.exists():
         print(f"❌ 源目录不存在: {source_dir}")
+        sys.exit(1)
+
+    # 创建目标目录
+    dest_dir.mkdir(parents=True, exist_ok=True)
+
+    if args.densities is not None:
+        run_densities(args, source_dir, dest_dir)
         return
 
-    # 统计信息
-    copied_count = 0
-    skipped_count = 0
-    failed_count = 0
+    start = time.perf_counter()
+    try:
+        stats = sync_icons(source_dir, dest_dir, args.mode, args.jobs, not args.no_prune, args.dry_run)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
 
-    # 遍历所有子目录
-    for icon_dir in source_dir.iterdir():
-        if not icon_dir.is_dir():
-            continue
+    # 输出统计信息
+    timings = stats['timings']
+    print("\n" + "="*50)
+    print(f"Sync completed{' (dry run)' if args.dry_run else ''}!")
+    print(f"  Copied: {stats['copied']} icons")
+    print(f"  Unchanged: {stats['unchanged']} icons")
+    print(f"  Removed: {stats['pruned']} icons")
+    print(f"  Skipped: {stats['skipped']} icons")
+    print(f"  Failed: {stats['failed']} icons")
+    if stats['modes']:
+        print(f"  Copy mode: {', '.join(f'{mode} × {count}' for mode, count in sorted(stats['modes'].items()))}")
+    print(f"  Time: {elapsed:.3f}s (scan {timings['scan']:.3f}s, compare {timings['compare']:.3f}s, "
+          f"copy {timings['copy']:.3f}s, prune {timings['prune']:.3f}s)")
+    print(f"Target dir: {dest_dir}")
+    print("="*50)
 
-        icon_name = icon_dir.name
-        baseline_4x_file = icon_dir / "baseline-4x.png"
+    if stats['failed']:
+        sys.exit(1)
 
-        # 检查baseline-4x.png是否存在
-        if not baseline_4x_file.exists():
-            print(f"[SKIP] {icon_name}: baseline-4x.png not found")
-            skipped_count += 1
-            continue
+    if args.atlas:
+        run_atlas(args, dest_dir)
 
-        # 目标文件名
-        dest_file = dest_dir / f"{icon_name}.png"
 
-        try:
-            # 复制文件
-            shutil.copy2(baseline_4x_file, dest_file)
-            print(f"[OK] {icon_name}.png")
-            copied_count += 1
-        except Exception as e:
-            print(f"[FAIL] {icon_name}: {e}")
-            failed_count += 1
+def run_densities(args, source_dir: Path, dest_dir: Path):
+    """生成分辨率变体并输出各分辨率的大小和节省的字节数"""
+    densities = [density.strip() for density in args.densities.split(',') if density.strip()]
+    unknown = [density for density in densities if density not in DENSITY_SCALES]
+    if unknown or '1.0x' not in densities:
+        print(f"❌ 分辨率必须取自 {', '.join(DENSITY_SCALES)} 且包含 1.0x: {args.densities}")
+        sys.exit(1)
+
+    icons, missing = collect_source_icons(source_dir)
+    for icon_name in missing:
+        print(f"[SKIP] {icon_name}: {SOURCE_FILE_NAME} not found")
+    try:
+        stats = build_density_variants(icons, dest_dir, densities, Path(args.variant_cache), args.jobs,
+                                       not args.no_prune, args.dry_run)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
 
-    # 输出统计信息
     print("\n" + "="*50)
-    print(f"Copy completed!")
-    print(f"  Success: {copied_count} icons")
-    print(f"  Skipped: {skipped_count} icons")
-    print(f"  Failed: {failed_count} icons")
+    print(f"Variants completed{' (dry run)' if args.dry_run else ''}!")
+    print(f"  Rendered: {stats['rendered']} icons")
+    print(f"  Unchanged: {stats['unchanged']} icons")
+    print(f"  Removed: {stats['removed']} files")
+    print(f"  Skipped: {len(missing)} icons")
+    print(f"  Failed: {stats['failed']} icons")
+    print(f"  Source (4x): {stats['source_bytes']} bytes")
+    for density, sizes in stats['densities'].items():
+        saved = sizes['plain_bytes'] - sizes['bytes']
+        ratio = saved / sizes['plain_bytes'] if sizes['plain_bytes'] else 0.0
+        vs_source = stats['source_bytes'] - sizes['bytes']
+        print(f"  {density}: {sizes['bytes']} bytes, saved {saved} by optimization ({ratio:.1%}), "
+              f"{vs_source} vs shipping 4x")
+    print(f"  Time: {stats['seconds']:.3f}s")
     print(f"Target dir: {dest_dir}")
     print("="*50)
 
+    if stats['failed']:
+        sys.exit(1)
+
+    if args.atlas:
+        run_atlas(args, density_path(dest_dir, args.atlas_density, '_').parent)
+
+
+def run_atlas(args, icon_dir: Path):
+    """执行图集打包并输出打包前后的资源数量和大小"""
+    try:
+        stats = build_atlas(icon_dir, Path(args.atlas_dir), args.atlas_size, args.atlas_padding,
+                            args.jobs, args.dry_run)
+    except (RuntimeError, ValueError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    print("\n" + "="*50)
+    print(f"Atlas completed{' (dry run)' if args.dry_run else ''}!")
+    print(f"  Icons: {stats['icons']} in {stats['sheets']} sheets "
+          f"({stats['rebuilt']} rebuilt, {stats['removed']} removed)")
+    print(f"  Assets: {stats['before_assets']} -> {stats['after_assets']}")
+    if not args.dry_run:
+        delta = stats['after_bytes'] - stats['before_bytes']
+        ratio = delta / stats['before_bytes'] if stats['before_bytes'] else 0.0
+        print(f"  Size: {stats['before_bytes']} -> {stats['after_bytes']} bytes ({delta:+d}, {ratio:+.1%})")
+    print(f"  Time: {stats['seconds']:.3f}s")
+    print(f"Atlas dir: {args.atlas_dir}")
+    print("="*50)
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+"""
+Dart Import Graph - Cached import/export/part graph index for lib/
+
+The index is stored in .dart_tool/import_graph.json and updated incrementally:
+files whose size and mtime are unchanged are not read, files whose content hash
+is unchanged are not re-parsed. Queries run on an in-memory graph with
+reachability precomputed per strongly connected component as bitsets.
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+from pathlib import Path
+from typing import List, Tuple, Optional, Dict, Iterable
+
+from convert_imports_v2 import DartImportConverter, parse_directives
+
+
+INDEX_VERSION = 1
+DEFAULT_INDEX_PATH = os.path.join('.dart_tool', 'import_graph.json')
+RANK_METRICS = ('fan-in', 'fan-out', 'closure', 'impact')
+
+
+class DartImportGraph:
+    def __init__(self, lib_dir: str = "lib", package_name: str = "Memento",
+                 index_path: str = DEFAULT_INDEX_PATH):
+        self.lib_dir = lib_dir.rstrip('/\\')
+        self.package_name = package_name
+        self.index_path = index_path
+        self.files: Dict[str, Dict] = {}
+        self.stats = {'parsed': 0, 'rehashed': 0, 'reused': 0, 'removed': 0}
+        self._graph_built = False
+
+    # ------------------------------------------------------------------
+    # Index
+    # ------------------------------------------------------------------
+
+    def load(self):
+        """Load the persisted index (ignored when missing, corrupt or from another version)"""
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if (data.get('version') == INDEX_VERSION and data.get('package') == self.package_name
+                and data.get('lib') == self.lib_dir):
+            self.files = data.get('files', {})
+
+    def save(self):
+        """Write the index atomically"""
+        os.makedirs(os.path.dirname(self.index_path) or '.', exist_ok=True)
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': INDEX_VERSION, 'package': self.package_name, 'lib': self.lib_dir,
+                       'files': self.files}, f, separators=(',', ':'), sort_keys=True)
+        os.replace(tmp_path, self.index_path)
+
+    def resolve(self, uri: str, current_file: str) -> str:
+        """
+        Resolve a directive URI to a node key
+
+        package:<this package>/x.dart and relative URIs map to lib/x.dart;
+        dart: and other packages are returned unchanged (external).
+        """
+        prefix = f'package:{self.package_name}/'
+        if uri.startswith(prefix):
+            return f'{self.lib_dir}/{uri[len(prefix):]}'
+        if ':' in uri:
+            return uri
+        parts = current_file.split('/')[:-1]
+        for part in uri.split('/'):
+            if part == '..':
+                if parts:
+                    parts.pop()
+            elif part and part != '.':
+                parts.append(part)
+        return '/'.join(parts)
+
+    def update(self, dart_files: Optional[List[str]] = None) -> Dict[str, int]:
+        """
+        Bring the index up to date with the working tree
+
+        Returns:
+            Counters: parsed (content changed), rehashed (mtime changed, content same),
+            reused (untouched), removed (file deleted)
+        """
+        if dart_files is None:
+            dart_files = DartImportConverter(self.package_name).find_dart_files(self.lib_dir)
+
+        present = set()
+        for file_path in dart_files:
+            key = file_path.replace(os.sep, '/')
+            present.add(key)
+            try:
+                st = os.stat(file_path)
+            except OSError:
+                continue
+
+            entry = self.files.get(key)
+            if entry and entry['size'] == st.st_size and entry['mtime_ns'] == st.st_mtime_ns:
+                self.stats['reused'] += 1
+                continue
+
+            with open(file_path, 'rb') as f:
+                content = f.read()
+            digest = hashlib.sha1(content).hexdigest()
+            if entry and entry['hash'] == digest:
+                entry['size'], entry['mtime_ns'] = st.st_size, st.st_mtime_ns
+                self.stats['rehashed'] += 1
+                continue
+
+            text = content.decode('utf-8', errors='replace')
+            directives = [
+                [d['kind'], self.resolve(d['uri'], key), d['line'], d['deferred']]
+                for d in parse_directives(text.splitlines(keepends=True))
+            ]
+            self.files[key] = {'hash': digest, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns,
+                               'directives': directives}
+            self.stats['parsed'] += 1
+
+        for key in [key for key in self.files if key not in present]:
+            del self.files[key]
+            self.stats['removed'] += 1
+
+        self._graph_built = False
+        return self.stats
+
+    # ------------------------------------------------------------------
+    # Graph
+    # ------------------------------------------------------------------
+
+    def build(self):
+        """Build adjacency lists, SCCs and per-SCC reachability bitsets"""
+        if self._graph_built:
+            return
+        self.nodes = sorted(self.files)
+        self.node_index = {node: i for i, node in enumerate(self.nodes)}
+        self.succ: List[List[int]] = [[] for _ in self.nodes]
+        self.pred: List[List[int]] = [[] for _ in self.nodes]
+        self.external: Dict[str, int] = {}
+        self.kind_counts: Dict[str, int] = {}
+        self.unresolved: List[Tuple[str, str]] = []
+
+        for i, node in enumerate(self.nodes):
+            targets = set()
+            for kind, target, _, _ in self.files[node]['directives']:
+                self.kind_counts[kind] = self.kind_counts.get(kind, 0) + 1
+                j = self.node_index.get(target)
+                if j is not None:
+                    targets.add(j)
+                elif ':' in target:
+                    self.external[target] = self.external.get(target, 0) + 1
+                else:
+                    self.unresolved.append((node, target))
+            self.succ[i] = sorted(targets)
+            for j in self.succ[i]:
+                self.pred[j].append(i)
+
+        self.components = self._strongly_connected_components()
+        self.component_of = [0] * len(self.nodes)
+        for c, members in enumerate(self.components):
+            for i in members:
+                self.component_of[i] = c
+
+        # Tarjan emits components in reverse topological order: successors come first
+        self.reach = [0] * len(self.components)
+        for c, members in enumerate(self.components):
+            bits = 0
+            for i in members:
+                bits |= 1 << i
+                for j in self.succ[i]:
+                    if self.component_of[j] != c:
+                        bits |= self.reach[self.component_of[j]]
+            self.reach[c] = bits
+
+        self.reverse_reach = [0] * len(self.components)
+        for c in range(len(self.components) - 1, -1, -1):
+            bits = 0
+            for i in self.components[c]:
+                bits |= 1 << i
+                for j in self.pred[i]:
+                    if self.component_of[j] != c:
+                        bits |= self.reverse_reach[self.component_of[j]]
+            self.reverse_reach[c] = bits
+
+        self._graph_built = True
+
+    def _strongly_connected_components(self) -> List[List[int]]:
+        """Iterative Tarjan's algorithm"""
+        index_of = [-1] * len(self.nodes)
+        lowlink = [0] * len(self.nodes)
+        on_stack = [False] * len(self.nodes)
+        stack: List[int] = []
+        components: List[List[int]] = []
+        counter = 0
+
+        for root in range(len(self.nodes)):
+            if index_of[root] != -1:
+                continue
+            work = [(root, 0)]
+            while work:
+                node, child = work[-1]
+                if child == 0:
+                    index_of[node] = lowlink[node] = counter
+                    counter += 1
+                    stack.append(node)
+                    on_stack[node] = True
+                recurse = False
+                successors = self.succ[node]
+                while child < len(successors):
+                    nxt = successors[child]
+                    child += 1
+                    if index_of[nxt] == -1:
+                        work[-1] = (node, child)
+                        work.append((nxt, 0))
+                        recurse = True
+                        break
+                    if on_stack[nxt]:
+                        lowlink[node] = min(lowlink[node], index_of[nxt])
+                if recurse:
+                    continue
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index_of[node]:
+                    members = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        members.append(member)
+                        if member == node:
+                            break
+                    components.append(sorted(members))
+        return components
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def normalize(self, file_ref: str) -> str:
+        """Accept lib/x.dart, x.dart (relative to lib) or package:<name>/x.dart"""
+        key = file_ref.replace(os.sep, '/')
+        if key.startswith('package:'):
+            key = self.resolve(key, '')
+        elif not key.startswith(self.lib_dir + '/'):
+            key = f'{self.lib_dir}/{key}'
+        if key not in self.files:
+            raise KeyError(f"{file_ref} is not in the index")
+        return key
+
+    def _members(self, bits: int) -> Iterable[int]:
+        while bits:
+            low = bits & -bits
+            yield low.bit_length() - 1
+            bits ^= low
+
+    def closure(self, file_ref: str) -> Dict:
+        """Files and bytes transitively reachable from a file (excluding itself)"""
+        self.build()
+        i = self.node_index[self.normalize(file_ref)]
+        bits = self.reach[self.component_of[i]] & ~(1 << i)
+        members = [self.nodes[j] for j in self._members(bits)]
+        return {
+            'file': self.nodes[i],
+            'closure_files': len(members),
+            'closure_bytes': sum(self.files[m]['size'] for m in members),
+            'direct': [self.nodes[j] for j in self.succ[i]],
+        }
+
+    def reverse_dependencies(self, file_ref: str) -> Dict:
+        """Files that import/export/include a file, directly and transitively"""
+        self.build()
+        i = self.node_index[self.normalize(file_ref)]
+        bits = self.reverse_reach[self.component_of[i]] & ~(1 << i)
+        return {
+            'file': self.nodes[i],
+            'direct': [self.nodes[j] for j in sorted(self.pred[i])],
+            'transitive': [self.nodes[j] for j in self._members(bits)],
+        }
+
+    def cycles(self) -> List[List[str]]:
+        """Strongly connected components with more than one file (and self-imports), largest first"""
+        self.build()
+        result = [
+            [self.nodes[i] for i in members]
+            for members in self.components
+            if len(members) > 1 or members[0] in self.succ[members[0]]
+        ]
+        return sorted(result, key=lambda members: (-len(members), members[0]))
+
+    def rank(self, metric: str = 'impact', top: int = 20) -> List[Dict]:
+        """
+        Rank files by a metric
+
+        fan-in: direct dependents, fan-out: direct dependencies,
+        closure: files transitively reachable, impact: files that transitively
+        depend on it (what has to be re-analyzed/rebuilt when it changes)
+        """
+        self.build()
+        if metric == 'fan-in':
+            values = [len(p) for p in self.pred]
+        elif metric == 'fan-out':
+            values = [len(s) for s in self.succ]
+        elif metric == 'closure':
+            values = [self.reach[self.component_of[i]].bit_count() - 1 for i in range(len(self.nodes))]
+        elif metric == 'impact':
+            values = [self.reverse_reach[self.component_of[i]].bit_count() - 1 for i in range(len(self.nodes))]
+        else:
+            raise ValueError(f"Unknown metric {metric} (choose from {', '.join(RANK_METRICS)})")
+        order = sorted(range(len(self.nodes)), key=lambda i: (-values[i], self.nodes[i]))[:top]
+        return [{'file': self.nodes[i], metric: values[i]} for i in order]
+
+    def summary(self) -> Dict:
+        self.build()
+        return {
+            'files': len(self.nodes),
+            'edges': sum(len(s) for s in self.succ),
+            'directives': dict(sorted(self.kind_counts.items())),
+            'external_targets': len(self.external),
+            'unresolved': len(self.unresolved),
+            'cycles': len(self.cycles()),
+            'largest_cycle': max((len(c) for c in self.cycles()), default=0),
+        }
+
+
+def _option_value(args: List[str], name: str, default: Optional[str] = None) -> Optional[str]:
+    try:
+        idx = args.index(name)
+    except ValueError:
+        return default
+    if idx + 1 < len(args) and not args[idx + 1].startswith('--'):
+        return args[idx + 1]
+    return default
+
+
+def print_help():
+    print(f"""
+Dart Import Graph
+Usage:
+  python dart_import_graph.py [--stats] [--rdeps FILE] [--closure FILE] [--cycles]
+                              [--rank METRIC] [--top N] [--json] [--rebuild]
+                              [--index PATH] [--lib DIR] [--package-name NAME]
+
+Options:
+  --help, -h           Show this help message
+  --stats              Summary of the graph (default when no query is given)
+  --rdeps FILE         Direct and transitive reverse dependencies of FILE
+  --closure FILE       Transitive closure (files and bytes) reachable from FILE
+  --cycles             Import cycles (strongly connected components)
+  --rank METRIC        Top files by {', '.join(RANK_METRICS)}
+  --top N              Number of ranked files (default: 20)
+  --json               Print query results as JSON
+  --rebuild            Ignore the cached index and re-parse every file
+  --index PATH         Index location (default: {DEFAULT_INDEX_PATH})
+  --lib DIR            Directory to index (default: lib)
+  --package-name NAME  Specify package name (default: Memento)
+
+FILE can be lib/x.dart, x.dart (relative to lib) or package:Memento/x.dart
+
+Examples:
+  python dart_import_graph.py                              # Update index, print summary
+  python dart_import_graph.py --rank impact --top 30       # Largest rebuild triggers
+  python dart_import_graph.py --rdeps core/plugin_manager.dart
+  python dart_import_graph.py --closure main.dart --json
+  python dart_import_graph.py --cycles
+""")
+
+
+def main():
+    args = sys.argv[1:]
+    if '--help' in args or '-h' in args:
+        print_help()
+        return
+
+    as_json = '--json' in args
+    graph = DartImportGraph(lib_dir=_option_value(args, '--lib', 'lib'),
+                            package_name=_option_value(args, '--package-name', 'Memento'),
+                            index_path=_option_value(args, '--index', DEFAULT_INDEX_PATH))
+
+    start = time.perf_counter()
+    if '--rebuild' not in args:
+        graph.load()
+    stats = graph.update()
+    graph.save()
+    update_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = {}
+    try:
+        if '--rdeps' in args:
+            results['rdeps'] = graph.reverse_dependencies(_option_value(args, '--rdeps', ''))
+        if '--closure' in args:
+            results['closure'] = graph.closure(_option_value(args, '--closure', ''))
+        if '--cycles' in args:
+            results['cycles'] = graph.cycles()
+        if '--rank' in args:
+            metric = _option_value(args, '--rank', 'impact')
+            results['rank'] = graph.rank(metric, int(_option_value(args, '--top', '20')))
+        if not results or '--stats' in args:
+            results['stats'] = graph.summary()
+    except (KeyError, ValueError) as e:
+        print(f"Error: {e.args[0] if e.args else e}", file=sys.stderr)
+        sys.exit(1)
+    query_seconds = time.perf_counter() - start
+
+    timing = (f"Index: {stats['parsed']} parsed, {stats['rehashed']} rehashed, {stats['reused']} reused, "
+              f"{stats['removed']} removed ({update_seconds:.3f}s); queries {query_seconds:.3f}s")
+
+    if as_json:
+        results['index'] = {**stats, 'update_seconds': update_seconds, 'query_seconds': query_seconds}
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+        return
+
+    print("=" * 70)
+    print("Dart Import Graph")
+    print(timing)
+    print("=" * 70)
+
+    if 'stats' in results:
+        summary = results['stats']
+        print(f"\nFiles: {summary['files']}   Edges: {summary['edges']}   "
+              f"External targets: {summary['external_targets']}   Unresolved: {summary['unresolved']}")
+        print("Directives: " + ', '.join(f"{kind} {count}" for kind, count in summary['directives'].items()))
+        print(f"Cycles: {summary['cycles']} (largest {summary['largest_cycle']} files)")
+
+    if 'rdeps' in results:
+        rdeps = results['rdeps']
+        print(f"\nReverse dependencies of {rdeps['file']}: "
+              f"{len(rdeps['direct'])} direct, {len(rdeps['transitive'])} transitive")
+        for path in rdeps['direct']:
+            print(f"  {path}")
+
+    if 'closure' in results:
+        closure = results['closure']
+        print(f"\nClosure of {closure['file']}: {closure['closure_files']} files, "
+              f"{closure['closure_bytes']} bytes ({len(closure['direct'])} direct)")
+
+    if 'cycles' in results:
+        print(f"\nCycles: {len(results['cycles'])}")
+        for i, members in enumerate(results['cycles'], 1):
+            print(f"\n[{i}] {len(members)} files")
+            for path in members[:10]:
+                print(f"    {path}")
+            if len(members) > 10:
+                print(f"    ... and {len(members) - 10} more")
+
+    if 'rank' in results:
+        metric = _option_value(args, '--rank', 'impact')
+        print(f"\nTop files by {metric}:")
+        for row in results['rank']:
+            print(f"  {row[metric]:6d}  {row['file']}")
+
+
+if __name__ == "__main__":
+    main()
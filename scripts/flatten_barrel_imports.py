@@ -0,0 +1,522 @@
+#!/usr/bin/env python3
+"""
+Barrel Import Flattener - Replace imports of barrel files with direct imports
+
+A barrel is a library under lib/ that re-exports other libraries. For every
+import of a barrel, the identifiers used by the importing file are matched
+against the public top-level declarations the barrel exports (following
+nested exports, parts and show/hide combinators), and the import is replaced
+by imports of just the libraries that declare them.
+
+Matching is textual and errs on the side of keeping imports: libraries that
+declare extensions, whose declarations cannot be read reliably, or that come
+from other packages are always kept, and imports of barrels whose own
+declarations are used are left alone.
+
+Uses the cached index of dart_import_graph.py to report the transitive import
+count of each rewritten file before and after.
+"""
+
+import re
+import sys
+import csv
+import time
+from typing import List, Optional, Dict, Set, Tuple
+
+from convert_imports_v2 import ChangeWriter, iter_header_lines, parse_directives, IDENTIFIER_PATTERN
+from dart_import_graph import DartImportGraph, DEFAULT_INDEX_PATH
+
+
+SAMPLE_LIMIT = 20
+
+# Top-level declarations, matched on unindented lines of formatted Dart code
+TYPE_DECLARATION_PATTERN = re.compile(
+    r"(?:(?:abstract|sealed|base|final|interface|mixin|macro|augment)\s+)*"
+    r"(?:class|mixin|enum|extension\s+type)\s+([A-Za-z_$][\w$]*)")
+EXTENSION_PATTERN = re.compile(r"extension\b(?!\s+type\b)\s*([A-Za-z_$][\w$]*)?")
+TYPEDEF_PATTERN = re.compile(r"typedef\s+([A-Za-z_$][\w$]*)\s*(?:<[^=]*>)?\s*=")
+ACCESSOR_PATTERN = re.compile(r"\b(?:get|set)\s+([A-Za-z_$][\w$]*)")
+VARIABLE_PATTERN = re.compile(r"([A-Za-z_$][\w$]*)\s*=")
+FUNCTION_PATTERN = re.compile(r"([A-Za-z_$][\w$]*)\s*(?:<[^()]*>)?\s*\(")
+# Unindented lines that are not declarations
+NON_DECLARATION_PATTERN = re.compile(r"(?:[})\]]|//|/\*|\*|@|library\b|import\b|export\b|part\b|#!)")
+# Names the patterns above can pick up from a declaration they do not understand
+RESERVED_NAMES = {'Function', 'get', 'set', 'operator', 'async', 'sync', 'late', 'final', 'const', 'var',
+                  'external', 'static', 'typedef', 'class', 'enum', 'mixin', 'extension', 'if', 'for'}
+
+
+def parse_declarations(lines) -> Tuple[Set[str], bool, bool]:
+    """
+    Public top-level names declared in a Dart file
+
+    Returns:
+        (names, declares_extension, complete) - complete is False when an
+        unindented line could not be recognised, so the names may be missing some
+    """
+    names = set()
+    has_extension = False
+    complete = True
+    in_string = None
+
+    for line in lines:
+        # Skip the inside of multi-line strings; the line opening one can still declare something
+        if in_string:
+            if line.count(in_string) % 2:
+                in_string = None
+            continue
+        for quote in ("'''", '"""'):
+            if line.count(quote) % 2:
+                in_string = quote
+                break
+        if not line or line[0] in ' \t\r\n' or NON_DECLARATION_PATTERN.match(line):
+            continue
+
+        text = re.sub(r'^(?:external|static)\s+', '', line.strip())
+        if text.startswith('typedef'):
+            match = TYPEDEF_PATTERN.match(text) or FUNCTION_PATTERN.search(text[len('typedef'):])
+        elif text.startswith('extension') and not text.startswith('extension type'):
+            has_extension = True
+            match = EXTENSION_PATTERN.match(text)
+            if match.group(1) in (None, 'on'):
+                continue
+        else:
+            match = TYPE_DECLARATION_PATTERN.match(text) or ACCESSOR_PATTERN.search(text)
+            if not match:
+                equals, paren = text.find('='), text.find('(')
+                if equals != -1 and (paren == -1 or equals < paren):
+                    # Variable with initializer
+                    match = VARIABLE_PATTERN.search(text[:equals + 1])
+                elif paren != -1:
+                    match = FUNCTION_PATTERN.search(text)
+                elif text.endswith(';'):
+                    # Variable without initializer: the last identifier is the name
+                    match = re.search(r"([A-Za-z_$][\w$]*)\s*;$", text)
+
+        if not match or match.group(1) in RESERVED_NAMES:
+            complete = False
+        elif not match.group(1).startswith('_'):
+            names.add(match.group(1))
+    return names, has_extension, complete
+
+
+class BarrelFlattener:
+    def __init__(self, graph: DartImportGraph):
+        self.graph = graph
+        self.package_name = graph.package_name
+        self._sources: Dict[str, Tuple[List[str], List[Dict], int]] = {}
+        self._declarations: Dict[str, Tuple[Set[str], bool, bool]] = {}
+        self._exports: Dict[str, Tuple[Dict[str, Set[str]], Set[str], Set[str], List[str]]] = {}
+
+    def source(self, node: str) -> Tuple[List[str], List[Dict], int]:
+        """(lines with line endings, directives, number of header lines) of a file"""
+        cached = self._sources.get(node)
+        if cached is None:
+            with open(node, 'r', encoding='utf-8', newline='') as f:
+                lines = f.read().splitlines(keepends=True)
+            header_end = 0
+            for header_end, _ in iter_header_lines(lines):
+                pass
+            cached = self._sources[node] = (lines, parse_directives(lines), header_end)
+        return cached
+
+    def library_declarations(self, node: str) -> Tuple[Set[str], bool, bool]:
+        """Declarations of a library including its parts: (names, declares_extension, complete)"""
+        cached = self._declarations.get(node)
+        if cached is None:
+            lines, directives, _ = self.source(node)
+            names, has_extension, complete = parse_declarations(lines)
+            for directive in directives:
+                if directive['kind'] != 'part':
+                    continue
+                part = self.graph.resolve(directive['uri'], node)
+                if part not in self.graph.files:
+                    complete = False
+                    continue
+                part_names, part_extension, part_complete = parse_declarations(self.source(part)[0])
+                names |= part_names
+                has_extension = has_extension or part_extension
+                complete = complete and part_complete
+            cached = self._declarations[node] = (names, has_extension, complete)
+        return cached
+
+    def exported_symbols(self, node: str, active: Optional[Set[str]] = None
+                         ) -> Tuple[Dict[str, Set[str]], Set[str], Set[str], List[str]]:
+        """
+        Everything a library makes visible to its importers
+
+        Returns:
+            (name -> declaring libraries, libraries that must always be kept,
+             libraries only partly visible through show/hide,
+             directives for other packages that must be kept verbatim)
+        """
+        cached = self._exports.get(node)
+        if cached is not None:
+            return cached
+        active = active or set()
+        active.add(node)
+
+        names, has_extension, complete = self.library_declarations(node)
+        symbols = {name: {node} for name in names}
+        keep = {node} if has_extension or not complete else set()
+        restricted = set()
+        external = []
+
+        lines, directives, _ = self.source(node)
+        for directive in directives:
+            if directive['kind'] != 'export':
+                continue
+            target = self.graph.resolve(directive['uri'], node)
+            if target not in self.graph.files:
+                if ':' in target:
+                    text = ' '.join(line.strip() for line in lines[directive['line'] - 1:directive['end_line']])
+                    external.append(text.replace('export', 'import', 1))
+                else:
+                    # Unresolvable export: what it provides is unknown
+                    keep.add(node)
+                continue
+            if target in active:
+                # Export cycle: visible names are not known yet, keep the library
+                keep.add(target)
+                continue
+            target_symbols, target_keep, target_restricted, target_external = self.exported_symbols(target, active)
+            filtered = directive['show'] is not None or directive['hide'] is not None
+            for name, declaring in target_symbols.items():
+                if directive['show'] is not None and name not in directive['show']:
+                    continue
+                if directive['hide'] is not None and name in directive['hide']:
+                    continue
+                symbols.setdefault(name, set()).update(declaring)
+            keep |= target_keep
+            restricted |= target_restricted
+            if filtered:
+                restricted |= {lib for declaring in target_symbols.values() for lib in declaring} | target_keep
+            external.extend(target_external)
+
+        active.discard(node)
+        result = (symbols, keep, restricted, external)
+        self._exports[node] = result
+        return result
+
+    def is_barrel(self, node: str) -> bool:
+        return any(kind == 'export' for kind, _, _, _ in self.graph.files[node]['directives'])
+
+    def used_identifiers(self, node: str) -> Set[str]:
+        """
+        Every identifier in the body of a library and its parts
+
+        Comments and strings are included, so this over-approximates what is used.
+        """
+        lines, directives, header_end = self.source(node)
+        used = set(IDENTIFIER_PATTERN.findall(''.join(lines[header_end:])))
+        for directive in directives:
+            part = self.graph.resolve(directive['uri'], node)
+            if directive['kind'] == 'part' and part in self.graph.files:
+                used |= set(IDENTIFIER_PATTERN.findall(''.join(self.source(part)[0])))
+        return used
+
+    def package_uri(self, node: str) -> str:
+        return f"package:{self.package_name}/{node[len(self.graph.lib_dir) + 1:]}"
+
+    def plan_file(self, node: str, barrel_filter: Optional[str] = None) -> Tuple[List[Dict], List[str]]:
+        """
+        Changes for one file
+
+        Returns:
+            (changes, notes about barrel imports that were left alone)
+        """
+        lines, directives, _ = self.source(node)
+        imported = {self.graph.resolve(d['uri'], node) for d in directives if d['kind'] == 'import'}
+        used = None
+        changes = []
+        skipped = []
+        added: Set[str] = set()
+
+        for directive in directives:
+            if directive['kind'] != 'import' or directive['deferred'] or directive['prefix']:
+                continue
+            barrel = self.graph.resolve(directive['uri'], node)
+            if barrel not in self.graph.files or not self.is_barrel(barrel):
+                continue
+            if barrel_filter and barrel != barrel_filter:
+                continue
+            if sum(1 for d in directives if d['line'] == directive['line']) > 1:
+                # Conditional import: the configurations have to stay together
+                continue
+
+            if used is None:
+                used = self.used_identifiers(node)
+            symbols, keep, restricted, external = self.exported_symbols(barrel)
+            needed = set(keep)
+            shown: Dict[str, Set[str]] = {}
+            for name in used:
+                if name not in symbols:
+                    continue
+                if directive['show'] is not None and name not in directive['show']:
+                    continue
+                if directive['hide'] is not None and name in directive['hide']:
+                    continue
+                needed |= symbols[name]
+                for target in symbols[name]:
+                    shown.setdefault(target, set()).add(name)
+            if barrel in needed:
+                skipped.append(f"{barrel}: uses declarations of the barrel itself")
+                continue
+            if keep & restricted:
+                skipped.append(f"{barrel}: re-exports extensions through show/hide")
+                continue
+
+            targets = sorted(target for target in needed if target != node and target not in imported
+                             and target not in added)
+            added.update(targets)
+            new_lines = []
+            for target in targets:
+                # Keep the visibility the barrel gave, so no new names can clash in this file
+                partial = target in restricted or directive['show'] is not None or directive['hide'] is not None
+                combinator = f" show {', '.join(sorted(shown[target]))}" if partial and target in shown else ''
+                new_lines.append(f"import '{self.package_uri(target)}'{combinator};")
+            new_lines += [line for line in dict.fromkeys(external) if line not in new_lines]
+            old = ''.join(lines[directive['line'] - 1:directive['end_line']]).strip()
+            note = (f"{directive['uri']} -> {len(new_lines)} direct import(s)" if new_lines
+                    else f"{directive['uri']} -> removed (no exported declaration is used)")
+            changes.append({
+                'file': node,
+                'line': directive['line'],
+                'end_line': directive['end_line'],
+                'old': old,
+                'new': '\n'.join(new_lines),
+                'note': note,
+                'barrel': barrel,
+                'targets': targets,
+            })
+        return changes, skipped
+
+    def transitive_counts(self, node: str, changes: List[Dict]) -> Tuple[int, int]:
+        """
+        Transitive import count of a file before and after its changes
+
+        Only this file's edges change. Files outside its strongly connected
+        component cannot reach it again, so their precomputed reachability is used.
+        """
+        graph = self.graph
+        graph.build()
+        i = graph.node_index[node]
+        before = graph.reach[graph.component_of[i]].bit_count() - 1
+
+        removed = {graph.node_index[change['barrel']] for change in changes}
+        _, directives, _ = self.source(node)
+        still_imported = set()
+        for directive in directives:
+            if any(change['line'] == directive['line'] for change in changes):
+                continue
+            j = graph.node_index.get(graph.resolve(directive['uri'], node))
+            if j is not None:
+                still_imported.add(j)
+        new_succ = [j for j in graph.succ[i] if j not in removed or j in still_imported]
+        new_succ += [graph.node_index[target] for change in changes for target in change['targets']]
+
+        component = graph.component_of[i]
+        bits = 1 << i
+        stack = list(new_succ)
+        while stack:
+            j = stack.pop()
+            if bits >> j & 1:
+                continue
+            if graph.component_of[j] != component:
+                bits |= graph.reach[graph.component_of[j]]
+                continue
+            bits |= 1 << j
+            stack.extend(new_succ if j == i else graph.succ[j])
+        return before, bits.bit_count() - 1
+
+    def apply(self, node: str, changes: List[Dict]):
+        """Rewrite the import lines of a file, keeping its line endings"""
+        lines, _, _ = self.source(node)
+        newline = '\r\n' if lines and lines[0].endswith('\r\n') else '\n'
+        lines = list(lines)
+        for change in sorted(changes, key=lambda change: -change['line']):
+            replacement = [line + newline for line in change['new'].split('\n') if line]
+            lines[change['line'] - 1:change['end_line']] = replacement
+        with open(node, 'w', encoding='utf-8', newline='') as f:
+            f.write(''.join(lines))
+        self._sources.pop(node, None)
+
+    def run(self, dry_run: bool = True, export_csv: Optional[str] = None, export_jsonl: Optional[str] = None,
+            report: Optional[str] = None, barrel: Optional[str] = None, min_saving: int = 1) -> int:
+        """
+        Plan (and optionally apply) the rewrite for every file under lib/
+
+        Returns:
+            Number of rewritten imports
+        """
+        start = time.perf_counter()
+        print("=" * 70)
+        print("Barrel Import Flattener")
+        print(f"Package Name: {self.package_name}")
+        print(f"Mode: {'DRY RUN (preview only)' if dry_run else 'APPLY CHANGES'}")
+        print("=" * 70)
+
+        writers = []
+        if export_csv:
+            writers.append(ChangeWriter(export_csv, 'csv'))
+        if export_jsonl:
+            writers.append(ChangeWriter(export_jsonl, 'jsonl'))
+
+        rows = []
+        samples = []
+        total_changes = 0
+        skipped_total = 0
+        nodes = sorted(self.graph.files)
+        try:
+            for node in nodes:
+                changes, skipped = self.plan_file(node, barrel)
+                skipped_total += len(skipped)
+                if not changes:
+                    continue
+                before, after = self.transitive_counts(node, changes)
+                if before - after < min_saving:
+                    continue
+                for change in changes:
+                    change['note'] += f"; transitive imports {before} -> {after}"
+                records = [{key: change[key] for key in ('file', 'line', 'old', 'new', 'note')}
+                           for change in changes]
+                for writer in writers:
+                    writer.write(records)
+                if not dry_run:
+                    self.apply(node, changes)
+                rows.append({'file': node, 'barrel_imports': len(changes),
+                             'transitive_before': before, 'transitive_after': after,
+                             'delta': after - before})
+                total_changes += len(changes)
+                if len(samples) < SAMPLE_LIMIT:
+                    samples.extend(records[:SAMPLE_LIMIT - len(samples)])
+        finally:
+            for writer in writers:
+                writer.close()
+
+        if report:
+            with open(report, 'w', newline='', encoding='utf-8') as f:
+                fieldnames = ['file', 'barrel_imports', 'transitive_before', 'transitive_after', 'delta']
+                report_writer = csv.DictWriter(f, fieldnames=fieldnames)
+                report_writer.writeheader()
+                report_writer.writerows(sorted(rows, key=lambda row: (row['delta'], row['file'])))
+
+        elapsed = time.perf_counter() - start
+        print("\nSummary:")
+        print(f"  Files scanned: {len(nodes)}")
+        print(f"  Files to modify: {len(rows)}")
+        print(f"  Barrel imports rewritten: {total_changes}")
+        print(f"  Barrel imports left alone: {skipped_total}")
+        if rows:
+            before = sum(row['transitive_before'] for row in rows)
+            after = sum(row['transitive_after'] for row in rows)
+            print(f"  Transitive imports of modified files: {before} -> {after} ({after - before:+d})")
+        print(f"  Time: {elapsed:.3f}s")
+        for writer in writers:
+            print(f"Changes exported to: {writer.path}")
+        if report:
+            print(f"Per-file transitive counts written to: {report}")
+
+        if rows:
+            print("\n" + "=" * 70)
+            print("Largest reductions:")
+            print("=" * 70)
+            for row in sorted(rows, key=lambda row: (row['delta'], row['file']))[:SAMPLE_LIMIT]:
+                print(f"  {row['transitive_before']:5d} -> {row['transitive_after']:5d}  {row['file']}")
+
+        if samples:
+            print("\n" + "=" * 70)
+            print(f"Sample rewrites (first {SAMPLE_LIMIT}):")
+            print("=" * 70)
+            for i, change in enumerate(samples, 1):
+                print(f"\n[{i}] File: {change['file']}")
+                print(f"    Line: {change['line']}")
+                print(f"    {change['note']}")
+
+            print("\n" + "=" * 70)
+            if dry_run:
+                print("[WARN]  DRY RUN MODE - No files were modified")
+                print("       Use --apply to actually modify files")
+            else:
+                print("[OK]    All files have been modified successfully")
+        else:
+            print("\n[OK]    No barrel import can be flattened")
+
+        return total_changes
+
+
+def _option_value(args: List[str], name: str, default: Optional[str] = None) -> Optional[str]:
+    try:
+        idx = args.index(name)
+    except ValueError:
+        return default
+    if idx + 1 < len(args) and not args[idx + 1].startswith('--'):
+        return args[idx + 1]
+    return default
+
+
+def print_help():
+    print(f"""
+Barrel Import Flattener
+Usage:
+  python flatten_barrel_imports.py [--apply] [--export-csv [FILE]] [--export-jsonl [FILE]] [--report FILE]
+                                   [--barrel FILE] [--min-saving N]
+                                   [--index PATH] [--lib DIR] [--package-name NAME]
+
+Options:
+  --help, -h           Show this help message
+  --apply              Apply changes (default is preview only)
+  --export-csv [FILE]  Stream all changes to a CSV file (default: barrel_changes.csv)
+  --export-jsonl [FILE]
+                       Stream all changes to a JSON Lines file (default: barrel_changes.jsonl)
+  --report FILE        Write transitive import counts before/after per modified file as CSV
+  --barrel FILE        Only flatten imports of this barrel (lib/x.dart, x.dart or package:Memento/x.dart)
+  --min-saving N       Only rewrite files whose transitive import count drops by at least N (default: 1)
+  --index PATH         Import graph index (default: {DEFAULT_INDEX_PATH})
+  --lib DIR            Dart source directory (default: lib)
+  --package-name NAME  Specify package name (default: Memento)
+
+Examples:
+  python flatten_barrel_imports.py                         # Preview mode
+  python flatten_barrel_imports.py --export-csv            # Export planned rewrites to CSV
+  python flatten_barrel_imports.py --report transitive.csv # Per-file transitive counts
+  python flatten_barrel_imports.py --barrel widgets/common/index.dart --apply
+""")
+
+
+def main():
+    args = sys.argv[1:]
+    if '--help' in args or '-h' in args:
+        print_help()
+        return
+
+    export_csv = _option_value(args, '--export-csv', 'barrel_changes.csv') if '--export-csv' in args else None
+    export_jsonl = _option_value(args, '--export-jsonl', 'barrel_changes.jsonl') if '--export-jsonl' in args else None
+
+    graph = DartImportGraph(lib_dir=_option_value(args, '--lib', 'lib'),
+                            package_name=_option_value(args, '--package-name', 'Memento'),
+                            index_path=_option_value(args, '--index', DEFAULT_INDEX_PATH))
+    graph.load()
+    graph.update()
+    graph.save()
+
+    barrel = _option_value(args, '--barrel')
+    try:
+        min_saving = int(_option_value(args, '--min-saving', '1'))
+        if barrel is not None:
+            barrel = graph.normalize(barrel)
+    except (KeyError, ValueError) as e:
+        print(f"Error: {e.args[0] if e.args else e}", file=sys.stderr)
+        sys.exit(2)
+
+    flattener = BarrelFlattener(graph)
+    flattener.run(dry_run='--apply' not in args, export_csv=export_csv, export_jsonl=export_jsonl,
+                  report=_option_value(args, '--report'), barrel=barrel, min_saving=min_saving)
+
+    if '--apply' in args:
+        # Rewritten files are re-parsed on the next run
+        graph.update()
+        graph.save()
+
+
+if __name__ == "__main__":
+    main()
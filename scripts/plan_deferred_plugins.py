@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Deferred Plugin Planner - Rank lib/plugins by startup code removable with `deferred as`
+
+For every plugin directory under lib/plugins, all imports that reach into the
+plugin from outside of it are treated as deferred. The plugin's exclusive
+closure is the code that then drops out of the startup path (everything
+reachable from lib/main.dart), i.e. code only reachable through that plugin.
+Plugins are ranked by the size of that closure, and the import sites to
+convert are listed as a concrete plan.
+
+Uses the cached index of dart_import_graph.py, so repeated runs only re-parse
+changed files.
+"""
+
+import os
+import sys
+import json
+import time
+from typing import List, Optional, Dict, Set
+
+from dart_import_graph import DartImportGraph, DEFAULT_INDEX_PATH
+
+
+def plugin_of(node: str, plugins_dir: str) -> Optional[str]:
+    """Plugin name for files under plugins_dir/<name>/, None otherwise"""
+    prefix = plugins_dir + '/'
+    if not node.startswith(prefix):
+        return None
+    rest = node[len(prefix):]
+    return rest.split('/', 1)[0] if '/' in rest else None
+
+
+class DeferredPluginPlanner:
+    def __init__(self, graph: DartImportGraph, entry: str = "lib/main.dart", plugins_dir: str = "lib/plugins"):
+        self.graph = graph
+        self.entry = entry
+        self.plugins_dir = plugins_dir.rstrip('/\\')
+        self.nodes = sorted(graph.files)
+        self.node_index = {node: i for i, node in enumerate(self.nodes)}
+        self.sizes = [graph.files[node]['size'] for node in self.nodes]
+        self.plugin_names = [plugin_of(node, self.plugins_dir) for node in self.nodes]
+
+        # Eager edges with their source line; imports that are already deferred are not on the startup path
+        self.edges: List[List[tuple]] = [[] for _ in self.nodes]
+        for i, node in enumerate(self.nodes):
+            for kind, target, line, deferred in graph.files[node]['directives']:
+                j = self.node_index.get(target)
+                if j is not None and j != i and not (kind == 'import' and deferred):
+                    self.edges[i].append((j, kind, line))
+
+    def reachable(self, cut_plugins: Set[str]) -> Set[int]:
+        """Files reachable from the entry when imports into cut_plugins from outside are deferred"""
+        start = self.node_index.get(self.entry)
+        if start is None:
+            raise KeyError(f"{self.entry} is not in the index")
+        seen = {start}
+        stack = [start]
+        while stack:
+            i = stack.pop()
+            source_plugin = self.plugin_names[i]
+            for j, _, _ in self.edges[i]:
+                if j in seen:
+                    continue
+                target_plugin = self.plugin_names[j]
+                if target_plugin in cut_plugins and target_plugin != source_plugin:
+                    continue
+                seen.add(j)
+                stack.append(j)
+        return seen
+
+    def import_sites(self, plugin: str, startup: Set[int]) -> List[Dict]:
+        """Directives on the startup path that reach into the plugin from outside"""
+        sites = []
+        for i in sorted(startup):
+            if self.plugin_names[i] == plugin:
+                continue
+            for j, kind, line in self.edges[i]:
+                if self.plugin_names[j] == plugin:
+                    sites.append({'file': self.nodes[i], 'line': line, 'kind': kind, 'target': self.nodes[j]})
+        return sites
+
+    def plan(self) -> Dict:
+        startup = self.reachable(set())
+        startup_bytes = sum(self.sizes[i] for i in startup)
+        plugins = sorted({name for name in self.plugin_names if name})
+
+        rows = []
+        for plugin in plugins:
+            if not any(self.plugin_names[i] == plugin for i in startup):
+                continue
+            remaining = self.reachable({plugin})
+            removed = startup - remaining
+            removed_bytes = sum(self.sizes[i] for i in removed)
+            sites = self.import_sites(plugin, startup)
+            rows.append({
+                'plugin': plugin,
+                'exclusive_files': len(removed),
+                'exclusive_bytes': removed_bytes,
+                'startup_share': removed_bytes / startup_bytes if startup_bytes else 0.0,
+                'shared_files': sum(1 for i in remaining if self.plugin_names[i] == plugin),
+                'import_sites': sites,
+                # export directives cannot be deferred; they have to be removed or moved first
+                'blockers': [site for site in sites if site['kind'] == 'export'],
+            })
+        rows.sort(key=lambda row: (-row['exclusive_bytes'], row['plugin']))
+
+        # Deferring every plugin at once also removes code shared only between plugins
+        all_remaining = self.reachable(set(plugins))
+        all_removed_bytes = startup_bytes - sum(self.sizes[i] for i in all_remaining)
+
+        return {
+            'entry': self.entry,
+            'startup_files': len(startup),
+            'startup_bytes': startup_bytes,
+            'plugins': rows,
+            'all_plugins_deferred': {
+                'removed_files': len(startup) - len(all_remaining),
+                'removed_bytes': all_removed_bytes,
+                'startup_share': all_removed_bytes / startup_bytes if startup_bytes else 0.0,
+            },
+        }
+
+
+def _option_value(args: List[str], name: str, default: Optional[str] = None) -> Optional[str]:
+    try:
+        idx = args.index(name)
+    except ValueError:
+        return default
+    if idx + 1 < len(args) and not args[idx + 1].startswith('--'):
+        return args[idx + 1]
+    return default
+
+
+def print_help():
+    print(f"""
+Deferred Plugin Planner
+Usage:
+  python plan_deferred_plugins.py [--entry FILE] [--plugins DIR] [--top N] [--sites N] [--json]
+                                  [--index PATH] [--lib DIR] [--package-name NAME]
+
+Options:
+  --help, -h           Show this help message
+  --entry FILE         Startup entry point (default: lib/main.dart)
+  --plugins DIR        Plugin root, one plugin per sub-directory (default: lib/plugins)
+  --top N              Number of plugins in the plan (default: all)
+  --sites N            Import sites listed per plugin (default: 10)
+  --json               Print the full plan as JSON
+  --index PATH         Import graph index (default: {DEFAULT_INDEX_PATH})
+  --lib DIR            Dart source directory (default: lib)
+  --package-name NAME  Specify package name (default: Memento)
+
+Examples:
+  python plan_deferred_plugins.py                  # Ranked plan for all plugins
+  python plan_deferred_plugins.py --top 5 --sites 0
+  python plan_deferred_plugins.py --json > deferred_plan.json
+""")
+
+
+def main():
+    args = sys.argv[1:]
+    if '--help' in args or '-h' in args:
+        print_help()
+        return
+
+    start = time.perf_counter()
+    graph = DartImportGraph(lib_dir=_option_value(args, '--lib', 'lib'),
+                            package_name=_option_value(args, '--package-name', 'Memento'),
+                            index_path=_option_value(args, '--index', DEFAULT_INDEX_PATH))
+    graph.load()
+    graph.update()
+    graph.save()
+
+    planner = DeferredPluginPlanner(graph, entry=_option_value(args, '--entry', 'lib/main.dart'),
+                                    plugins_dir=_option_value(args, '--plugins', 'lib/plugins'))
+    try:
+        plan = planner.plan()
+    except KeyError as e:
+        print(f"Error: {e.args[0]}", file=sys.stderr)
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+
+    top = _option_value(args, '--top')
+    if top is not None:
+        plan['plugins'] = plan['plugins'][:int(top)]
+
+    if '--json' in args:
+        plan['seconds'] = elapsed
+        print(json.dumps(plan, indent=2, ensure_ascii=False))
+        return
+
+    site_limit = int(_option_value(args, '--sites', '10'))
+    print("=" * 70)
+    print("Deferred Plugin Planner")
+    print(f"Entry: {plan['entry']}   Startup path: {plan['startup_files']} files, {plan['startup_bytes']} bytes")
+    print(f"Time: {elapsed:.3f}s")
+    print("=" * 70)
+
+    print(f"\n{'Plugin':<20}{'Files':>8}{'Bytes':>12}{'Startup':>9}{'Sites':>7}  Notes")
+    for row in plan['plugins']:
+        notes = f"{len(row['blockers'])} export blocker(s)" if row['blockers'] else ''
+        if row['shared_files']:
+            notes = (notes + ', ' if notes else '') + f"{row['shared_files']} files stay eager (shared)"
+        print(f"{row['plugin']:<20}{row['exclusive_files']:>8}{row['exclusive_bytes']:>12}"
+              f"{row['startup_share']:>8.1%}{len(row['import_sites']):>7}  {notes}")
+
+    combined = plan['all_plugins_deferred']
+    print(f"\nDeferring all plugins: -{combined['removed_files']} files, -{combined['removed_bytes']} bytes "
+          f"({combined['startup_share']:.1%} of the startup path)")
+
+    if site_limit:
+        print("\n" + "=" * 70)
+        print("Plan (convert these imports to `deferred as` and await loadLibrary() before use):")
+        print("=" * 70)
+        for rank, row in enumerate(plan['plugins'], 1):
+            if not row['import_sites']:
+                continue
+            print(f"\n[{rank}] {row['plugin']}: -{row['exclusive_bytes']} bytes, "
+                  f"{len(row['import_sites'])} import site(s)")
+            for site in row['import_sites'][:site_limit]:
+                marker = '  (export: cannot be deferred)' if site['kind'] == 'export' else ''
+                print(f"    {site['file']}:{site['line']} -> {site['target']}{marker}")
+            if len(row['import_sites']) > site_limit:
+                print(f"    ... and {len(row['import_sites']) - site_limit} more")
+
+
+if __name__ == "__main__":
+    main()
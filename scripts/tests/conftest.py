@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# scripts/ 下的脚本不是包，直接按模块名导入
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,75 @@
+from pathlib import Path
+
+import pytest
+
+import copy_icons
+
+Image = pytest.importorskip('PIL.Image')
+
+
+def make_source(source_dir: Path, names, size=96):
+    """按 png/black/<图标名>/baseline-4x.png 的结构生成源图"""
+    for number, name in enumerate(names):
+        icon_dir = source_dir / name
+        icon_dir.mkdir(parents=True)
+        image = Image.new('RGBA', (size, size), (0, 0, 0, 0))
+        image.paste((0, 0, 0, 255), (number * 8, 8, size - 8, size - 8))
+        image.save(icon_dir / copy_icons.SOURCE_FILE_NAME)
+
+
+def test_plain_sync_refuses_density_managed_dir(tmp_path):
+    source_dir = tmp_path / 'png' / 'black'
+    dest_dir = tmp_path / 'material'
+    make_source(source_dir, ['add', 'home'])
+    dest_dir.mkdir()
+
+    icons, _ = copy_icons.collect_source_icons(source_dir)
+    copy_icons.build_density_variants(icons, dest_dir, ['1.0x', '2.0x'], tmp_path / 'cache.json', jobs=1)
+    main_asset = (dest_dir / 'add.png').read_bytes()
+    with Image.open(dest_dir / 'add.png') as image:
+        assert image.size == (24, 24)
+
+    with pytest.raises(RuntimeError):
+        copy_icons.sync_icons(source_dir, dest_dir, jobs=1)
+    assert (dest_dir / 'add.png').read_bytes() == main_asset
+    assert (dest_dir / '2.0x' / 'add.png').is_file()
+
+
+def test_plain_sync_copies_and_prunes(tmp_path):
+    source_dir = tmp_path / 'png' / 'black'
+    dest_dir = tmp_path / 'material'
+    make_source(source_dir, ['add', 'home'])
+    dest_dir.mkdir()
+    (dest_dir / 'removed.png').write_bytes(b'old')
+
+    stats = copy_icons.sync_icons(source_dir, dest_dir, mode='copy', jobs=1)
+    assert (stats['copied'], stats['pruned']) == (2, 1)
+    assert sorted(path.name for path in dest_dir.iterdir()) == ['add.png', 'home.png']
+
+    stats = copy_icons.sync_icons(source_dir, dest_dir, mode='copy', jobs=1)
+    assert (stats['copied'], stats['unchanged']) == (0, 2)
+
+
+def test_pack_shelves_ignores_input_order():
+    sizes = [(f"icon_{number}", 16 + number % 3 * 8, 16 + number % 5 * 4) for number in range(60)]
+    sheets = copy_icons.pack_shelves(sizes, 128, padding=1)
+    assert copy_icons.pack_shelves(list(reversed(sizes)), 128, padding=1) == sheets
+    assert sorted(rect[0] for sheet in sheets for rect in sheet['rects']) == sorted(name for name, _, _ in sizes)
+    assert all(sheet['width'] <= 128 and sheet['height'] <= 128 for sheet in sheets)
+
+
+def test_build_atlas_is_deterministic(tmp_path):
+    source_dir = tmp_path / 'png' / 'black'
+    icon_dir = tmp_path / 'material'
+    make_source(source_dir, [f"icon_{number}" for number in range(6)])
+    icon_dir.mkdir()
+    copy_icons.sync_icons(source_dir, icon_dir, mode='copy', jobs=1)
+
+    first = copy_icons.build_atlas(icon_dir, tmp_path / 'atlas_a', max_size=200, jobs=1)
+    second = copy_icons.build_atlas(icon_dir, tmp_path / 'atlas_b', max_size=200, jobs=1)
+    assert first['sheets'] == second['sheets'] == 2
+    for name in ['index.json', 'sheet_0.png', 'sheet_1.png']:
+        assert (tmp_path / 'atlas_a' / name).read_bytes() == (tmp_path / 'atlas_b' / name).read_bytes()
+
+    # 图标未变时不重新生成图集
+    assert copy_icons.build_atlas(icon_dir, tmp_path / 'atlas_a', max_size=200, jobs=1)['rebuilt'] == 0